@@ -0,0 +1,7 @@
+-- Batch job matching: skip unchanged resumes and read results per subscription
+
+ALTER TABLE job_subscriptions ADD COLUMN IF NOT EXISTS resume_fingerprint VARCHAR(64);
+ALTER TABLE job_subscriptions ADD COLUMN IF NOT EXISTS matched_at TIMESTAMP WITH TIME ZONE;
+
+CREATE INDEX IF NOT EXISTS idx_job_subscriptions_active ON job_subscriptions (id) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS idx_job_results_subscription ON job_results (subscription_id, created_at DESC);
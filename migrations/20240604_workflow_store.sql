@@ -0,0 +1,12 @@
+-- Workflow store: stable public ids, external owners and lookups by user and tool
+
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS public_id VARCHAR(32);
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS owner VARCHAR(255);
+ALTER TABLE workflow_steps ADD COLUMN IF NOT EXISTS tool_name VARCHAR(255);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_workflows_public_id ON workflows (public_id);
+CREATE INDEX IF NOT EXISTS idx_workflows_owner ON workflows (owner, id);
+-- Incremental cache sync reads rows changed since the last sync
+CREATE INDEX IF NOT EXISTS idx_workflows_updated_at ON workflows (updated_at);
+CREATE INDEX IF NOT EXISTS idx_workflow_steps_workflow ON workflow_steps (workflow_id, step_order);
+CREATE INDEX IF NOT EXISTS idx_workflow_steps_tool ON workflow_steps (tool_name);
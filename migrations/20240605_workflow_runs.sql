@@ -0,0 +1,27 @@
+-- Workflow runs: per-step checkpoints so failed runs can be resumed
+
+CREATE TABLE IF NOT EXISTS workflow_runs (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(32) UNIQUE NOT NULL,
+    workflow_id VARCHAR(32) NOT NULL,
+    status VARCHAR(50) DEFAULT 'running',
+    duration DOUBLE PRECISION,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS workflow_step_runs (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(32) NOT NULL REFERENCES workflow_runs(run_id),
+    step_key VARCHAR(64) NOT NULL,
+    tool_name VARCHAR(255),
+    status VARCHAR(50) NOT NULL,
+    duration DOUBLE PRECISION,
+    output JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (run_id, step_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_workflow_runs_workflow ON workflow_runs (workflow_id, id);
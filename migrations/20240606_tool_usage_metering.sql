@@ -0,0 +1,16 @@
+-- Tool usage metering: per (user, tool, capability, minute) call counts, latency and payload sizes
+
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS owner VARCHAR(255) NOT NULL DEFAULT '';
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS tool_name VARCHAR(255) NOT NULL DEFAULT '';
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS capability VARCHAR(255) NOT NULL DEFAULT '';
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS bucket TIMESTAMP WITH TIME ZONE;
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS error_count INTEGER DEFAULT 0;
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS total_ms DOUBLE PRECISION DEFAULT 0;
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS max_ms DOUBLE PRECISION DEFAULT 0;
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS bytes_in BIGINT DEFAULT 0;
+ALTER TABLE tool_usage ADD COLUMN IF NOT EXISTS bytes_out BIGINT DEFAULT 0;
+
+-- One row per key and minute; concurrent workers add to it with ON CONFLICT
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tool_usage_key ON tool_usage (owner, tool_name, capability, bucket);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_tool ON tool_usage (tool_name, bucket);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_bucket ON tool_usage (bucket);
@@ -0,0 +1,30 @@
+-- Seed the tool categories added after the initial catalog, so a database-backed
+-- catalog serves the same tools as the built-in defaults. Rows already present
+-- (matched by name) are left alone, so the migration can be re-applied.
+
+INSERT INTO tools (name, category, description)
+SELECT seed.name, seed.category, seed.description
+FROM (VALUES
+    ('Salesforce', 'CRM', 'Customer relationship management platform'),
+    ('HubSpot', 'CRM', 'Inbound marketing and CRM platform'),
+    ('Zoho', 'CRM', 'Business software suite with CRM'),
+    ('Google Analytics', 'Analytics', 'Web traffic and conversion analytics'),
+    ('Mixpanel', 'Analytics', 'Product event analytics'),
+    ('Amplitude', 'Analytics', 'Product analytics and experimentation'),
+    ('Alchemy API', 'Blockchain', 'Ethereum node and enhanced blockchain APIs'),
+    ('OpenZeppelin', 'Blockchain', 'Audited smart contract library and tooling'),
+    ('Moralis SDK', 'Blockchain', 'Web3 data and wallet APIs'),
+    ('Doxy.me API', 'Healthcare', 'Telemedicine video sessions'),
+    ('DrChrono EHR', 'Healthcare', 'Electronic health records and scheduling'),
+    ('AWS HIPAA Buckets', 'Healthcare', 'HIPAA-eligible encrypted record storage'),
+    ('Yardi API', 'Real Estate', 'Property management and market data'),
+    ('RentManager', 'Real Estate', 'Rental property management software'),
+    ('DocuSign API', 'Real Estate', 'Electronic signatures for lease agreements'),
+    ('H2O.ai', 'AI Governance', 'Model training with explainability reports'),
+    ('DataRobot API', 'AI Governance', 'Model monitoring and bias detection'),
+    ('IBM Watson OpenScale', 'AI Governance', 'AI model fairness and drift monitoring'),
+    ('Deepgram API', 'Voice AI', 'Speech-to-text transcription'),
+    ('Hugging Face Transformers', 'Voice AI', 'Open models for sentiment and summarization'),
+    ('Rasa', 'Voice AI', 'Open source conversational AI framework')
+) AS seed (name, category, description)
+WHERE NOT EXISTS (SELECT 1 FROM tools WHERE tools.name = seed.name);
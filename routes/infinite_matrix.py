@@ -1,16 +1,30 @@
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from src.infinite_matrix_ecosystem import ToolLibrary, WorkflowBuilder
+from src.infinite_matrix_ecosystem import (
+    ToolLibrary, WorkflowBuilder, CAPABILITIES, CapabilityNotAllowed, catalog_response, get_services
+)
 
 # Create a Blueprint for Infinite Matrix routes
 infinite_matrix_routes = Blueprint('infinite_matrix_routes', __name__)
 
 @infinite_matrix_routes.route('/tools', methods=['GET'])
 def get_tools():
-    """Get all tools or tools by category"""
+    """Get all tools, or tools by category or capability"""
     tool_lib = ToolLibrary()
+    capability = request.args.get('capability')
+    if capability:
+        return catalog_response(tool_lib.get_tools_by_capability(capability), tool_lib.catalog)
     category = request.args.get('category')
     tools = tool_lib.get_tools_by_category(category)
-    return jsonify(tools)
+    return catalog_response(tools, tool_lib.catalog)
+
+@infinite_matrix_routes.route('/tools/search', methods=['GET'])
+def search_tools():
+    """Prefix and fuzzy tool search for the tool picker"""
+    tool_lib = ToolLibrary()
+    # Non-numeric limits fall back to 10; the result is kept within 1..50
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    return catalog_response(tool_lib.search(request.args.get('q', ''), limit), tool_lib.catalog)
 
 @infinite_matrix_routes.route('/workflows', methods=['POST'])
 def create_workflow():
@@ -28,9 +42,97 @@ def create_workflow():
 @infinite_matrix_routes.route('/workflows/<workflow_id>', methods=['GET'])
 def get_workflow(workflow_id):
     """Get workflow details"""
-    workflow_builder = WorkflowBuilder()
-    workflow = workflow_builder.get_workflow(workflow_id) if hasattr(workflow_builder, 'get_workflow') else None
-    
-    if workflow:
-        return jsonify(workflow)
-    return jsonify({"error": "Workflow not found"}), 404
\ No newline at end of file
+    workflow = WorkflowBuilder().get_workflow(workflow_id)
+    if workflow is None:
+        return jsonify({"error": "Workflow not found"}), 404
+    return jsonify(workflow)
+
+@infinite_matrix_routes.route('/workflows', methods=['GET'])
+def list_workflows():
+    """List workflows by owner (user_id) and/or tool"""
+    user_id = request.args.get('user_id')
+    tool = request.args.get('tool')
+    if not user_id and not tool:
+        return jsonify({"error": "Provide user_id or tool"}), 400
+    return jsonify(WorkflowBuilder().list_workflows(user_id, tool))
+
+@infinite_matrix_routes.route('/workflows/<workflow_id>/runs', methods=['POST'])
+def run_workflow(workflow_id):
+    """Run a workflow; pass {"run_id": ...} to resume a failed run"""
+    data = request.get_json(silent=True) or {}
+    result = WorkflowBuilder().run(workflow_id, data.get('run_id'))
+    if result is None:
+        return jsonify({"error": "Workflow not found"}), 404
+    if 'error' in result:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@infinite_matrix_routes.route('/workflows/<workflow_id>/runs/<run_id>', methods=['GET'])
+def get_workflow_run(workflow_id, run_id):
+    """Checkpointed state of a workflow run"""
+    run = WorkflowBuilder().get_run(workflow_id, run_id)
+    if run is None:
+        return jsonify({"error": "Run not found"}), 404
+    return jsonify(run)
+
+@infinite_matrix_routes.route('/modules', methods=['GET'])
+def get_available_modules():
+    """Names of the integration modules"""
+    # Listing names does not import or construct any module
+    return jsonify(get_services()['modules'].available_modules())
+
+@infinite_matrix_routes.route('/modules/status', methods=['GET'])
+def get_modules_status():
+    """Which modules are loaded and how long their import and init took"""
+    return jsonify(get_services()['modules'].registry.stats())
+
+@infinite_matrix_routes.route('/modules/<module_name>/capabilities', methods=['GET'])
+def get_module_capabilities(module_name):
+    """Capabilities of a module with their parameters"""
+    capabilities = CAPABILITIES.describe(module_name)
+    if capabilities is None:
+        return jsonify({"error": "Module not found"}), 404
+    return jsonify(capabilities)
+
+@infinite_matrix_routes.route('/modules/<module_name>/capabilities/<capability>', methods=['POST'])
+def invoke_module_capability(module_name, capability):
+    """Call a read-only capability with the JSON body's "params" as keyword arguments"""
+    if CAPABILITIES.get(module_name, capability) is None:
+        return jsonify({"error": "Capability not found"}), 404
+    data = request.get_json(silent=True) or {}
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+    try:
+        result = get_services()['modules'].invoke(
+            module_name, capability, params, data.get('user_id'), data.get('tool'), request.content_length
+        )
+    except CapabilityNotAllowed as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        # The module or the service behind it failed (connection errors, RpcError, ...)
+        print(f"Failed to call {module_name}.{capability}: {str(e)}")
+        # Details stay in the log; transport errors can include the provider URL and its key
+        return jsonify({"error": f"{module_name}.{capability} failed upstream"}), 502
+    return jsonify({"module": module_name, "capability": capability, "result": result})
+
+def _parse_time(value):
+    """ISO 8601 query parameter; naive times are UTC"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+@infinite_matrix_routes.route('/usage', methods=['GET'])
+def get_usage():
+    """Capability usage rolled up per minute, hour or day, filtered by user_id, tool, since and until"""
+    try:
+        rows = get_services()['usage_meter'].rollup(
+            request.args.get('user_id'), request.args.get('tool'), request.args.get('granularity', 'hour'),
+            _parse_time(request.args.get('since')), _parse_time(request.args.get('until'))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(rows)
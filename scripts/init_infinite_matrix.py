@@ -38,17 +38,24 @@ def init_database():
         # Execute the SQL migration file
         cursor = conn.cursor()
         
-        # Get the migration file path
-        migration_file = Path(__file__).parent.parent / 'migrations' / '20240602_infinite_matrix_ecosystem.sql'
+        # Get the migration file paths, in the order they must run
+        migrations_dir = Path(__file__).parent.parent / 'migrations'
+        migration_files = [
+            migrations_dir / '20240602_infinite_matrix_ecosystem.sql',
+            migrations_dir / '20240604_workflow_store.sql',
+            migrations_dir / '20240605_workflow_runs.sql',
+            migrations_dir / '20240606_tool_usage_metering.sql'
+        ]
         
-        if not migration_file.exists():
-            print(f"Error: Migration file not found at {migration_file}")
-            return False
-        
-        # Read and execute the SQL file
-        with open(migration_file, 'r') as f:
-            sql = f.read()
-            cursor.execute(sql)
+        for migration_file in migration_files:
+            if not migration_file.exists():
+                print(f"Error: Migration file not found at {migration_file}")
+                return False
+            
+            # Read and execute the SQL file
+            with open(migration_file, 'r') as f:
+                sql = f.read()
+                cursor.execute(sql)
         
         conn.commit()
         print("Database tables created successfully!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Genix Plan Reconciliation Script
+Replays Stripe payment and subscription events onto users.plan, fixing plans
+left stale by missed or failed webhooks.
+
+Usage:
+  python scripts/reconcile_plans.py --since-days 30 --dry-run
+  python scripts/reconcile_plans.py --export events.jsonl --diff-out changes.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+
+# Add the project root (and src/, for the ecosystem's service imports) to the path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+from src.genix_ecosystem import AutomationEngine, get_apis
+
+# Load environment variables
+load_dotenv()
+
+def print_progress(progress):
+    """One line per chunk: users processed, plans changed and throughput"""
+    rate = progress.users_done / progress.elapsed if progress.elapsed else 0
+    print(f"  chunk {progress.chunks_done}/{progress.chunks_total}: "
+          f"{progress.users_done}/{progress.users_total} users, {progress.changed} changed "
+          f"({rate:.0f} users/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile user plans with Stripe events")
+    parser.add_argument('--export', help="Read events from a local export (.jsonl or JSON) instead of the Stripe API")
+    parser.add_argument('--since-days', type=float, help="Only replay Stripe events from the last N days")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Users per transaction")
+    parser.add_argument('--dry-run', action='store_true', help="Report the changes without writing them")
+    parser.add_argument('--diff-out', help="Write every plan change to this file as JSON lines")
+    args = parser.parse_args()
+
+    print("\n=== Genix Plan Reconciliation ===\n")
+    since = int(time.time() - args.since_days * 86400) if args.since_days else None
+    report = AutomationEngine(get_apis()).reconcile_plans(
+        export_path=args.export, since=since, dry_run=args.dry_run, chunk_size=args.chunk_size,
+        progress=print_progress, max_changes=None
+    )
+    if 'error' in report:
+        print(f"Error: {report['error']}")
+        return False
+
+    if args.diff_out:
+        with open(args.diff_out, 'w') as f:
+            for change in report['changes']:
+                f.write(json.dumps(change) + "\n")
+        print(f"\nWrote {len(report['changes'])} changes to {args.diff_out}")
+
+    summary = {key: value for key, value in report.items() if key != 'changes'}
+    print(f"\n{json.dumps(summary, indent=2)}")
+    if args.dry_run:
+        print("\nDry run: no plans were changed")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -8,11 +8,13 @@ import sys
 import json
 from dotenv import load_dotenv
 
-# Add the project root to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the project root (and src/, for the ecosystem's service imports) to the path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
 
 # Import Genix components
-from src.genix_ecosystem import AIOrchestrator, CreditRepair, AIBossHub, init_apis
+from src.genix_ecosystem import AIOrchestrator, CreditRepair, AIBossHub, get_apis
 
 # Load environment variables
 load_dotenv()
@@ -21,7 +23,7 @@ def test_ai_orchestrator():
     """Test the AI Orchestrator component"""
     print("\n=== Testing AI Orchestrator ===\n")
     
-    apis = init_apis()
+    apis = get_apis()
     ai = AIOrchestrator(apis)
     
     # Test provider selection
@@ -47,7 +49,7 @@ def test_credit_repair():
     """Test the Credit Repair module"""
     print("\n=== Testing Credit Repair Module ===\n")
     
-    apis = init_apis()
+    apis = get_apis()
     service = CreditRepair(apis)
     
     # Mock test without making actual API calls
@@ -70,7 +72,7 @@ def test_ai_boss_hub():
     """Test the AI Boss Hub module"""
     print("\n=== Testing AI Boss Hub Module ===\n")
     
-    apis = init_apis()
+    apis = get_apis()
     hub = AIBossHub(apis)
     
     # Mock test without making actual API calls
@@ -4,7 +4,6 @@ from routes.auth import auth_bp
 from routes.genix import genix_routes
 from routes.infinite_matrix import infinite_matrix_routes
 from src.genix_ecosystem import register_genix_blueprint
-from src.infinite_matrix_ecosystem import register_infinite_matrix_blueprint
 
 def create_app():
     app = Flask(__name__)
@@ -18,9 +17,6 @@ def create_app():
     # Register Genix ecosystem
     register_genix_blueprint(app)
     
-    # Register Infinite Matrix ecosystem
-    register_infinite_matrix_blueprint(app)
-    
     return app
 
 if __name__ == '__main__':
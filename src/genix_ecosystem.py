@@ -4,14 +4,35 @@ A Replit-deployable Python blueprint for your AI-powered empire.
 """ 
 import os 
 import json 
+import asyncio
+import contextvars
+import threading
+import sqlite3
+import time
 import redis 
-from flask import Flask, request, jsonify, Blueprint 
-from tenacity import retry, stop_after_attempt 
-import psycopg2  # Neon Postgres 
+from flask import Flask, request, jsonify, Blueprint, Response, stream_with_context 
+from services.service_registry import ServiceRegistry
+from services.db_pool import DatabasePool
+from services.llm_cache import LLMResponseCache, response_cache_key
+from services.llm_concurrency import LLMRuntime
+from services.llm_router import LLMRouter, ProviderProfile, RouteBudget, estimate_tokens
+from services.llm_rate_limit import (
+    ProviderRateLimiter, ProviderLimits, PRIORITY_PAID, PRIORITY_FREE,
+    retry_after_seconds, is_retryable, backoff_delay
+)
+from services.step_graph import StepGraph
+from services.job_matching import JobMatcher, ResumeInput
+from services.job_index import JobIndex, rerank_prompt, apply_rerank
+from services.webhook_queue import (
+    WebhookQueue, WebhookWorkerPool, SignatureError, construct_stripe_event, stripe_customer_key
+)
+from services.plan_reconciliation import (
+    PlanReconciler, PREMIUM_MIN_AMOUNT, PAID_PLAN, stripe_events, stripe_customer_email, export_events
+)
 
 # Import AI providers if available, otherwise handle gracefully
 try:
-    from anthropic import Anthropic  # Claude 
+    from anthropic import Anthropic, AsyncAnthropic  # Claude 
     import google.generativeai as genai  # Gemini 
 except ImportError:
     print("Warning: Some AI providers not available. Install required packages.")
@@ -32,128 +53,537 @@ except ImportError:
 genix_bp = Blueprint('genix', __name__)
 
 # Configure all APIs (use Replit Secrets in production) 
-def init_apis():
-    """Initialize API connections with environment variables"""
-    apis = {}
-    
-    # Stripe initialization
+def _init_stripe():
     if 'stripe' in globals() and os.getenv('STRIPE_KEY'):
         stripe.api_key = os.getenv('STRIPE_KEY')
-        apis['stripe'] = True
-    
-    # Claude initialization
+        return True
+    return None
+
+def _init_claude():
     if 'Anthropic' in globals() and os.getenv('CLAUDE_KEY'):
-        apis['claude'] = Anthropic(api_key=os.getenv('CLAUDE_KEY'))
-    
-    # Gemini initialization
+        return Anthropic(api_key=os.getenv('CLAUDE_KEY'))
+    return None
+
+def _init_claude_async():
+    if 'AsyncAnthropic' in globals() and os.getenv('CLAUDE_KEY'):
+        return AsyncAnthropic(api_key=os.getenv('CLAUDE_KEY'))
+    return None
+
+def _init_gemini():
     if 'genai' in globals() and os.getenv('GEMINI_KEY'):
         genai.configure(api_key=os.getenv('GEMINI_KEY'))
-        apis['gemini'] = True
-    
-    # Redis initialization
-    if os.getenv('REDIS_URL'):
-        apis['redis'] = redis.Redis(host=os.getenv('REDIS_URL'))
-    
-    # Supabase initialization
+        return True
+    return None
+
+def _init_redis():
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        return None
+    if '://' in redis_url:
+        return redis.Redis.from_url(redis_url)
+    return redis.Redis(host=redis_url)
+
+def _init_supabase():
     if 'create_client' in globals() and os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_KEY'):
-        apis['supabase'] = create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
-    
-    # Postgres initialization
-    if all(os.getenv(env) for env in ['NEON_HOST', 'NEON_DB', 'NEON_USER', 'NEON_PW']):
-        apis['pg_conn'] = psycopg2.connect(
-            host=os.getenv('NEON_HOST'),
-            database=os.getenv('NEON_DB'),
-            user=os.getenv('NEON_USER'),
-            password=os.getenv('NEON_PW')
+        return create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+    return None
+
+# Statements AutomationEngine runs on every webhook, prepared once per pooled connection
+GENIX_STATEMENTS = {
+    'create_user': "INSERT INTO users (email, plan) VALUES ($1, $2)",
+    'set_user_plan': "UPDATE users SET plan = $1 WHERE email = $2"
+}
+
+def _init_postgres():
+    """Neon Postgres pool (or DATABASE_URL, e.g. sqlite:///genix.db for local runs)"""
+    return DatabasePool.from_env(statements=GENIX_STATEMENTS)
+
+def _init_llm_runtime():
+    """Shared event loop bounding concurrent calls per provider (AI_<PROVIDER>_CONCURRENCY)"""
+    return LLMRuntime(provider_limits={
+        provider: int(os.getenv(f'AI_{provider.upper()}_CONCURRENCY', '16'))
+        for provider in PROVIDER_MODELS
+    })
+
+def _optional_float(env: str):
+    return float(os.getenv(env)) if os.getenv(env) else None
+
+def _init_llm_router():
+    """Adaptive provider router; AI_LATENCY_BUDGET (s) and AI_COST_BUDGET ($) bound auto routing"""
+    return LLMRouter(
+        [ProviderProfile(**{**profile, 'max_concurrency': int(os.getenv(f"AI_{profile['name'].upper()}_CONCURRENCY", '16'))})
+         for profile in PROVIDER_PROFILES],
+        default_budget=RouteBudget(_optional_float('AI_LATENCY_BUDGET'), _optional_float('AI_COST_BUDGET')),
+        hedge_ratio=float(os.getenv('AI_HEDGE_RATIO', '0.1'))
+    )
+
+def _init_rate_limiter(redis_client):
+    """Per-provider quotas (AI_<PROVIDER>_RPM / AI_<PROVIDER>_TPM) shared through Redis"""
+    return ProviderRateLimiter({
+        provider: ProviderLimits(
+            int(os.getenv(f'AI_{provider.upper()}_RPM', str(rpm))),
+            int(os.getenv(f'AI_{provider.upper()}_TPM', str(tpm)))
         )
-    
-    return apis
+        for provider, (rpm, tpm) in PROVIDER_RATE_LIMITS.items()
+    }, redis_client=redis_client)
+
+def build_service_registry() -> ServiceRegistry:
+    """Register the lazily-built clients shared by every Genix request"""
+    registry = ServiceRegistry()
+    registry.register('stripe', _init_stripe)
+    registry.register('claude', _init_claude, close=lambda client: client.close())
+    registry.register('claude_async', _init_claude_async)
+    registry.register('gemini', _init_gemini)
+    registry.register('redis', _init_redis, health_check=lambda client: client.ping(), close=lambda client: client.close())
+    registry.register('supabase', _init_supabase)
+    registry.register('pg_pool', _init_postgres, health_check=lambda pool: pool.ping(), close=lambda pool: pool.close())
+    registry.register('llm_cache', lambda: LLMResponseCache(
+        redis_client=lambda: registry.get('redis'),
+        max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024')),
+        default_ttl=int(os.getenv('AI_CACHE_TTL', '3600')),
+        near_duplicate=os.getenv('AI_CACHE_NEAR_DUPLICATES') == '1'
+    ))
+    registry.register('llm_runtime', _init_llm_runtime, close=lambda runtime: runtime.close())
+    registry.register('llm_router', _init_llm_router)
+    registry.register('webhook_queue', WebhookQueue.from_env)
+    registry.register('webhook_workers', lambda: WebhookWorkerPool(
+        registry['webhook_queue'],
+        lambda event: AutomationEngine(registry).handle_stripe_event(event),
+        workers=int(os.getenv('WEBHOOK_WORKERS', '4'))
+    ).start(), close=lambda pool: pool.close())
+    registry.register('job_index', lambda: JobIndex.from_env() if os.getenv('JOB_INDEX_PATH') else None)
+    registry.register('llm_rate_limiter', lambda: _init_rate_limiter(lambda: registry.get('redis')))
+    return registry
+
+_registry: ServiceRegistry = None
+_registry_lock = threading.Lock()
+
+def get_apis() -> ServiceRegistry:
+    """Return the process-wide service registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_service_registry()
+    return _registry
+
+def init_apis():
+    """Initialize API connections with environment variables
+
+    Kept for existing callers; clients are now shared through get_apis() instead
+    of being rebuilt on every call.
+    """
+    return get_apis()
 
 # ========== 2. AI META-WRAPPER ========== 
+# Model used for each provider; part of the response cache key
+PROVIDER_MODELS = {
+    "claude": "claude-3-haiku-20240307",
+    "gemini": "gemini-pro"
+}
+
+# List prices in USD per 1k tokens, used by the router's cost estimates
+PROVIDER_PROFILES = [
+    {"name": "claude", "input_cost_per_1k": 0.00025, "output_cost_per_1k": 0.00125},
+    {"name": "gemini", "input_cost_per_1k": 0.0005, "output_cost_per_1k": 0.0015}
+]
+
+# Default (requests/min, tokens/min) quotas per provider
+PROVIDER_RATE_LIMITS = {
+    "claude": (50, 40000),
+    "gemini": (60, 32000)
+}
+# Tokens reserved for the completion when taking from the tokens/min bucket; the unused part is refunded
+OUTPUT_TOKEN_RESERVE = 512
+# Provider calls per query, including retries of rate-limited or transient failures
+MAX_ATTEMPTS = 3
+
+# Priority of the request being served; set by aquery()/stream() and inherited by the tasks they start
+REQUEST_PRIORITY = contextvars.ContextVar('genix_request_priority', default=PRIORITY_FREE)
+
+# Streamed text is saved for resumption roughly this often
+PARTIAL_FLUSH_CHARS = 256
+# Idle seconds before a streamed response sends a heartbeat to keep proxies from timing out
+STREAM_KEEPALIVE = 15
+
 class AIOrchestrator: 
+    """Routes prompts to an AI provider through the shared LLM runtime
+
+    aquery() is the async API: calls run on the runtime's event loop, bounded by
+    a semaphore per provider, and identical prompts already in flight share one
+    provider call. query() is the blocking wrapper kept for existing callers.
+    Cancelling or timing out a caller only abandons that caller's wait.
+
+    provider="auto" lets the LLMRouter pick within the request's budget, and a
+    call slower than the provider's p95 is hedged on the next-best provider.
+    Auto-routed answers are cached under "auto" since any provider's answer will do.
+
+    Every provider call first waits for quota from the ProviderRateLimiter, where
+    PRIORITY_PAID requests go ahead of PRIORITY_FREE ones. Rate-limited and
+    transient failures are retried with jittered backoff, or after the provider's
+    Retry-After, which pauses that provider for every caller.
+    """
+
     def __init__(self, apis):
         self.apis = apis
+        self.cache = apis.get('llm_cache')
+        self.runtime = apis.get('llm_runtime') or get_apis().get('llm_runtime')
+        self.router = apis.get('llm_router') or get_apis().get('llm_router')
+        self.limiter = apis.get('llm_rate_limiter') or get_apis().get('llm_rate_limiter')
     
-    @retry(stop=stop_after_attempt(3)) 
-    def query(self, prompt: str, provider: str = "auto") -> str: 
+    def query(self, prompt: str, provider: str = "auto", ttl: int = None, timeout: float = None,
+              budget: RouteBudget = None, priority: int = PRIORITY_FREE) -> str: 
         """Smart router for AI APIs with caching""" 
-        # Check for Redis cache
-        if 'redis' in self.apis:
-            cache_key = f"ai:{hash(prompt)}" 
-            if cached := self.apis['redis'].get(cache_key): 
-                return cached.decode() 
+        return self.runtime.run_sync(self._aquery(prompt, provider, ttl, budget, priority), timeout)
+
+    async def aquery(self, prompt: str, provider: str = "auto", ttl: int = None, timeout: float = None,
+                     budget: RouteBudget = None, priority: int = PRIORITY_FREE) -> str:
+        """Async variant of query() usable from any event loop"""
+        return await self.runtime.dispatch(self._aquery(prompt, provider, ttl, budget, priority), timeout)
+
+    def stream(self, prompt: str, provider: str = "auto", ttl: int = None, idle_timeout: float = None,
+               priority: int = PRIORITY_FREE):
+        """Yield the response text as the provider produces it"""
+        return self.runtime.stream_sync(self._astream(prompt, provider, ttl, priority=priority), idle_timeout)
+
+    async def _lookup(self, prompt: str, provider: str, budget: RouteBudget = None):
+        """Resolve the provider and cache key, returning any cached response"""
+        model = PROVIDER_MODELS.get(provider)
+        if self.cache:
+            cache_key = self.cache.key_for(provider, model, prompt)
+            # Check the response cache (in-process LRU, then Redis)
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+        else:
+            cache_key, cached = response_cache_key(provider, model, prompt), None
 
         # Provider selection logic 
-        if provider == "auto": 
-            provider = self._select_provider(prompt) 
-
-        # Execute query 
-        if provider == "claude" and 'claude' in self.apis: 
-            resp = self.apis['claude'].messages.create( 
-                model="claude-3-haiku-20240307", 
-                messages=[{"role": "user", "content": prompt}] 
-            ) 
-            result = resp.content[0].text 
-        elif provider == "gemini" and 'gemini' in self.apis: 
-            model = genai.GenerativeModel('gemini-pro') 
-            resp = model.generate_content(prompt) 
-            result = resp.text 
-        else:  # Default fallback 
-            result = "AI provider not available or not implemented yet" 
-
-        # Cache result if Redis is available
-        if 'redis' in self.apis:
-            self.apis['redis'].setex(cache_key, 3600, result)  # Cache for 1 hour 
-        
-        return result 
-
-    def _select_provider(self, prompt: str) -> str: 
-        """Cost-aware routing""" 
-        if "code" in prompt.lower(): 
-            return "gemini"  # Better for technical queries 
-        return "claude"  # Default to cheapest competent model 
+        if provider == "auto" and cached is None: 
+            provider = self._select_provider(prompt, budget) 
+        return provider, cache_key, cached
+
+    def forget(self, prompt: str, provider: str = "auto"):
+        """Evict the cached response to prompt, e.g. after it failed validation"""
+        if self.cache:
+            self.cache.delete(self.cache.key_for(provider, PROVIDER_MODELS.get(provider), prompt))
+
+    def _is_available(self, provider: str) -> bool:
+        return provider in PROVIDER_MODELS and provider in self.apis
+
+    async def _aquery(self, prompt: str, provider: str, ttl: int, budget: RouteBudget = None,
+                      priority: int = PRIORITY_FREE) -> str:
+        REQUEST_PRIORITY.set(priority)
+        requested = provider
+        provider, cache_key, cached = await self._lookup(prompt, provider, budget)
+        if cached is not None:
+            return cached
+
+        if not self._is_available(provider):  # Default fallback, never cached
+            return "AI provider not available or not implemented yet" 
+
+        # Identical prompts already in flight wait for the same provider call
+        return await self.runtime.flights.do(cache_key, lambda: self._call_and_cache(
+            provider, prompt, cache_key, ttl, hedge=requested == "auto", budget=budget
+        ))
+
+    async def _call_and_cache(self, provider: str, prompt: str, cache_key: str, ttl: int,
+                              hedge: bool = False, budget: RouteBudget = None) -> str:
+        if hedge:
+            result = await self._hedged_call(provider, prompt, budget)
+        else:
+            result = await self._tracked_call(provider, prompt)
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, cache_key, result, ttl)
+        return result
+
+    async def _tracked_call(self, provider: str, prompt: str) -> str:
+        input_tokens = estimate_tokens(prompt)
+        for attempt in range(MAX_ATTEMPTS):
+            await self.limiter.acquire(provider, input_tokens + OUTPUT_TOKEN_RESERVE, REQUEST_PRIORITY.get())
+            output_tokens = 0
+            try:
+                with self.router.track(provider, input_tokens) as call:
+                    async with self.runtime.limit(provider):
+                        result = await self._call_provider(provider, prompt)
+                    output_tokens = call.output_tokens = estimate_tokens(result)
+            except Exception as e:
+                if attempt + 1 >= MAX_ATTEMPTS or not is_retryable(e):
+                    raise
+                error = e
+            else:
+                return result
+            finally:
+                # Return the unused output reservation, all of it when the attempt failed or was cancelled
+                await asyncio.to_thread(self.limiter.refund, provider, OUTPUT_TOKEN_RESERVE - output_tokens)
+            await self._backoff(provider, error, attempt)
+
+    async def _backoff(self, provider: str, error: Exception, attempt: int):
+        delay = retry_after_seconds(error)
+        if delay is not None:
+            # The next acquire() waits out the pause, as do other callers of this provider
+            await asyncio.to_thread(self.limiter.pause, provider, delay)
+        else:
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _hedged_call(self, primary: str, prompt: str, budget: RouteBudget = None) -> str:
+        """Race a backup provider once the primary runs past its p95; the first success wins"""
+        tasks = [asyncio.ensure_future(self._tracked_call(primary, prompt))]
+        try:
+            delay = self.router.hedge_delay(primary)
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                backup = self.router.choose(estimate_tokens(prompt), budget, self._available_providers(), exclude=[primary])
+                if backup is not None:
+                    self.router.note_hedge()
+                    tasks.append(asyncio.ensure_future(self._tracked_call(backup, prompt)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Every attempt failed; surface the primary's error
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _astream(self, prompt: str, provider: str, ttl: int, budget: RouteBudget = None,
+                       priority: int = PRIORITY_FREE):
+        """Yield the response in pieces, resuming from a partial left by an interrupted stream"""
+        REQUEST_PRIORITY.set(priority)
+        provider, cache_key, cached = await self._lookup(prompt, provider, budget)
+        if cached is not None:
+            yield cached
+            return
+        if not self._is_available(provider):
+            yield "AI provider not available or not implemented yet"
+            return
+        if not self._can_stream(provider):
+            # No streaming client; fall back to one (coalesced) call
+            yield await self.runtime.flights.do(cache_key, lambda: self._call_and_cache(provider, prompt, cache_key, ttl))
+            return
+
+        # Identical streams share one provider stream; late readers replay it from the start
+        async for piece in self.runtime.streams.stream(
+                cache_key, lambda: self._stream_and_cache(provider, prompt, cache_key, ttl, priority)):
+            yield piece
+
+    async def _stream_and_cache(self, provider: str, prompt: str, cache_key: str, ttl: int, priority: int):
+        text = await asyncio.to_thread(self.cache.get_partial, cache_key) if self.cache else ''
+        if text:
+            yield text
+        flushed = len(text)
+        await self.limiter.acquire(provider, estimate_tokens(prompt) + OUTPUT_TOKEN_RESERVE, priority)
+        output_tokens = 0
+        try:
+            with self.router.track(provider, estimate_tokens(prompt)) as call:
+                async with self.runtime.limit(provider):
+                    async for piece in self._provider_stream(provider, prompt, text):
+                        text += piece
+                        output_tokens = call.output_tokens = call.output_tokens + estimate_tokens(piece)
+                        yield piece
+                        if self.cache and len(text) - flushed >= PARTIAL_FLUSH_CHARS:
+                            await asyncio.to_thread(self.cache.set_partial, cache_key, text)
+                            flushed = len(text)
+        except BaseException:
+            # Keep what was produced so a retry picks up from here
+            if self.cache and len(text) > flushed:
+                await asyncio.to_thread(self.cache.set_partial, cache_key, text)
+            raise
+        finally:
+            # Return the unused output reservation, all of it when the stream failed before any output
+            await asyncio.to_thread(self.limiter.refund, provider, OUTPUT_TOKEN_RESERVE - output_tokens)
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, cache_key, text, ttl)
+            await asyncio.to_thread(self.cache.clear_partial, cache_key)
+
+    def _can_stream(self, provider: str) -> bool:
+        if provider == "claude":
+            return self.apis.get('claude_async') is not None
+        return provider == "gemini" and hasattr(genai.GenerativeModel, 'generate_content_async')
+
+    async def _provider_stream(self, provider: str, prompt: str, partial: str = ''):
+        """Stream provider output, continuing after partial when resuming"""
+        if provider == "claude":
+            messages = [{"role": "user", "content": prompt}]
+            if partial:
+                # Prefill the reply so Claude carries on where the last attempt stopped
+                messages.append({"role": "assistant", "content": partial.rstrip()})
+            async with self.apis['claude_async'].messages.stream(
+                model=PROVIDER_MODELS["claude"],
+                max_tokens=1024,
+                messages=messages
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+            return
+
+        if partial:
+            prompt = f"{prompt}\n\nContinue this partial answer exactly where it stops, without repeating any of it:\n{partial}"
+        model = genai.GenerativeModel(PROVIDER_MODELS["gemini"])
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    async def _call_provider(self, provider: str, prompt: str) -> str:
+        """Execute query without blocking the runtime loop"""
+        if provider == "claude":
+            request = dict(
+                model=PROVIDER_MODELS["claude"],
+                max_tokens=1024,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            client = self.apis.get('claude_async')
+            if client is not None:
+                resp = await client.messages.create(**request)
+            else:
+                resp = await asyncio.to_thread(self.apis['claude'].messages.create, **request)
+            return resp.content[0].text
+
+        model = genai.GenerativeModel(PROVIDER_MODELS["gemini"])
+        if hasattr(model, 'generate_content_async'):
+            resp = await model.generate_content_async(prompt)
+        else:
+            resp = await asyncio.to_thread(model.generate_content, prompt)
+        return resp.text
+
+    def _available_providers(self) -> list:
+        return [provider for provider in PROVIDER_MODELS if provider in self.apis]
+
+    def _select_provider(self, prompt: str, budget: RouteBudget = None) -> str: 
+        """Cost- and latency-aware routing from the providers' live statistics
+
+        Returns None when nothing is configured or every circuit is open, which
+        callers answer with the "not available" fallback.
+        """ 
+        return self.router.choose(estimate_tokens(prompt), budget, self._available_providers())
 
 # ========== 3. BUSINESS MODULES ========== 
 class CreditRepair: 
+    PRICE_CENTS = 9900
+
     def __init__(self, apis): 
         self.apis = apis
         self.ai = AIOrchestrator(apis) 
+        self.last_timings = {}
 
-    def generate_dispute(self, user_input: str) -> dict: 
-        """$99/letter automated product""" 
-        law = self.ai.query( 
-            f"Summarize FCRA laws about: {user_input}", 
-            provider="claude" 
-        ) 
-        letter = self.ai.query( 
-            f"Write a credit dispute letter about: {user_input} using these laws: {law}", 
-            provider="claude" 
-        ) 
-        
-        # Charge via Stripe if available
-        payment_id = None
+    async def _summarize_law(self, issue: str) -> str:
+        return await self.ai.aquery(f"Summarize FCRA laws about: {issue}", provider="claude", priority=PRIORITY_PAID)
+
+    def _letter_prompt(self, issue: str, law: str) -> str:
+        return f"Write a credit dispute letter about: {issue} using these laws: {law}"
+
+    async def _write_letter(self, issue: str, law: str) -> str:
+        return await self.ai.aquery(self._letter_prompt(issue, law), provider="claude", priority=PRIORITY_PAID)
+
+    def _create_payment(self, idempotency_key: str = None):
+        """Charge via Stripe if available (runs in a worker thread)"""
         if 'stripe' in globals() and 'stripe' in self.apis:
+            # A retried request with the same key gets the original intent back
+            options = {'idempotency_key': idempotency_key} if idempotency_key else {}
             intent = stripe.PaymentIntent.create( 
-                amount=9900, 
+                amount=self.PRICE_CENTS, 
                 currency="usd", 
-                description="AI Credit Repair Letter" 
+                description="AI Credit Repair Letter",
+                **options
             )
-            payment_id = intent.id
-            
-        return {"letter": letter, "payment_id": payment_id} 
+            return intent.id
+        return None
+
+    def _dispute_graph(self, with_letter: bool = True) -> StepGraph:
+        # The payment intent does not depend on the letter, so it overlaps the LLM calls
+        graph = StepGraph()
+        graph.add('law', self._summarize_law, inputs=['issue'])
+        graph.add('payment_id', self._create_payment, inputs=['idempotency_key'])
+        if with_letter:
+            graph.add('letter', self._write_letter, needs=['law'], inputs=['issue'])
+        return graph
+
+    def generate_dispute(self, user_input: str, idempotency_key: str = None) -> dict: 
+        """$99/letter automated product""" 
+        run = self.ai.runtime.run_sync(self._dispute_graph().run(issue=user_input, idempotency_key=idempotency_key))
+        self.last_timings = run.timings_dict()
+        return {"letter": run.results['letter'], "payment_id": run.results['payment_id']} 
+
+    def stream_dispute(self, user_input: str, idempotency_key: str = None):
+        """Yield the payment id, then the letter as it is written, then the finished letter"""
+        return self.ai.runtime.stream_sync(self._astream_dispute(user_input, idempotency_key), keepalive=STREAM_KEEPALIVE)
+
+    async def _astream_dispute(self, user_input: str, idempotency_key: str = None):
+        run = await self._dispute_graph(with_letter=False).run(issue=user_input, idempotency_key=idempotency_key)
+        payment_id = run.results['payment_id']
+        yield {"event": "payment", "payment_id": payment_id}
+
+        parts = []
+        started = time.perf_counter()
+        async for text in self.ai._astream(self._letter_prompt(user_input, run.results['law']), "claude", None, priority=PRIORITY_PAID):
+            parts.append(text)
+            yield {"event": "token", "text": text}
+
+        timings = run.timings_dict()
+        timings['letter'] = {"started": run.duration, "duration": time.perf_counter() - started, "status": "ok"}
+        yield {"event": "done", "letter": "".join(parts), "payment_id": payment_id, "timings": timings}
 
 class AIBossHub: 
+    # Postings retrieved from the job index, and how many of them are returned after reranking
+    SEARCH_CANDIDATES = 20
+    SEARCH_RESULTS = 5
+
     def __init__(self, apis): 
         self.apis = apis
         self.ai = AIOrchestrator(apis) 
 
+    def _jobs_prompt(self, resume_text: str) -> str:
+        return f"Find jobs matching this resume: {resume_text}"
+
+    def _index_hits(self, resume_text: str) -> list:
+        index = self.apis.get('job_index')
+        return index.search(resume_text, k=self.SEARCH_CANDIDATES) if index is not None else []
+
     def job_search(self, resume_text: str) -> list: 
         """$29/mo subscription product""" 
+        hits = self._index_hits(resume_text)
+        if hits:
+            # Local vector search finds the candidates; the model only orders them
+            reply = self.ai.query(rerank_prompt(resume_text, hits, self.SEARCH_RESULTS), priority=PRIORITY_PAID)
+            return apply_rerank(reply, hits, self.SEARCH_RESULTS)
+
         jobs_text = self.ai.query( 
-            f"Find jobs matching this resume: {resume_text}", 
-            provider="gemini" 
+            self._jobs_prompt(resume_text), 
+            provider="gemini",
+            priority=PRIORITY_PAID
         ) 
-        
+        return self._parse_jobs(jobs_text)
+
+    def stream_job_search(self, resume_text: str):
+        """Yield the model's answer as it is written, then the parsed jobs"""
+        return self.ai.runtime.stream_sync(self._astream_job_search(resume_text), keepalive=STREAM_KEEPALIVE)
+
+    async def _astream_job_search(self, resume_text: str):
+        hits = await asyncio.to_thread(self._index_hits, resume_text)
+        if hits:
+            yield {"event": "candidates", "jobs": [hit.to_dict() for hit in hits[:self.SEARCH_RESULTS]]}
+            reply = await self.ai.aquery(rerank_prompt(resume_text, hits, self.SEARCH_RESULTS), priority=PRIORITY_PAID)
+            yield {"event": "done", "jobs": apply_rerank(reply, hits, self.SEARCH_RESULTS)}
+            return
+
+        parts = []
+        async for text in self.ai._astream(self._jobs_prompt(resume_text), "gemini", None, priority=PRIORITY_PAID):
+            parts.append(text)
+            yield {"event": "token", "text": text}
+        yield {"event": "done", "jobs": self._parse_jobs("".join(parts))}
+
+    def match_subscriptions(self, resumes: list = None, force: bool = False) -> dict:
+        """Batch-match many resumes (default: every active subscriber) and store the results"""
+        matcher = JobMatcher(self.ai, self.apis.get('pg_pool'))
+        if resumes is None:
+            inputs = matcher.load_active_subscriptions()
+        else:
+            inputs = [ResumeInput(item['subscription_id'], item['resume'], item.get('fingerprint')) for item in resumes]
+        return matcher.match(inputs, force=force).to_dict()
+
+    def _parse_jobs(self, jobs_text: str) -> list:
         # Try to parse as JSON, fallback to text if not valid JSON
         try:
             return json.loads(jobs_text)  # Expects JSON formatted response 
@@ -167,72 +597,177 @@ class AutomationEngine:
     
     def automate_workflow(self, workflow_type: str, data: dict):
         """Central automation router""" 
-        if workflow_type == "new_user" and 'supabase' in self.apis and 'pg_conn' in self.apis: 
+        if workflow_type == "new_user" and 'supabase' in self.apis and 'pg_pool' in self.apis: 
             # Add to Supabase Auth + Neon DB 
             self.apis['supabase'].auth.sign_up({ 
                 "email": data['email'], 
                 "password": data['password'] 
             }) 
-            with self.apis['pg_conn'].cursor() as cur: 
-                cur.execute("""
-                    INSERT INTO users (email, plan) 
-                    VALUES (%s, %s) 
-                """, (data['email'], data.get('plan', 'free'))) 
-            self.apis['pg_conn'].commit() 
+            with self.apis['pg_pool'].transaction() as tx: 
+                tx.execute_prepared('create_user', (data['email'], data.get('plan', 'free'))) 
 
         elif workflow_type == "subscription_payment": 
             # Stripe webhook handler 
-            if data['amount'] >= 2900:  # $29+ 
+            if data['amount'] >= PREMIUM_MIN_AMOUNT:  # $29+ 
                 self.upgrade_user_plan(data['email']) 
     
+    def handle_stripe_event(self, event: dict):
+        """Apply one verified Stripe event; run by the webhook workers, not the request"""
+        if event['type'] == 'payment_intent.succeeded': 
+            payment = event['data']['object']
+            email = payment.get('receipt_email') or (payment.get('metadata') or {}).get('email')
+            if email:
+                self.automate_workflow("subscription_payment", {'amount': payment['amount'], 'email': email})
+
     def upgrade_user_plan(self, email):
         """Upgrade user to paid plan"""
-        if 'pg_conn' in self.apis:
-            with self.apis['pg_conn'].cursor() as cur:
-                cur.execute("""
-                    UPDATE users SET plan = 'premium'
-                    WHERE email = %s
-                """, (email,))
-            self.apis['pg_conn'].commit()
+        if 'pg_pool' in self.apis:
+            with self.apis['pg_pool'].transaction() as tx:
+                tx.execute_prepared('set_user_plan', (PAID_PLAN, email))
+
+    def reconcile_plans(self, export_path: str = None, since: int = None, dry_run: bool = False,
+                        chunk_size: int = 1000, progress=None, max_changes: int = 100) -> dict:
+        """Replay Stripe events (from the API or a local export) onto users.plan in bulk"""
+        if 'pg_pool' not in self.apis:
+            return {"error": "Database not configured"}
+        if export_path:
+            events = export_events(export_path)
+        elif 'stripe' in self.apis:
+            events = stripe_events(stripe, since=since)
+        else:
+            return {"error": "Stripe not configured and no export given"}
+        # Subscription deletions only name the customer; emails come from other events or Stripe
+        customer_email = stripe_customer_email(stripe) if 'stripe' in self.apis else None
+        reconciler = PlanReconciler(self.apis['pg_pool'], chunk_size=chunk_size, progress=progress,
+                                    customer_email=customer_email)
+        return reconciler.reconcile(events, dry_run=dry_run).to_dict(max_changes)
 
 # ========== 5. DEPLOYMENT READY ENDPOINTS ========== 
+def stream_format(data: dict):
+    """'sse' or 'ndjson' when the client asked for a streamed reply, else None"""
+    best = request.accept_mimetypes.best
+    if best == 'text/event-stream':
+        return 'sse'
+    if best == 'application/x-ndjson' or data.get('stream'):
+        return 'ndjson'
+    return None
+
+def ndjson_response(events) -> Response:
+    return Response(
+        stream_with_context(json.dumps(event) + "\n" for event in events if event is not None),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+def sse_response(events, resume_from: int = 0) -> Response:
+    """Server-sent events whose ids are the number of characters streamed so far
+
+    A client that reconnects with Last-Event-ID only receives the text after
+    that offset; the rest of the answer is resumed from the partial cache.
+    """
+    def generate():
+        offset = 0
+        for event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            if event['event'] == 'token':
+                start, offset = offset, offset + len(event['text'])
+                if offset <= resume_from:
+                    continue
+                if start < resume_from:
+                    event = dict(event, text=event['text'][resume_from - start:])
+            yield f"id: {offset}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def streamed_response(fmt: str, events) -> Response:
+    if fmt == 'sse':
+        last_event_id = request.headers.get('Last-Event-ID', '0')
+        return sse_response(events, int(last_event_id) if last_event_id.isdigit() else 0)
+    return ndjson_response(events)
+
 @genix_bp.route('/credit-repair', methods=['POST']) 
 def credit_repair(): 
     data = request.json 
-    apis = init_apis()
+    apis = get_apis()
     service = CreditRepair(apis) 
-    result = service.generate_dispute(data['issue']) 
+    idempotency_key = request.headers.get('Idempotency-Key')
+    fmt = stream_format(data)
+    if fmt:
+        return streamed_response(fmt, service.stream_dispute(data['issue'], idempotency_key))
+    result = service.generate_dispute(data['issue'], idempotency_key) 
     return jsonify(result) 
 
 @genix_bp.route('/job-search', methods=['POST']) 
 def job_search(): 
     data = request.json 
-    apis = init_apis()
+    apis = get_apis()
     hub = AIBossHub(apis) 
+    fmt = stream_format(data)
+    if fmt:
+        return streamed_response(fmt, hub.stream_job_search(data['resume']))
     jobs = hub.job_search(data['resume']) 
     return jsonify(jobs) 
 
+@genix_bp.route('/jobs/ingest', methods=['POST']) 
+def jobs_ingest(): 
+    data = request.json or {}
+    jobs = data.get('jobs', [])
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+        return jsonify({"error": "jobs must be a list of objects"}), 400
+    index = get_apis().get('job_index')
+    if index is None:
+        return jsonify({"error": "Job index not configured (set JOB_INDEX_PATH)"}), 400
+    indexed = index.add(jobs)
+    return jsonify({"indexed": indexed, "total": len(index)}) 
+
+@genix_bp.route('/job-search/batch', methods=['POST']) 
+def job_search_batch(): 
+    data = request.json or {}
+    apis = get_apis()
+    if 'resumes' not in data and 'pg_pool' not in apis:
+        return jsonify({"error": "Database not configured; pass resumes explicitly"}), 400
+    hub = AIBossHub(apis) 
+    return jsonify(hub.match_subscriptions(data.get('resumes'), force=bool(data.get('force')))) 
+
 @genix_bp.route('/stripe-webhook', methods=['POST']) 
 def stripe_webhook(): 
-    apis = init_apis()
-    
-    if 'stripe' not in globals() or 'stripe' not in apis:
-        return jsonify({"error": "Stripe not configured"}), 400
-        
+    return ingest_stripe_webhook()
+
+def ingest_stripe_webhook():
+    """Verify a Stripe delivery, persist it and acknowledge; the webhook workers process it"""
+    if 'stripe' not in globals():
+        # A non-2xx answer makes Stripe redeliver the event later
+        return jsonify({"error": "Stripe not available"}), 503
     try:
-        event = stripe.Webhook.construct_event( 
-            request.data, request.headers['Stripe-Signature'], 
-            os.getenv('STRIPE_WEBHOOK_SECRET') 
-        ) 
-        
-        if event['type'] == 'payment_intent.succeeded': 
-            automation = AutomationEngine(apis)
-            automation.automate_workflow("subscription_payment", event['data']) 
-        
-        return "OK", 200
-    except Exception as e:
+        event = construct_stripe_event(
+            stripe, request.get_data(), request.headers.get('Stripe-Signature'),
+            os.getenv('STRIPE_WEBHOOK_SECRET')
+        )
+    except SignatureError as e:
         return jsonify({"error": str(e)}), 400
 
+    apis = get_apis()
+    queue = apis.get('webhook_queue')
+    if queue is None:
+        # A non-2xx answer makes Stripe redeliver the event later
+        return jsonify({"error": "Webhook queue unavailable"}), 503
+    try:
+        created = queue.enqueue(event['id'], event['type'], stripe_customer_key(event), event)
+    except sqlite3.Error as e:
+        print(f"Failed to queue Stripe event {event['id']}: {str(e)}")
+        return jsonify({"error": "Webhook queue unavailable"}), 503
+    workers = apis.get('webhook_workers')
+    if workers is not None:
+        workers.notify()
+    # Redeliveries of an event we already hold are acknowledged without reprocessing
+    return jsonify({"status": "queued" if created else "duplicate"}), 200
+
 # ========== 6. EXECUTION PLAN ========== 
 def print_launch_checklist():
     print("""
@@ -252,7 +787,13 @@ def print_launch_checklist():
     """)
 
 # Function to register the blueprint with a Flask app
+def start_webhook_workers():
+    """Start the webhook workers so events left in the queue by a previous run are processed"""
+    if get_apis().get('webhook_workers') is None:
+        print("Webhook workers not started; they will be retried on the next webhook")
+
 def register_genix_blueprint(app):
     app.register_blueprint(genix_bp, url_prefix='/genix')
+    start_webhook_workers()
     print("Genix Business Ecosystem registered successfully!")
     print_launch_checklist()
\ No newline at end of file
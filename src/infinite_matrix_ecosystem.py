@@ -3,116 +3,303 @@ INFINITE MATRIX ECOSYSTEM - MODULAR API-BASED SYSTEM
 A Flask-based implementation that enables contractors to select tools and build automated workflows.
 """ 
 import os 
-import json 
-from flask import Flask, request, jsonify, Blueprint 
+import threading
+import time
+from dataclasses import asdict
+from flask import request, jsonify
+from services.service_registry import ServiceRegistry
+from services.db_pool import DatabasePool
+from services.workflow_store import WorkflowRepository
+from services.workflow_engine import WorkflowEngine, WorkflowCheckpoints
+from services.llm_concurrency import LLMRuntime
+from services.tool_catalog import ToolCatalog, ToolCatalogStore
+from services.usage_meter import UsageMeter, payload_size
 
-# Import new modules
-from modules.blockchain import BlockchainIntegrator
-from modules.healthcare import HealthcareIntegrator
-from modules.real_estate import RealEstateManager
-from modules.ai_governance import AIModelGovernance
-from modules.voice_ai import VoiceAI
+# Integration modules are imported on first use (web3 and friends are slow to import)
+from modules.registry import LazyModuleRegistry, ModuleLoadError
+from modules.capabilities import CapabilityRegistry
 
 # ========== 1. CORE INFRASTRUCTURE ========== 
-infinite_matrix_bp = Blueprint('infinite_matrix', __name__)
+
+def _tool_limits():
+    """WORKFLOW_TOOL_LIMITS="Zapier=2,Deepgram API=8" caps concurrent steps per tool"""
+    limits = {}
+    for item in filter(None, os.getenv('WORKFLOW_TOOL_LIMITS', '').split(',')):
+        name, _, limit = item.rpartition('=')
+        limits[name.strip()] = int(limit)
+    return limits
+
+def _write_capabilities():
+    """INFINITE_MATRIX_WRITE_CAPABILITIES="blockchain.mint_nft,healthcare.store_medical_record" lets workflow steps run them"""
+    return {
+        tuple(item.strip().split('.', 1))
+        for item in os.getenv('INFINITE_MATRIX_WRITE_CAPABILITIES', '').split(',') if '.' in item
+    }
+
+def build_service_registry() -> ServiceRegistry:
+    """Register the lazily-built clients shared by every Infinite Matrix request"""
+    registry = ServiceRegistry()
+    registry.register('pg_pool', DatabasePool.from_env, health_check=lambda pool: pool.ping(), close=lambda pool: pool.close())
+    registry.register('workflows', lambda: WorkflowRepository(
+        registry.get('pg_pool'),
+        sync_interval=float(os.getenv('WORKFLOW_SYNC_INTERVAL', '5'))
+    ))
+    registry.register('tool_catalog', lambda: ToolCatalogStore.from_env(
+        DEFAULT_TOOLS, registry.get('pg_pool'), TOOL_CAPABILITIES
+    ))
+    registry.register('usage_meter', lambda: UsageMeter.from_env(registry.get('pg_pool')).start(),
+                      close=lambda meter: meter.close())
+    registry.register('modules', lambda: ModuleIntegrator({
+        'infura_url': os.getenv('INFURA_URL'),
+        'doxy_api_key': os.getenv('DOXY_API_KEY'),
+        'yardi_api_key': os.getenv('YARDI_API_KEY'),
+        'deepgram_key': os.getenv('DEEPGRAM_KEY')
+    }, meter=registry['usage_meter'], write_capabilities=_write_capabilities()))
+    # Event loop and per-tool concurrency slots for workflow steps
+    registry.register('workflow_runtime', lambda: LLMRuntime(
+        provider_limits=_tool_limits(),
+        default_limit=int(os.getenv('WORKFLOW_TOOL_CONCURRENCY', '4'))
+    ), close=lambda runtime: runtime.close())
+    registry.register('workflow_engine', lambda: WorkflowEngine(
+        registry['workflow_runtime'],
+        registry['modules'].step_action,
+        WorkflowCheckpoints(registry.get('pg_pool'))
+    ))
+    return registry
+
+_registry: ServiceRegistry = None
+_registry_lock = threading.Lock()
+
+def get_services() -> ServiceRegistry:
+    """Return the process-wide service registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_service_registry()
+    return _registry
 
 # ========== 2. TOOL LIBRARY ========== 
+# Served when neither TOOL_CATALOG_PATH nor a database is configured
+DEFAULT_TOOLS = { 
+    "Website Builders": ["GoDaddy", "Webflow", "Framer"], 
+    "Automation": ["Make.com", "Zapier", "UiPath"], 
+    "AI": ["Meta Llama 4", "Azure OpenAI", "Hugging Face"], 
+    "Payments": ["Stripe", "PayPal", "Square"],
+    "CRM": ["Salesforce", "HubSpot", "Zoho"],
+    "Analytics": ["Google Analytics", "Mixpanel", "Amplitude"],
+    # New tool categories
+    "Blockchain": ["Alchemy API", "OpenZeppelin", "Moralis SDK"],
+    "Healthcare": ["Doxy.me API", "DrChrono EHR", "AWS HIPAA Buckets"],
+    "Real Estate": ["Yardi API", "RentManager", "DocuSign API"],
+    "AI Governance": ["H2O.ai", "DataRobot API", "IBM Watson OpenScale"],
+    "Voice AI": ["Deepgram API", "Hugging Face Transformers", "Rasa"]
+} 
+
+# Read from the module sources once at startup (the modules themselves are not imported)
+CAPABILITIES = CapabilityRegistry()
+MODULE_CAPABILITIES = CAPABILITIES.names_by_module()
+
+# Tools in a category served by a module run on that module (e.g. "Voice AI" -> voice_ai)
+MODULE_NAMES = list(MODULE_CAPABILITIES)
+TOOL_MODULES = {
+    tool: category.lower().replace(' ', '_')
+    for category, tools in DEFAULT_TOOLS.items()
+    if category.lower().replace(' ', '_') in MODULE_NAMES
+    for tool in tools
+}
+TOOL_CAPABILITIES = {tool: MODULE_CAPABILITIES[module] for tool, module in TOOL_MODULES.items()}
+# Capabilities the HTTP endpoint may call directly: read-only ones. Anything that mints, stores
+# records, books or creates (mint_nft, store_medical_record, ...) only runs as a workflow step,
+# and only once the operator enables it in INFINITE_MATRIX_WRITE_CAPABILITIES.
+HTTP_CAPABILITIES = {
+    'blockchain': {'verify_smart_contract', 'get_token_balance', 'get_balances', 'scan_portfolio'},
+    'healthcare': {'check_hipaa_compliance'},
+    'real_estate': {'property_analytics', 'generate_market_report'},
+    'ai_governance': {'detect_bias', 'predict_revenue', 'model_monitoring', 'explainable_ai_report'},
+    'voice_ai': {'transcribe_call', 'detect_sentiment', 'generate_call_summary'}
+}
+
 class ToolLibrary: 
-    def __init__(self): 
-        self.tools = { 
-            "Website Builders": ["GoDaddy", "Webflow", "Framer"], 
-            "Automation": ["Make.com", "Zapier", "UiPath"], 
-            "AI": ["Meta Llama 4", "Azure OpenAI", "Hugging Face"], 
-            "Payments": ["Stripe", "PayPal", "Square"],
-            "CRM": ["Salesforce", "HubSpot", "Zoho"],
-            "Analytics": ["Google Analytics", "Mixpanel", "Amplitude"],
-            # New tool categories
-            "Blockchain": ["Alchemy API", "OpenZeppelin", "Moralis SDK"],
-            "Healthcare": ["Doxy.me API", "DrChrono EHR", "AWS HIPAA Buckets"],
-            "Real Estate": ["Yardi API", "RentManager", "DocuSign API"],
-            "AI Governance": ["H2O.ai", "DataRobot API", "IBM Watson OpenScale"],
-            "Voice AI": ["Deepgram API", "Hugging Face Transformers", "Rasa"]
-        } 
+    def __init__(self, catalog: ToolCatalog = None): 
+        self.catalog = catalog or get_services()['tool_catalog'].get()
+
+    @property
+    def tools(self):
+        return self.catalog.names_by_category()
 
     def get_tools_by_category(self, category=None): 
         if category:
-            return self.tools.get(category, [])
+            return [tool.name for tool in self.catalog.category(category)]
         return self.tools
 
+    def get_tools_by_capability(self, capability):
+        return [tool.to_dict() for tool in self.catalog.with_capability(capability)]
+
+    def search(self, query, limit=10):
+        """Prefix and typo-tolerant matches for the tool picker"""
+        return [tool.to_dict() for tool in self.catalog.search(query, limit)]
+
+def catalog_response(payload, catalog: ToolCatalog, max_age: int = 60):
+    """JSON response validated by the catalog's ETag (304 when the client's copy is current)"""
+    response = jsonify(payload)
+    response.set_etag(catalog.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
 # ========== 3. WORKFLOW BUILDER ========== 
 class WorkflowBuilder: 
+    def __init__(self, repository: WorkflowRepository = None):
+        self.repository = repository or get_services()['workflows']
+
     def create(self, user_id, tools, name="New Workflow", description=""): 
-        # Logic to generate automation workflows 
-        return { 
-            "workflow_id": "wf_" + str(hash(str(user_id) + str(tools)))[0:8], 
-            "tools": tools, 
-            "name": name,
-            "status": "draft" 
-        } 
-
-# ========== 4. API ROUTES ========== 
-@infinite_matrix_bp.route('/tools', methods=['GET']) 
-def get_tools(): 
-    tool_lib = ToolLibrary() 
-    category = request.args.get('category') 
-    tools = tool_lib.get_tools_by_category(category) 
-    return jsonify(tools) 
-
-@infinite_matrix_bp.route('/workflows', methods=['POST']) 
-def create_workflow(): 
-    workflow_builder = WorkflowBuilder() 
-    
-    user_id = request.json.get('user_id')
-    tools = request.json.get('tools', [])
-    name = request.json.get('name', 'New Workflow')
-    description = request.json.get('description', '')
-    
-    workflow = workflow_builder.create(user_id, tools, name, description)
-    return jsonify(workflow)
-
-# ========== 5. MODULE INTEGRATORS ========== 
+        """Create a draft workflow; it is persisted before the id is returned"""
+        return self.repository.create(user_id, tools, name, description).to_dict()
+
+    def get_workflow(self, workflow_id):
+        workflow = self.repository.get(workflow_id)
+        return workflow.to_dict() if workflow else None
+
+    def list_workflows(self, user_id=None, tool=None):
+        """Workflows owned by user_id and/or using tool"""
+        if user_id is not None:
+            workflows = self.repository.list_by_user(user_id)
+            if tool:
+                workflows = [workflow for workflow in workflows
+                             if tool.casefold() in (name.casefold() for name in workflow.tool_names)]
+        else:
+            workflows = self.repository.list_by_tool(tool) if tool else []
+        return [workflow.to_dict() for workflow in workflows]
+
+    def run(self, workflow_id, run_id=None):
+        """Execute a workflow, or resume run_id from its last successful steps; None if it does not exist"""
+        workflow = self.repository.get(workflow_id)
+        if workflow is None:
+            return None
+        try:
+            report = get_services()['workflow_engine'].execute(workflow, run_id)
+        except ValueError as e:
+            return {"error": str(e)}
+        self.repository.set_status(workflow_id, report.status)
+        return report.to_dict()
+
+    def get_run(self, workflow_id, run_id):
+        loaded = get_services()['workflow_engine'].checkpoints.load(run_id)
+        if loaded is None or loaded[0] != workflow_id:
+            return None
+        _, status, steps = loaded
+        return {
+            "run_id": run_id,
+            "workflow_id": workflow_id,
+            "status": status,
+            "steps": {key: asdict(record) for key, record in steps.items()}
+        }
+
+# ========== 4. MODULE INTEGRATORS ========== 
+class CapabilityNotAllowed(ValueError):
+    """The capability writes data and has not been enabled for this caller"""
+
 class ModuleIntegrator:
-    def __init__(self, config=None):
+    def __init__(self, config=None, modules=None, capabilities: CapabilityRegistry = None,
+                 meter: UsageMeter = None, write_capabilities=()):
+        """modules maps module names to ready instances (e.g. local stubs) used instead of the real clients
+
+        write_capabilities holds the (module, capability) pairs beyond the
+        read-only ones that workflow steps may run; it comes from server
+        configuration, never from a workflow's own config.
+        """
         self.config = config or {}
-        # Initialize module instances with appropriate API keys
-        self.blockchain = BlockchainIntegrator(provider_url=self.config.get('infura_url'))
-        self.healthcare = HealthcareIntegrator(api_key=self.config.get('doxy_api_key'))
-        self.real_estate = RealEstateManager(yardi_api_key=self.config.get('yardi_api_key'))
-        self.ai_governance = AIModelGovernance()
-        self.voice_ai = VoiceAI(deepgram_key=self.config.get('deepgram_key'))
-    
+        self.write_capabilities = frozenset(write_capabilities)
+        # Modules are imported and constructed the first time they are used
+        self.registry = LazyModuleRegistry(self.config, instances=modules)
+        self.capabilities = capabilities or CAPABILITIES
+        # (module, capability) -> bound method, looked up once per worker
+        self._bound = {}
+        self.meter = meter
+
+    def available_modules(self):
+        return self.registry.names()
+
     def get_module(self, module_name):
-        modules = {
-            'blockchain': self.blockchain,
-            'healthcare': self.healthcare,
-            'real_estate': self.real_estate,
-            'ai_governance': self.ai_governance,
-            'voice_ai': self.voice_ai
-        }
-        return modules.get(module_name)
-
-# Additional API routes for new modules
-@infinite_matrix_bp.route('/modules', methods=['GET'])
-def get_available_modules():
-    module_integrator = ModuleIntegrator()
-    available_modules = [
-        'blockchain', 'healthcare', 'real_estate', 'ai_governance', 'voice_ai'
-    ]
-    return jsonify(available_modules)
-
-@infinite_matrix_bp.route('/modules/<module_name>/capabilities', methods=['GET'])
-def get_module_capabilities(module_name):
-    capabilities = {
-        'blockchain': ['mint_nft', 'create_dao_proposal', 'verify_smart_contract', 'get_token_balance'],
-        'healthcare': ['create_telemed_session', 'check_hipaa_compliance', 'schedule_appointment', 'store_medical_record'],
-        'real_estate': ['sync_property_listings', 'automate_lease_agreements', 'property_analytics', 'schedule_property_showing', 'generate_market_report'],
-        'ai_governance': ['detect_bias', 'predict_revenue', 'model_monitoring', 'explainable_ai_report'],
-        'voice_ai': ['transcribe_call', 'detect_sentiment', 'generate_call_summary', 'create_chatbot']
-    }
-    return jsonify(capabilities.get(module_name, []))
+        return self.registry.get(module_name)
+
+    def allows(self, module_name, name, writes=False):
+        """Whether name is read-only, or writes is set and the operator enabled it"""
+        if name in HTTP_CAPABILITIES.get(module_name, ()):
+            return True
+        return writes and (module_name, name) in self.write_capabilities
+
+    def capability(self, module_name, name):
+        """The capability and its bound method; raises ValueError if either is unknown"""
+        capability = self.capabilities.get(module_name, name)
+        if capability is None:
+            raise ValueError(f"Module '{module_name}' has no capability '{name}'")
+        fn = self._bound.get((module_name, name))
+        if fn is None:
+            try:
+                module = self.get_module(module_name)
+            except ModuleLoadError as e:
+                raise ValueError(str(e))
+            fn = self._bound[(module_name, name)] = getattr(module, name)
+        return capability, fn
+
+    def _call(self, module_name, name, fn, kwargs, user_id=None, tool=None, bytes_in=None):
+        """Run fn(**kwargs), metering its latency, outcome and payload sizes"""
+        if self.meter is None:
+            return fn(**kwargs)
+        started = time.perf_counter()
+        ok, result = False, None
+        try:
+            result = fn(**kwargs)
+            ok = True
+            return result
+        finally:
+            self.meter.record(
+                user_id, tool or module_name, name, time.perf_counter() - started, ok,
+                payload_size(kwargs) if bytes_in is None else bytes_in, payload_size(result)
+            )
+
+    def invoke(self, module_name, name, params=None, user_id=None, tool=None, bytes_in=None):
+        """Call a read-only capability with keyword params checked against its signature
+
+        Capabilities that write data only run as workflow steps (see step_action).
+        """
+        params = params or {}
+        # Refuse before the module is loaded
+        if self.capabilities.get(module_name, name) is not None and not self.allows(module_name, name):
+            raise CapabilityNotAllowed(f"{module_name}.{name} can only run as a workflow step")
+        capability, fn = self.capability(module_name, name)
+        capability.check(params)
+        return self._call(module_name, name, fn, params, user_id, tool, bytes_in)
+
+    def step_action(self, step, user_id=None):
+        """Callable for a workflow step's config {"action", "params"}
+
+        The step runs on the module serving its tool's category; a "module"
+        in the config may only repeat that. Capabilities that write data must
+        be enabled in write_capabilities. Actions that accept an `upstream`
+        argument also receive the outputs of the steps they depend on.
+        """
+        module_name = TOOL_MODULES.get(step.name)
+        action = step.config.get('action')
+        if not module_name or not action:
+            raise ValueError(f"Step '{step.name}' has no runnable action (module={module_name}, action={action})")
+        configured = step.config.get('module')
+        if configured and configured != module_name:
+            raise ValueError(f"Step '{step.name}' runs on module '{module_name}', not '{configured}'")
+        if self.capabilities.get(module_name, action) is not None and not self.allows(module_name, action, writes=True):
+            raise CapabilityNotAllowed(f"{module_name}.{action} writes data and is not enabled on this server")
+        capability, fn = self.capability(module_name, action)
+        if capability.accepts_upstream:
+            return lambda params, upstream: self._call(
+                module_name, action, fn, {**params, 'upstream': upstream}, user_id, step.name)
+        return lambda params, upstream: self._call(module_name, action, fn, params, user_id, step.name)
 
 # Register blueprint function
 def register_infinite_matrix_blueprint(app):
-    """Register the Infinite Matrix blueprint with the Flask app"""
-    app.register_blueprint(infinite_matrix_bp, url_prefix='/infinite-matrix/api')
-    return app
\ No newline at end of file
+    """Register the Infinite Matrix routes (routes/infinite_matrix.py) with the Flask app"""
+    from routes.infinite_matrix import infinite_matrix_routes
+    if infinite_matrix_routes.name not in app.blueprints:
+        app.register_blueprint(infinite_matrix_routes, url_prefix='/infinite-matrix/api')
+    return app
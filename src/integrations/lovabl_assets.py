@@ -0,0 +1,208 @@
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import os
+import secrets
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = ".lovabl_manifest.json"
+
+@dataclass
+class AssetRecord:
+    path: Path
+    relpath: str
+    size: int
+    sha256: str
+
+@dataclass
+class AssetSyncResult:
+    uploaded: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    # The exception behind each failure, so callers can tell throttling and 5xx from rejections
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+class AssetManifest:
+    """Local cache of asset content hashes and of what each listing already received
+
+    Files are only re-hashed when their size or mtime changes. For every
+    listing the manifest records the content hash of each asset path sent to
+    it, so unchanged assets are not sent again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {'files': {}, 'listings': {}}
+        if self.path.exists():
+            try:
+                self.data.update(json.loads(self.path.read_text()))
+            except ValueError:
+                print(f"Ignoring unreadable asset manifest at {self.path}")
+        self.data.setdefault('listings', {})
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(self.data))
+            os.replace(tmp_path, self.path)
+
+    def hash_file(self, path: Path, relpath: str) -> AssetRecord:
+        stat = path.stat()
+        cached = self.data['files'].get(relpath)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return AssetRecord(path, relpath, stat.st_size, cached['sha256'])
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        with self._lock:
+            self.data['files'][relpath] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest.hexdigest()
+            }
+        return AssetRecord(path, relpath, stat.st_size, digest.hexdigest())
+
+    def was_sent(self, listing_id: str, record: AssetRecord) -> bool:
+        return self.data['listings'].get(listing_id, {}).get(record.relpath) == record.sha256
+
+    def mark_sent(self, listing_id: str, record: AssetRecord):
+        with self._lock:
+            self.data['listings'].setdefault(listing_id, {})[record.relpath] = record.sha256
+
+class MultipartFile:
+    """A single-file multipart/form-data body read from disk as it is sent
+
+    Only the part headers live in memory; file bytes are read in whatever
+    block size the HTTP client asks for. It reports its length (so the request
+    gets a Content-Length) and supports tell/seek, which lets urllib3 rewind
+    it when the marketplace client's retry policy resends the request.
+    """
+
+    def __init__(self, record: AssetRecord, field_name: str = "files"):
+        self.boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        filename = record.path.name.replace('"', '%22')
+        self._head = (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{field_name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._size = record.size
+        self._file = open(record.path, 'rb')
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._head) + self._size + len(self._tail)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self._pos = offset if whence == 0 else self._pos + offset if whence == 1 else len(self) + offset
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self) if size is None or size < 0 else min(len(self), self._pos + size)
+        out = []
+        body_start, body_end = len(self._head), len(self._head) + self._size
+        if self._pos < body_start:
+            out.append(self._head[self._pos:min(end, body_start)])
+        if end > body_start and self._pos < body_end:
+            start = max(self._pos, body_start)
+            self._file.seek(start - body_start)
+            out.append(self._file.read(min(end, body_end) - start))
+        if end > body_end:
+            out.append(self._tail[max(self._pos, body_end) - body_end:end - body_end])
+        self._pos = end
+        return b''.join(out)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'MultipartFile':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class AssetSync:
+    """Sends only new or changed assets to a Lovabl listing
+
+    Assets go to the multipart POST /listings/{id}/assets endpoint the client
+    has always used, one file per request. Each body is streamed from disk,
+    and at most max_open_files files are open at once. Which assets a listing
+    already has is tracked client-side in the manifest (path and content
+    hash), so unchanged files are skipped without asking the server.
+    """
+
+    def __init__(self, marketplace, manifest: Optional[AssetManifest] = None, max_open_files: int = 4):
+        self.marketplace = marketplace
+        self.manifest = manifest
+        self.max_open_files = max_open_files
+        self._open_files = threading.BoundedSemaphore(max_open_files)
+
+    def scan(self, assets_dir: Path) -> List[AssetRecord]:
+        """Hash every asset under assets_dir, reusing cached hashes for unchanged files"""
+        manifest = self._manifest_for(assets_dir)
+        paths = [
+            path for path in sorted(assets_dir.glob("**/*"))
+            if path.is_file() and path.name != MANIFEST_NAME and not path.name.endswith('.tmp')
+        ]
+
+        def hash_file(path: Path) -> AssetRecord:
+            with self._open_files:
+                return manifest.hash_file(path, path.relative_to(assets_dir).as_posix())
+
+        with ThreadPoolExecutor(max_workers=self.max_open_files) as executor:
+            return list(executor.map(hash_file, paths))
+
+    def _manifest_for(self, assets_dir: Path) -> AssetManifest:
+        if self.manifest is None:
+            self.manifest = AssetManifest(assets_dir / MANIFEST_NAME)
+        return self.manifest
+
+    def _upload_multipart(self, listing_id: str, record: AssetRecord, idempotency_key: Optional[str]):
+        headers = {'Idempotency-Key': f"{idempotency_key}:{record.sha256}"} if idempotency_key else {}
+        with self._open_files, MultipartFile(record) as body:
+            headers['Content-Type'] = body.content_type
+            response = self.marketplace._request(
+                "POST", f"/listings/{listing_id}/assets", headers=headers, data=body
+            )
+        response.raise_for_status()
+
+    def sync(self, listing_id: str, assets_dir: Path, idempotency_key: Optional[str] = None) -> AssetSyncResult:
+        """Send the assets that are new or changed since they were last sent to this listing"""
+        records = self.scan(assets_dir)
+        result = AssetSyncResult()
+        missing = []
+        for record in records:
+            if self.manifest.was_sent(listing_id, record):
+                result.skipped.append(record.relpath)
+            else:
+                missing.append(record)
+
+        def upload(record: AssetRecord):
+            try:
+                self._upload_multipart(listing_id, record, idempotency_key)
+                self.manifest.mark_sent(listing_id, record)
+                result.uploaded.append(record.relpath)
+            except Exception as e:
+                result.failed[record.relpath] = str(e)
+                result.errors[record.relpath] = e
+
+        with ThreadPoolExecutor(max_workers=self.max_open_files) as executor:
+            list(executor.map(upload, missing))
+        self.manifest.save()
+        return result
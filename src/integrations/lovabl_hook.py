@@ -1,8 +1,23 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
+import asyncio
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 import requests
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from .lovabl_assets import AssetSync
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 @dataclass
 class ProductSpec:
@@ -12,16 +27,90 @@ class ProductSpec:
     branding: Dict[str, Any]
     assets_dir: Path
 
+@dataclass(frozen=True)
+class LovablClientConfig:
+    """Connection settings shared by the sync and async marketplace clients"""
+    base_url: str = field(default_factory=lambda: os.getenv("LOVABL_API_URL", "https://api.lovabl.dev/v1"))
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    max_backoff: float = 30.0
+    max_connections: int = 32
+    max_concurrency: int = 16
+    keepalive_timeout: float = 60.0
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
 class LovablMarketplace:
-    def __init__(self, api_key: str):
+    """Synchronous Lovabl client on a pooled keep-alive session"""
+
+    def __init__(self, api_key: str, config: Optional[LovablClientConfig] = None):
         self.api_key = api_key
-        self.base_url = "https://api.lovabl.dev/v1"
+        self.config = config or LovablClientConfig()
+        self.base_url = self.config.base_url
         self.headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-    
-    def create_listing(self, product_spec: ProductSpec) -> Dict[str, Any]:
+        self.timeout = (self.config.connect_timeout, self.config.read_timeout)
+        self._limiter = threading.BoundedSemaphore(self.config.max_concurrency)
+
+        # Writes carry idempotency keys, so POSTs are safe to retry on throttling and 5xx
+        retry = Retry(
+            total=self.config.max_retries,
+            backoff_factor=self.config.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config.max_connections,
+            pool_maxsize=self.config.max_connections,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._asset_syncs: Dict[Path, AssetSync] = {}
+
+    def async_client(self, **overrides) -> 'AsyncLovablMarketplace':
+        """Async facade sharing this client's credentials and configuration"""
+        return AsyncLovablMarketplace(self.api_key, replace(self.config, **overrides))
+
+    def close(self):
+        self.session.close()
+
+    def _headers(self, idempotency_key: Optional[str] = None, json_body: bool = True) -> Dict[str, str]:
+        """Request headers, with an Idempotency-Key so retried writes are applied once"""
+        headers = dict(self.headers) if json_body else {"Authorization": f"Bearer {self.api_key}"}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return headers
+
+    def _request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        request_headers = {"Authorization": f"Bearer {self.api_key}", **(headers or {})}
+        with self._limiter:
+            return self.session.request(
+                method, f"{self.base_url}{path}", headers=request_headers, timeout=self.timeout, **kwargs
+            )
+
+    def _post(self, path: str, **kwargs) -> requests.Response:
+        return self._request("POST", path, **kwargs)
+
+    def create_listing(self, product_spec: ProductSpec, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """Create a new product listing on Lovabl marketplace"""
         payload = {
             "name": product_spec.name,
@@ -29,64 +118,179 @@ class LovablMarketplace:
             "price_tiers": product_spec.price_tiers,
             "branding": product_spec.branding
         }
-        
-        response = requests.post(
-            f"{self.base_url}/listings",
-            headers=self.headers,
-            json=payload
-        )
+
+        response = self._post("/listings", headers=self._headers(idempotency_key), json=payload)
         response.raise_for_status()
         return response.json()
-    
-    def upload_assets(self, listing_id: str, assets_dir: Path) -> bool:
-        """Upload product assets to Lovabl CDN"""
-        files = []
-        for file_path in assets_dir.glob("**/*"):
-            if file_path.is_file():
-                files.append(
-                    ("files", (file_path.name, open(file_path, "rb")))
-                )
-        
-        response = requests.post(
-            f"{self.base_url}/listings/{listing_id}/assets",
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            files=files
+
+    def upload_assets(self, listing_id: str, assets_dir: Path, idempotency_key: Optional[str] = None) -> bool:
+        """Upload the assets the listing does not already have to Lovabl CDN
+
+        Raises the first failure (e.g. the requests.HTTPError of a 503) once
+        every asset has been tried; assets that made it are not sent again.
+        """
+        asset_sync = self._asset_syncs.setdefault(Path(assets_dir).resolve(), AssetSync(self))
+        result = asset_sync.sync(listing_id, Path(assets_dir), idempotency_key)
+        for relpath, error in result.failed.items():
+            print(f"Failed to upload asset {relpath} for listing {listing_id}: {error}")
+        if result.errors:
+            raise next(iter(result.errors.values()))
+        return True
+
+    def enable_payment_processing(self, listing_id: str, genix_key: str, idempotency_key: Optional[str] = None) -> bool:
+        """Enable Genix Bank payment processing for a listing"""
+        payload = {
+            "payment_provider": "genix",
+            "provider_key": genix_key
+        }
+
+        response = self._post(
+            f"/listings/{listing_id}/payments",
+            headers=self._headers(idempotency_key),
+            json=payload
         )
-        return response.status_code == 200
-    
-    def enable_payment_processing(self, listing_id: str, genix_key: str) -> bool:
+        response.raise_for_status()
+        return True
+
+class AsyncLovablMarketplace:
+    """Async Lovabl client on a persistent aiohttp session
+
+    The session is opened lazily on first use inside the running event loop and
+    kept alive until close(). Requests are bounded by a concurrency limiter and
+    retried on 429/5xx with jittered backoff that honors Retry-After.
+    """
+
+    def __init__(self, api_key: str, config: Optional[LovablClientConfig] = None):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for AsyncLovablMarketplace. Install with 'pip install aiohttp'.")
+        self.api_key = api_key
+        self.config = config or LovablClientConfig()
+        self.base_url = self.config.base_url
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._limiter: Optional[asyncio.Semaphore] = None
+        self._sync_client: Optional[LovablMarketplace] = None
+
+    async def __aenter__(self) -> 'AsyncLovablMarketplace':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.max_connections,
+                keepalive_timeout=self.config.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=self.config.connect_timeout,
+                sock_read=self.config.read_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._limiter = asyncio.Semaphore(self.config.max_concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    def _headers(self, idempotency_key: Optional[str] = None, json_body: bool = True) -> Dict[str, str]:
+        headers = dict(self.headers) if json_body else {"Authorization": f"Bearer {self.api_key}"}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return headers
+
+    async def _request(self, method: str, path: str, **kwargs) -> 'aiohttp.ClientResponse':
+        """Send a request, retrying throttling, 5xx and transport errors
+
+        The returned response has its body read, so it can be used after the
+        connection is released back to the pool.
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self._limiter:
+                    async with session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                        await response.read()
+                if response.status not in RETRY_STATUSES or attempt >= self.config.max_retries:
+                    return response
+                retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.config.max_retries:
+                    raise
+
+            backoff = min(self.config.max_backoff, self.config.backoff_factor * 2 ** attempt)
+            await asyncio.sleep(retry_after if retry_after is not None else random.uniform(0, backoff))
+            attempt += 1
+
+    async def create_listing(self, product_spec: ProductSpec, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new product listing on Lovabl marketplace"""
+        payload = {
+            "name": product_spec.name,
+            "description": product_spec.description,
+            "price_tiers": product_spec.price_tiers,
+            "branding": product_spec.branding
+        }
+
+        response = await self._request("POST", "/listings", headers=self._headers(idempotency_key), json=payload)
+        response.raise_for_status()
+        return await response.json()
+
+    async def upload_assets(self, listing_id: str, assets_dir: Path, idempotency_key: Optional[str] = None) -> bool:
+        """Upload the assets the listing does not already have to Lovabl CDN
+
+        Asset sync hashes and streams files from disk, so it runs on the pooled sync
+        client in a worker thread.
+        """
+        if self._sync_client is None:
+            self._sync_client = LovablMarketplace(self.api_key, self.config)
+        return await asyncio.to_thread(self._sync_client.upload_assets, listing_id, assets_dir, idempotency_key)
+
+    async def enable_payment_processing(self, listing_id: str, genix_key: str, idempotency_key: Optional[str] = None) -> bool:
         """Enable Genix Bank payment processing for a listing"""
         payload = {
             "payment_provider": "genix",
             "provider_key": genix_key
         }
-        
-        response = requests.post(
-            f"{self.base_url}/listings/{listing_id}/payments",
-            headers=self.headers,
+
+        response = await self._request(
+            "POST",
+            f"/listings/{listing_id}/payments",
+            headers=self._headers(idempotency_key),
             json=payload
         )
-        return response.status_code == 200
+        response.raise_for_status()
+        return True
 
 def deploy_to_lovabl(product_spec: ProductSpec) -> str:
     """Deploy a product to Lovabl marketplace"""
     api_key = os.getenv("LOVABL_API_KEY")
     if not api_key:
         raise ValueError("LOVABL_API_KEY environment variable not set")
-    
+
     marketplace = LovablMarketplace(api_key)
-    
+
     # Create listing
     listing = marketplace.create_listing(product_spec)
     listing_id = listing["id"]
-    
+
     # Upload assets
     if not marketplace.upload_assets(listing_id, product_spec.assets_dir):
         raise RuntimeError("Failed to upload assets")
-    
+
     # Enable payment processing
     genix_key = os.getenv("GENIX_KEY")
     if genix_key and not marketplace.enable_payment_processing(listing_id, genix_key):
         raise RuntimeError("Failed to enable payment processing")
-    
-    return f"https://lovabl.dev/listings/{listing_id}" 
\ No newline at end of file
+
+    return f"https://lovabl.dev/listings/{listing_id}"
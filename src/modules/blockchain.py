@@ -1,31 +1,71 @@
-""" 
+"""
 BLOCKCHAIN INTEGRATION MODULE - INFINITE MATRIX ECOSYSTEM
 Provides Web3, NFT, and DAO governance capabilities for the Infinite Matrix Ecosystem.
-""" 
-from web3 import Web3 
-import json 
-
-class BlockchainIntegrator: 
-    def __init__(self, provider_url="https://mainnet.infura.io/v3/YOUR_KEY"): 
-        self.w3 = Web3(Web3.HTTPProvider(provider_url)) 
-    
-    def mint_nft(self, contract_address, private_key, metadata_uri): 
-        # Load ABI (simplified example) 
-        with open('erc721_abi.json') as f: 
-            abi = json.load(f) 
-        
-        contract = self.w3.eth.contract(address=contract_address, abi=abi) 
-        tx = contract.functions.mintNFT(metadata_uri).build_transaction({ 
-            'nonce': self.w3.eth.get_transaction_count(self.w3.eth.defaultAccount), 
-            'gas': 200000 
-        }) 
-        signed_tx = self.w3.eth.account.sign_transaction(tx, private_key) 
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction) 
-        return tx_hash.hex() 
-
-    def create_dao_proposal(self, dao_contract, proposal_data): 
-        # Example: Snapshot.org-style off-chain voting 
-        return {"proposal_id": "dao_123", "status": "pending"} 
+"""
+from functools import lru_cache
+import json
+
+try:
+    from web3 import Web3
+except ImportError:
+    # Only needed to encode and sign transactions; balance queries use JSON-RPC directly
+    Web3 = None
+
+from services.eth_rpc import JsonRpcClient, NonceManager, RpcError, from_hex, from_wei
+from services.portfolio_scanner import PortfolioScanner
+
+DEFAULT_PROVIDER_URL = "https://mainnet.infura.io/v3/YOUR_KEY"
+
+@lru_cache(maxsize=None)
+def load_abi(path):
+    """ABI files are read once per process"""
+    with open(path) as f:
+        return json.load(f)
+
+class BlockchainIntegrator:
+    def __init__(self, provider_url=DEFAULT_PROVIDER_URL, abi_path='erc721_abi.json', max_batch=100,
+                 scan_concurrency=4):
+        # provider_url may be a node or a local dev chain (http://127.0.0.1:8545)
+        provider_url = provider_url or DEFAULT_PROVIDER_URL
+        self.rpc = JsonRpcClient.from_url(provider_url, max_batch=max_batch)
+        self.nonces = NonceManager(self.rpc)
+        self.scanner = PortfolioScanner(self.rpc, concurrency=scan_concurrency)
+        self.abi_path = abi_path
+        self.w3 = Web3(Web3.HTTPProvider(provider_url)) if Web3 is not None and provider_url.startswith('http') else None
+        # Contract objects by address, built once
+        self._contracts = {}
+
+    def _contract(self, contract_address):
+        contract = self._contracts.get(contract_address)
+        if contract is None:
+            contract = self.w3.eth.contract(address=contract_address, abi=load_abi(self.abi_path))
+            self._contracts[contract_address] = contract
+        return contract
+
+    def mint_nft(self, contract_address, private_key, metadata_uri):
+        if self.w3 is None:
+            raise RuntimeError("Minting needs web3 and an http(s) provider URL")
+        account = self.w3.eth.account.from_key(private_key)
+        # Nonces are counted locally so concurrent mints from one account don't collide
+        nonce = self.nonces.reserve(account.address)
+        try:
+            tx = self._contract(contract_address).functions.mintNFT(metadata_uri).build_transaction({
+                'from': account.address,
+                'nonce': nonce,
+                'gas': 200000
+            })
+            signed_tx = account.sign_transaction(tx)
+            # eth-account renamed rawTransaction to raw_transaction (web3 7)
+            raw = getattr(signed_tx, 'raw_transaction', None) or signed_tx.rawTransaction
+            return self.rpc.call('eth_sendRawTransaction', ['0x' + bytes(raw).hex()])
+        except Exception:
+            # The nonce was not used (or was rejected); start again from the node's count
+            self.nonces.resync(account.address)
+            raise
+
+    def create_dao_proposal(self, dao_contract, proposal_data):
+        # Example: Snapshot.org-style off-chain voting
+        return {"proposal_id": "dao_123", "status": "pending"}
 
     def verify_smart_contract(self, contract_address):
         # Verify contract on Etherscan or similar service
@@ -34,8 +74,24 @@ class BlockchainIntegrator:
     def get_token_balance(self, wallet_address, token_address=None):
         # Get ETH balance if token_address is None, otherwise get ERC20 balance
         if token_address is None:
-            balance = self.w3.eth.get_balance(wallet_address)
-            return self.w3.from_wei(balance, 'ether')
+            balance = from_hex(self.rpc.call('eth_getBalance', [wallet_address, 'latest']))
+            return from_wei(balance)
         else:
-            # Would need ERC20 ABI and contract interaction
-            return 0.0
\ No newline at end of file
+            # ERC20 balanceOf, scaled by the token's decimals
+            _, found = self.scanner.balances([wallet_address], [token_address])
+            balance = found[(wallet_address.lower(), token_address.lower())]
+            if balance is None:
+                raise ValueError(f"balanceOf failed for token {token_address}")
+            return from_wei(balance, self.scanner.decimals([token_address])[token_address])
+
+    def get_balances(self, wallet_addresses):
+        # ETH balance of many wallets in batched JSON-RPC requests (None where the node returned an error)
+        balances = self.rpc.get_balances(wallet_addresses)
+        return {
+            address: None if isinstance(balance, RpcError) else from_wei(balance)
+            for address, balance in zip(wallet_addresses, balances)
+        }
+
+    def scan_portfolio(self, wallet_addresses, token_addresses=None):
+        # ETH and ERC20 balances of every wallet at one block, as a wallets x assets matrix
+        return self.scanner.scan(wallet_addresses, token_addresses or []).to_dict()
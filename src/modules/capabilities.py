@@ -0,0 +1,140 @@
+"""
+CAPABILITY REGISTRY - INFINITE MATRIX ECOSYSTEM
+Describes what each integration module can do, read from the module sources.
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from pathlib import Path
+import ast
+
+from .registry import ModuleSpec, MODULE_SPECS
+
+MODULES_DIR = Path(__file__).resolve().parent
+
+# A capability with this parameter also receives the outputs of upstream workflow steps
+UPSTREAM_PARAM = 'upstream'
+
+@dataclass(frozen=True)
+class Parameter:
+    name: str
+    required: bool = True
+    default: Any = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'required': self.required, 'default': self.default}
+
+@dataclass(frozen=True)
+class Capability:
+    """A public method of a module class"""
+    module: str
+    name: str
+    params: Tuple[Parameter, ...] = ()
+    summary: Optional[str] = None
+    accepts_upstream: bool = False
+    accepts_extra: bool = False
+    required: frozenset = field(default=frozenset(), compare=False)
+    allowed: frozenset = field(default=frozenset(), compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'params': [param.to_dict() for param in self.params],
+            'summary': self.summary,
+            'accepts_upstream': self.accepts_upstream
+        }
+
+    def check(self, params: Dict[str, Any]):
+        """Raise ValueError if params are missing a required argument or name an unknown one"""
+        missing = self.required.difference(params)
+        if missing:
+            raise ValueError(f"{self.module}.{self.name} is missing parameters: {', '.join(sorted(missing))}")
+        if not self.accepts_extra:
+            unknown = set(params).difference(self.allowed)
+            if unknown:
+                raise ValueError(f"{self.module}.{self.name} does not accept parameters: {', '.join(sorted(unknown))}")
+
+def _default(node: ast.expr) -> Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return ast.unparse(node)
+
+def _summary(function: ast.FunctionDef, lines: List[str]) -> Optional[str]:
+    """The method's docstring, or the comment opening its body"""
+    doc = ast.get_docstring(function)
+    if doc:
+        return doc.strip().splitlines()[0]
+    for line in lines[function.lineno:function.body[0].lineno]:
+        line = line.strip()
+        if line.startswith('#'):
+            return line.lstrip('#').strip() or None
+    return None
+
+def _capability(module: str, function: ast.FunctionDef, lines: List[str]) -> Capability:
+    args = function.args
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    pairs = list(zip(positional, defaults))[1:]  # drop self
+    pairs += list(zip(args.kwonlyargs, args.kw_defaults))
+
+    params = tuple(
+        Parameter(arg.arg, default is None, _default(default) if default is not None else None)
+        for arg, default in pairs if arg.arg != UPSTREAM_PARAM
+    )
+    return Capability(
+        module, function.name, params, _summary(function, lines),
+        accepts_upstream=any(arg.arg == UPSTREAM_PARAM for arg, _ in pairs),
+        accepts_extra=args.kwarg is not None,
+        required=frozenset(param.name for param in params if param.required),
+        allowed=frozenset(param.name for param in params)
+    )
+
+def inspect_module(spec: ModuleSpec, directory: Path = MODULES_DIR) -> List[Capability]:
+    """Public methods of a module's class, read with ast so the module is never imported"""
+    source = (directory / f"{spec.module}.py").read_text()
+    lines = source.splitlines()
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef) and node.name == spec.class_name:
+            return [
+                _capability(spec.name, item, lines) for item in node.body
+                if isinstance(item, ast.FunctionDef) and not item.name.startswith('_')
+            ]
+    raise LookupError(f"{spec.module}.py does not define {spec.class_name}")
+
+class CapabilityRegistry:
+    """Capabilities of every module, built once from the module sources
+
+    Parsing the sources instead of importing them keeps startup free of the
+    modules' dependencies (web3 and friends) and means the listing cannot
+    drift from the methods that actually exist. Everything a request needs -
+    the JSON payloads and each capability's required and allowed parameters -
+    is computed here, so serving and validating a call is a dict lookup.
+    """
+
+    def __init__(self, specs: Sequence[ModuleSpec] = MODULE_SPECS, directory: Path = MODULES_DIR):
+        self._capabilities: Dict[str, Dict[str, Capability]] = {}
+        self._payloads: Dict[str, List[Dict[str, Any]]] = {}
+        for spec in specs:
+            try:
+                found = inspect_module(spec, directory)
+            except (OSError, SyntaxError, LookupError) as e:
+                print(f"Failed to inspect module {spec.name}: {str(e)}")
+                found = []
+            self._capabilities[spec.name] = {capability.name: capability for capability in found}
+            self._payloads[spec.name] = [capability.to_dict() for capability in found]
+
+    def modules(self) -> List[str]:
+        return list(self._capabilities)
+
+    def get(self, module: str, name: str) -> Optional[Capability]:
+        return self._capabilities.get(module, {}).get(name)
+
+    def names(self, module: str) -> List[str]:
+        return list(self._capabilities.get(module, {}))
+
+    def names_by_module(self) -> Dict[str, List[str]]:
+        return {module: list(capabilities) for module, capabilities in self._capabilities.items()}
+
+    def describe(self, module: str) -> Optional[List[Dict[str, Any]]]:
+        """Precomputed listing for a module; None for unknown modules"""
+        return self._payloads.get(module)
@@ -0,0 +1,105 @@
+"""
+MODULE REGISTRY - INFINITE MATRIX ECOSYSTEM
+Imports and constructs integration modules on first use instead of at startup.
+"""
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass, field
+import importlib
+import threading
+import time
+
+@dataclass(frozen=True)
+class ModuleSpec:
+    """Where a module's class lives and which config keys feed its constructor"""
+    name: str
+    module: str
+    class_name: str
+    # Constructor argument -> config key
+    config: Dict[str, str] = field(default_factory=dict)
+
+MODULE_SPECS = [
+    ModuleSpec('blockchain', 'blockchain', 'BlockchainIntegrator', {'provider_url': 'infura_url'}),
+    ModuleSpec('healthcare', 'healthcare', 'HealthcareIntegrator', {'api_key': 'doxy_api_key'}),
+    ModuleSpec('real_estate', 'real_estate', 'RealEstateManager', {'yardi_api_key': 'yardi_api_key'}),
+    ModuleSpec('ai_governance', 'ai_governance', 'AIModelGovernance'),
+    ModuleSpec('voice_ai', 'voice_ai', 'VoiceAI', {'deepgram_key': 'deepgram_key'})
+]
+
+class ModuleLoadError(RuntimeError):
+    """A module could not be imported or constructed (e.g. a missing optional dependency)"""
+
+@dataclass
+class _ModuleState:
+    instance: Any = None
+    import_seconds: Optional[float] = None
+    init_seconds: Optional[float] = None
+    error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+class LazyModuleRegistry:
+    """Integration modules imported and constructed on first use, then cached
+
+    Nothing is imported when the registry is created, so a worker only pays
+    for (and holds in memory) the modules its requests actually use. Listing
+    module names never loads anything. Each module records how long its import
+    and constructor took. A failed load is not cached; the next get() tries
+    again.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, specs: List[ModuleSpec] = MODULE_SPECS,
+                 instances: Optional[Dict[str, Any]] = None):
+        self.config = config or {}
+        self.specs = {spec.name: spec for spec in specs}
+        self._states = {name: _ModuleState() for name in self.specs}
+        for name, instance in (instances or {}).items():
+            self._states.setdefault(name, _ModuleState()).instance = instance
+
+    def names(self) -> List[str]:
+        return list(self._states)
+
+    def loaded(self, name: str) -> bool:
+        state = self._states.get(name)
+        return state is not None and state.instance is not None
+
+    def get(self, name: str) -> Any:
+        """The module instance, loading it on first use; None for unknown names"""
+        state = self._states.get(name)
+        if state is None:
+            return None
+        if state.instance is not None:
+            return state.instance
+        with state.lock:
+            if state.instance is None:
+                state.instance = self._load(self.specs[name], state)
+        return state.instance
+
+    def _load(self, spec: ModuleSpec, state: _ModuleState) -> Any:
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(f".{spec.module}", __package__)
+        except ImportError as e:
+            state.error = str(e)
+            raise ModuleLoadError(f"Module '{spec.name}' is unavailable: {str(e)}") from e
+        imported = time.perf_counter()
+        state.import_seconds = imported - started
+
+        kwargs = {arg: self.config.get(key) for arg, key in spec.config.items()}
+        try:
+            instance = getattr(module, spec.class_name)(**kwargs)
+        except Exception as e:
+            state.error = str(e)
+            raise ModuleLoadError(f"Module '{spec.name}' failed to initialise: {str(e)}") from e
+        state.init_seconds = time.perf_counter() - imported
+        state.error = None
+        return instance
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                'loaded': state.instance is not None,
+                'import_ms': round(state.import_seconds * 1000, 3) if state.import_seconds is not None else None,
+                'init_ms': round(state.init_seconds * 1000, 3) if state.init_seconds is not None else None,
+                'error': state.error
+            }
+            for name, state in self._states.items()
+        }
@@ -1,11 +1,47 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, url_for
 from datetime import datetime
 from uuid import uuid4
+import hashlib
+import json
 from services.antilibrary import AntilibraryService, UnknownEntry
 
 antilibrary_bp = Blueprint('antilibrary', __name__)
 service = AntilibraryService()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _paged_unknowns(**filters):
+    """List one page of unknowns from the query string, with ETag/conditional-GET support
+
+    Query parameters: limit, cursor, sort (impact|discovered|updated, '-' for descending)
+    and fields (comma-separated projection). The next page cursor is returned in the
+    X-Next-Cursor and Link headers so the body stays a plain list.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        fields = request.args.get('fields')
+        page = service.list_unknowns(
+            sort=request.args.get('sort', '-impact'),
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            fields=fields.split(',') if fields else None,
+            **filters
+        )
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    body = json.dumps(page.items, default=str, separators=(',', ':'))
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode()).hexdigest())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        # View args win over query parameters of the same name (e.g. ?company_id=)
+        args = {**request.args.to_dict(flat=False), **(request.view_args or {}), 'cursor': page.next_cursor}
+        response.headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    return response.make_conditional(request)
+
 @antilibrary_bp.route('/unknown', methods=['POST'])
 def add_unknown():
     """Add a new unknown entry to the antilibrary"""
@@ -30,17 +66,15 @@ def add_unknown():
 
 @antilibrary_bp.route('/company/<company_id>/unknowns', methods=['GET'])
 def get_company_unknowns(company_id):
-    """Get all unknown entries for a company"""
-    entries = service.get_company_unknowns(company_id)
-    return jsonify([vars(entry) for entry in entries])
+    """Get a page of unknown entries for a company"""
+    return _paged_unknowns(company_id=company_id)
 
 @antilibrary_bp.route('/unknowns/related', methods=['GET'])
 def find_related_unknowns():
     """Find related unknowns by tags"""
     tags = request.args.getlist('tags')
     threshold = float(request.args.get('threshold', 0.5))
-    entries = service.find_related_unknowns(tags, threshold)
-    return jsonify([vars(entry) for entry in entries])
+    return _paged_unknowns(tags=tags, min_impact=threshold)
 
 @antilibrary_bp.route('/unknown/<entry_id>/status', methods=['PUT'])
 def update_status(entry_id):
@@ -55,13 +89,73 @@ def update_status(entry_id):
 
 @antilibrary_bp.route('/unknowns/high-impact', methods=['GET'])
 def get_high_impact():
-    """Get high impact unknown entries"""
+    """Get a page of high impact unknown entries"""
     threshold = float(request.args.get('threshold', 0.8))
-    entries = service.get_high_impact_unknowns(threshold)
-    return jsonify([vars(entry) for entry in entries])
+    return _paged_unknowns(min_impact=threshold)
 
 @antilibrary_bp.route('/company/<company_id>/synergies', methods=['GET'])
 def get_synergies(company_id):
     """Get potential synergies for a company"""
     synergies = service.get_company_synergies(company_id)
-    return jsonify(synergies) 
\ No newline at end of file
+    return jsonify(synergies)
+
+def _batch_response(result, success_code=200):
+    """Report per-item outcomes, using 207 when only part of the batch succeeded"""
+    if result.failed and result.succeeded:
+        return jsonify(result.to_dict()), 207
+    if result.failed:
+        return jsonify(result.to_dict()), 400
+    return jsonify(result.to_dict()), success_code
+
+def _parse_entries(items):
+    """Parse a JSON array of entries, collecting per-item validation errors"""
+    entries, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            entries.append(UnknownEntry.from_payload(item))
+        except (ValueError, KeyError, TypeError) as e:
+            errors[str(item.get('id', f'item {index}')) if isinstance(item, dict) else f'item {index}'] = str(e)
+    return entries, errors
+
+@antilibrary_bp.route('/unknowns/bulk', methods=['POST', 'PUT'])
+def bulk_write_unknowns():
+    """Insert (POST) or upsert (PUT) a JSON array of unknown entries"""
+    items = request.json
+    if not isinstance(items, list):
+        return {'error': 'Expected a JSON array of entries'}, 400
+
+    entries, errors = _parse_entries(items)
+    if request.method == 'PUT':
+        result = service.upsert_unknowns(entries)
+    else:
+        result = service.add_unknowns(entries)
+    result.failed.update(errors)
+    return _batch_response(result, 201 if request.method == 'POST' else 200)
+
+@antilibrary_bp.route('/unknowns/status', methods=['PUT'])
+def bulk_update_status():
+    """Apply many status transitions given as {"updates": {entry_id: status}}"""
+    updates = (request.json or {}).get('updates')
+    if not isinstance(updates, dict) or not updates:
+        return {'error': 'Updates not provided'}, 400
+
+    return _batch_response(service.update_exploration_statuses(updates))
+
+@antilibrary_bp.route('/unknowns/import', methods=['POST'])
+def import_unknowns():
+    """Stream an NDJSON body into the antilibrary (?mode=insert|upsert)"""
+    mode = request.args.get('mode', 'upsert')
+    if mode not in ('insert', 'upsert'):
+        return {'error': f'Invalid mode: {mode}'}, 400
+
+    result = service.import_ndjson(request.stream, upsert=(mode == 'upsert'))
+    return _batch_response(result)
+
+@antilibrary_bp.route('/unknowns/export', methods=['GET'])
+def export_unknowns():
+    """Stream all entries (optionally for one company) as NDJSON"""
+    company_id = request.args.get('company_id')
+    return Response(
+        stream_with_context(service.export_ndjson(company_id)),
+        mimetype='application/x-ndjson'
+    )
@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify
-import os
-from src.genix_ecosystem import CreditRepair, AIBossHub, AutomationEngine, init_apis
+from src.genix_ecosystem import CreditRepair, AIBossHub, get_apis, stream_format, streamed_response, ingest_stripe_webhook
 
 # Create blueprint
 genix_routes = Blueprint('genix_routes', __name__)
@@ -12,9 +11,13 @@ def credit_repair():
     if not data or 'issue' not in data:
         return jsonify({"error": "Missing required field: issue"}), 400
         
-    apis = init_apis()
+    apis = get_apis()
     service = CreditRepair(apis)
-    result = service.generate_dispute(data['issue'])
+    idempotency_key = request.headers.get('Idempotency-Key')
+    fmt = stream_format(data)
+    if fmt:
+        return streamed_response(fmt, service.stream_dispute(data['issue'], idempotency_key))
+    result = service.generate_dispute(data['issue'], idempotency_key)
     return jsonify(result)
 
 @genix_routes.route('/job-search', methods=['POST'])
@@ -24,48 +27,76 @@ def job_search():
     if not data or 'resume' not in data:
         return jsonify({"error": "Missing required field: resume"}), 400
         
-    apis = init_apis()
+    apis = get_apis()
     hub = AIBossHub(apis)
+    fmt = stream_format(data)
+    if fmt:
+        return streamed_response(fmt, hub.stream_job_search(data['resume']))
     jobs = hub.job_search(data['resume'])
     return jsonify(jobs)
 
+@genix_routes.route('/jobs/ingest', methods=['POST'])
+def jobs_ingest():
+    """Add or update job postings in the local search index"""
+    data = request.json
+    if not data or not isinstance(data.get('jobs'), list):
+        return jsonify({"error": "Missing required field: jobs"}), 400
+    if not all(isinstance(job, dict) for job in data['jobs']):
+        return jsonify({"error": "Each job must be an object"}), 400
+
+    index = get_apis().get('job_index')
+    if index is None:
+        return jsonify({"error": "Job index not configured (set JOB_INDEX_PATH)"}), 400
+    indexed = index.add(data['jobs'])
+    return jsonify({"indexed": indexed, "total": len(index)})
+
+@genix_routes.route('/job-search/batch', methods=['POST'])
+def job_search_batch():
+    """Match many resumes in batched AI calls; defaults to every active subscription"""
+    data = request.json or {}
+    resumes = data.get('resumes')
+    if resumes is not None and not all(isinstance(item, dict) and 'subscription_id' in item and 'resume' in item for item in resumes):
+        return jsonify({"error": "Each resume needs subscription_id and resume"}), 400
+
+    apis = get_apis()
+    if resumes is None and 'pg_pool' not in apis:
+        return jsonify({"error": "Database not configured; pass resumes explicitly"}), 400
+    hub = AIBossHub(apis)
+    return jsonify(hub.match_subscriptions(resumes, force=bool(data.get('force'))))
+
 @genix_routes.route('/webhook/stripe', methods=['POST'])
 def stripe_webhook():
-    """Handle Stripe payment webhooks"""
-    apis = init_apis()
-    
-    # Check if Stripe is configured
-    try:
-        import stripe
-        if not apis.get('stripe'):
-            return jsonify({"error": "Stripe not configured"}), 400
-            
-        event = stripe.Webhook.construct_event(
-            request.data, 
-            request.headers['Stripe-Signature'],
-            os.getenv('STRIPE_WEBHOOK_SECRET')
-        )
-        
-        if event['type'] == 'payment_intent.succeeded':
-            automation = AutomationEngine(apis)
-            automation.automate_workflow("subscription_payment", event['data'])
-        
-        return jsonify({"status": "success"}), 200
-    except ImportError:
-        return jsonify({"error": "Stripe package not installed"}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    """Handle Stripe payment webhooks (queued; processed by the webhook workers)"""
+    return ingest_stripe_webhook()
 
 @genix_routes.route('/status', methods=['GET'])
 def status():
     """Check the status of Genix ecosystem services"""
-    apis = init_apis()
+    apis = get_apis()
+    # A probe must stay cheap: only services already in use are checked, nothing is started
+    health = apis.health(built_only=True)
+    names = {
+        "stripe": "stripe",
+        "claude": "claude",
+        "gemini": "gemini",
+        "redis": "redis",
+        "supabase": "supabase",
+        "postgres": "pg_pool"
+    }
     status = {
-        "stripe": "available" if apis.get('stripe') else "unavailable",
-        "claude": "available" if apis.get('claude') else "unavailable",
-        "gemini": "available" if apis.get('gemini') else "unavailable",
-        "redis": "available" if apis.get('redis') else "unavailable",
-        "supabase": "available" if apis.get('supabase') else "unavailable",
-        "postgres": "available" if apis.get('pg_conn') else "unavailable"
+        label: "available" if health[name]['available']
+        else "unavailable" if health[name]['started'] or health[name]['error'] else "not started"
+        for label, name in names.items()
     }
+    for label, name, report in (
+        ("postgres_pool", 'pg_pool', 'metrics'),
+        ("ai_cache", 'llm_cache', 'metrics'),
+        ("ai_calls", 'llm_runtime', 'stats'),
+        ("ai_routing", 'llm_router', 'stats'),
+        ("ai_rate_limits", 'llm_rate_limiter', 'stats'),
+        ("webhooks", 'webhook_queue', 'stats')
+    ):
+        service = apis.built(name)
+        if service is not None:
+            status[label] = getattr(service, report)()
     return jsonify(status)
\ No newline at end of file
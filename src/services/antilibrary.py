@@ -1,10 +1,27 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Iterable, Iterator, Callable, Any, Union
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+import base64
 import json
 from pathlib import Path
 from .supabase_client import SupabaseClient
 
+VALID_STATUSES = ('new', 'investigating', 'resolved')
+
+# Columns clients may project with fields=, and the sort keys they may page on
+PAGE_COLUMNS = (
+    'id', 'company_id', 'category', 'description', 'potential_impact', 'discovery_date',
+    'last_updated', 'related_companies', 'exploration_status', 'tags', 'lovabl_listing_id'
+)
+SORT_COLUMNS = {
+    'impact': 'potential_impact',
+    'discovered': 'discovery_date',
+    'updated': 'last_updated'
+}
+JSON_COLUMNS = ('related_companies', 'tags')
+
 @dataclass
 class UnknownEntry:
     id: str
@@ -22,19 +39,95 @@ class UnknownEntry:
         data = asdict(self)
         data['discovery_date'] = self.discovery_date.isoformat()
         data['last_updated'] = self.last_updated.isoformat()
-        data['related_companies'] = json.dumps(self.related_companies)
-        data['tags'] = json.dumps(self.tags)
+        # Sent as JSON arrays so the JSONB columns can be queried (e.g. tags @> '["ai"]')
+        data['related_companies'] = list(self.related_companies)
+        data['tags'] = list(self.tags)
         return data
 
     @classmethod
     def from_dict(cls, data: Dict):
         data['discovery_date'] = datetime.fromisoformat(data['discovery_date'])
         data['last_updated'] = datetime.fromisoformat(data['last_updated'])
-        data['related_companies'] = json.loads(data['related_companies'])
-        data['tags'] = json.loads(data['tags'])
+        for column in JSON_COLUMNS:
+            if isinstance(data[column], str):
+                data[column] = json.loads(data[column])
         return cls(**data)
 
+    @classmethod
+    def from_payload(cls, data: Dict):
+        """Build an entry from an API/NDJSON payload, filling in defaults for new entries"""
+        now = datetime.now()
+
+        def _as_list(value):
+            if isinstance(value, str):
+                return json.loads(value)
+            return list(value or [])
+
+        def _as_datetime(value):
+            if isinstance(value, str):
+                return datetime.fromisoformat(value)
+            return value or now
+
+        potential_impact = float(data['potential_impact'])
+        if not 0 <= potential_impact <= 1:
+            raise ValueError("potential_impact must be between 0 and 1")
+        status = data.get('exploration_status', 'new')
+        if status not in VALID_STATUSES:
+            raise ValueError(f"Invalid exploration_status: {status}")
+
+        return cls(
+            id=data.get('id') or str(uuid4()),
+            company_id=data['company_id'],
+            category=data['category'],
+            description=data['description'],
+            potential_impact=potential_impact,
+            discovery_date=_as_datetime(data.get('discovery_date')),
+            last_updated=_as_datetime(data.get('last_updated')),
+            related_companies=_as_list(data.get('related_companies')),
+            exploration_status=status,
+            tags=_as_list(data.get('tags'))
+        )
+
+@dataclass
+class BatchResult:
+    """Per-item outcome of a bulk antilibrary operation"""
+    succeeded: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+    def merge(self, other: 'BatchResult') -> 'BatchResult':
+        self.succeeded.extend(other.succeeded)
+        self.failed.update(other.failed)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+            'errors': self.failed
+        }
+
+@dataclass
+class Page:
+    """One page of projected rows plus the cursor for the next page"""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+def encode_cursor(sort_value: Any, entry_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, entry_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        sort_value, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return sort_value, entry_id
+
 class AntilibraryService:
+    # Rows per PostgREST request and number of requests in flight for bulk operations
+    BULK_CHUNK_SIZE = 500
+    BULK_MAX_WORKERS = 8
+    EXPORT_PAGE_SIZE = 1000
+
     def __init__(self):
         self.supabase = SupabaseClient.get_instance().get_client()
         self._ensure_table_exists()
@@ -97,4 +190,202 @@ class AntilibraryService:
                         'potential_impact': unknown.potential_impact
                     })
         
-        return synergies 
\ No newline at end of file
+        return synergies
+
+    # ========== Paginated listing ==========
+
+    def list_unknowns(
+        self,
+        company_id: Optional[str] = None,
+        min_impact: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        sort: str = '-impact',
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Page:
+        """Return one keyset-paginated page of entries, projected to the requested fields
+
+        Pages are ordered on (sort column, id) so a cursor stays valid while rows are
+        inserted ahead of it. Tags are matched in the database with JSONB containment
+        (any of the given tags), so every page is a single bounded query.
+        """
+        descending = sort.startswith('-')
+        sort_key = sort.lstrip('-')
+        if sort_key not in SORT_COLUMNS:
+            raise ValueError(f"Invalid sort: {sort}")
+        sort_column = SORT_COLUMNS[sort_key]
+
+        fields = list(fields or PAGE_COLUMNS)
+        unknown_fields = [name for name in fields if name not in PAGE_COLUMNS]
+        if unknown_fields:
+            raise ValueError(f"Invalid fields: {', '.join(unknown_fields)}")
+        columns = set(fields) | {'id', sort_column}
+
+        query = self.supabase.table('unknowns').select(','.join(sorted(columns)))
+        if company_id:
+            query = query.eq('company_id', company_id)
+        if min_impact is not None:
+            query = query.gte('potential_impact', min_impact)
+        conditions = []
+        if tags:
+            reserved = [tag for tag in tags if any(char in tag for char in ',()"\\')]
+            if reserved:
+                raise ValueError(f"Invalid tags: {', '.join(reserved)}")
+            conditions.append('or(' + ','.join(f'tags.cs.{json.dumps([tag])}' for tag in tags) + ')')
+        if cursor:
+            value, entry_id = decode_cursor(cursor)
+            op = 'lt' if descending else 'gt'
+            conditions.append(
+                f'or({sort_column}.{op}."{value}",and({sort_column}.eq."{value}",id.{op}.{entry_id}))'
+            )
+        if conditions:
+            query = query.or_(f'and({",".join(conditions)})')
+        rows = query.order(sort_column, desc=descending)\
+            .order('id', desc=descending)\
+            .limit(limit + 1)\
+            .execute().data
+
+        has_more = len(rows) > limit
+        items = []
+        for row in rows[:limit]:
+            for column in JSON_COLUMNS:
+                if isinstance(row.get(column), str):
+                    row[column] = json.loads(row[column])
+            items.append({name: row.get(name) for name in fields})
+
+        next_cursor = None
+        if has_more:
+            last_row = rows[limit - 1]
+            next_cursor = encode_cursor(last_row[sort_column], last_row['id'])
+        return Page(items=items, next_cursor=next_cursor)
+
+    # ========== Bulk operations ==========
+
+    def _chunks(self, items: List[Any]) -> Iterator[List[Any]]:
+        for start in range(0, len(items), self.BULK_CHUNK_SIZE):
+            yield items[start:start + self.BULK_CHUNK_SIZE]
+
+    def _write_rows(self, rows: List[Dict], write: Callable[[List[Dict]], Any]) -> BatchResult:
+        """Write one chunk, falling back to row-by-row writes to isolate failing rows"""
+        try:
+            write(rows)
+            return BatchResult(succeeded=[row['id'] for row in rows])
+        except Exception as chunk_error:
+            if len(rows) == 1:
+                return BatchResult(failed={rows[0]['id']: str(chunk_error)})
+
+        result = BatchResult()
+        for row in rows:
+            try:
+                write([row])
+                result.succeeded.append(row['id'])
+            except Exception as e:
+                result.failed[row['id']] = str(e)
+        return result
+
+    def _bulk_write(self, entries: Iterable[UnknownEntry], write: Callable[[List[Dict]], Any]) -> BatchResult:
+        """Chunk entries and issue the chunks concurrently"""
+        rows = [entry.to_dict() for entry in entries]
+        result = BatchResult()
+        if not rows:
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.BULK_MAX_WORKERS) as executor:
+            for chunk_result in executor.map(lambda chunk: self._write_rows(chunk, write), self._chunks(rows)):
+                result.merge(chunk_result)
+        return result
+
+    def add_unknowns(self, entries: Iterable[UnknownEntry]) -> BatchResult:
+        """Insert many unknown entries in concurrent chunks"""
+        return self._bulk_write(
+            entries,
+            lambda rows: self.supabase.table('unknowns').insert(rows).execute()
+        )
+
+    def upsert_unknowns(self, entries: Iterable[UnknownEntry]) -> BatchResult:
+        """Insert or replace many unknown entries keyed on id"""
+        return self._bulk_write(
+            entries,
+            lambda rows: self.supabase.table('unknowns').upsert(rows, on_conflict='id').execute()
+        )
+
+    def _update_status_chunk(self, status: str, entry_ids: List[str], timestamp: str) -> BatchResult:
+        try:
+            result = self.supabase.table('unknowns').update({
+                'exploration_status': status,
+                'last_updated': timestamp
+            }).in_('id', entry_ids).execute()
+        except Exception as e:
+            return BatchResult(failed={entry_id: str(e) for entry_id in entry_ids})
+
+        updated = {row['id'] for row in result.data or []}
+        return BatchResult(
+            succeeded=[entry_id for entry_id in entry_ids if entry_id in updated],
+            failed={entry_id: 'Entry not found' for entry_id in entry_ids if entry_id not in updated}
+        )
+
+    def update_exploration_statuses(self, updates: Dict[str, str]) -> BatchResult:
+        """Apply many status transitions, one request per (status, chunk of ids)"""
+        result = BatchResult()
+        by_status: Dict[str, List[str]] = {}
+        for entry_id, status in updates.items():
+            if status not in VALID_STATUSES:
+                result.failed[entry_id] = f"Invalid exploration_status: {status}"
+            else:
+                by_status.setdefault(status, []).append(entry_id)
+
+        timestamp = datetime.now().isoformat()
+        jobs = [
+            (status, chunk)
+            for status, entry_ids in by_status.items()
+            for chunk in self._chunks(entry_ids)
+        ]
+        with ThreadPoolExecutor(max_workers=self.BULK_MAX_WORKERS) as executor:
+            for chunk_result in executor.map(lambda job: self._update_status_chunk(job[0], job[1], timestamp), jobs):
+                result.merge(chunk_result)
+        return result
+
+    def import_ndjson(self, lines: Iterable[Union[str, bytes]], upsert: bool = True) -> BatchResult:
+        """Stream NDJSON entries into the antilibrary without holding the whole file in memory"""
+        write = self.upsert_unknowns if upsert else self.add_unknowns
+        window = self.BULK_CHUNK_SIZE * self.BULK_MAX_WORKERS
+        result = BatchResult()
+        pending: List[UnknownEntry] = []
+
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            try:
+                pending.append(UnknownEntry.from_payload(json.loads(line)))
+            except (ValueError, KeyError, TypeError) as e:
+                result.failed[f"line {line_number}"] = str(e)
+                continue
+
+            if len(pending) >= window:
+                result.merge(write(pending))
+                pending = []
+
+        if pending:
+            result.merge(write(pending))
+        return result
+
+    def export_ndjson(self, company_id: Optional[str] = None) -> Iterator[str]:
+        """Yield every matching entry as an NDJSON line, paging by id"""
+        last_id = None
+        while True:
+            query = self.supabase.table('unknowns').select('*')
+            if company_id:
+                query = query.eq('company_id', company_id)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            result = query.order('id').limit(self.EXPORT_PAGE_SIZE).execute()
+
+            for row in result.data:
+                yield json.dumps(row, default=str) + '\n'
+
+            if len(result.data) < self.EXPORT_PAGE_SIZE:
+                break
+            last_id = result.data[-1]['id']
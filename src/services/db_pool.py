@@ -0,0 +1,303 @@
+from typing import Dict, Any, List, Optional, Callable, Sequence, Iterator
+from dataclasses import dataclass, field, asdict
+from contextlib import contextmanager
+from collections import deque
+from urllib.parse import urlparse
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import psycopg2
+    import psycopg2.extras
+except ImportError:
+    psycopg2 = None
+
+NUMBERED_PARAM = re.compile(r'\$(\d+)')
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+@dataclass
+class PoolMetrics:
+    created: int = 0
+    discarded: int = 0
+    checkouts: int = 0
+    waits: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    in_use: int = 0
+    idle: int = 0
+
+@dataclass
+class _PooledConnection:
+    raw: Any
+    prepared: set = field(default_factory=set)
+    broken: bool = False
+
+class Transaction:
+    """Cursor wrapper handed out by DatabasePool.transaction()
+
+    SQL uses %s placeholders for both backends; prepared statements are
+    referenced by the name they were registered under.
+    """
+
+    def __init__(self, pool: 'DatabasePool', conn: _PooledConnection):
+        self.pool = pool
+        self.conn = conn
+        self.cursor = conn.raw.cursor()
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace('%s', '?') if self.pool.dialect == 'sqlite' else sql
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> 'Transaction':
+        self.cursor.execute(self._sql(sql), tuple(params))
+        return self
+
+    def executemany(self, sql: str, rows: Sequence[Sequence[Any]]) -> 'Transaction':
+        self.cursor.executemany(self._sql(sql), [tuple(row) for row in rows])
+        return self
+
+    def insert_many(self, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+                    page_size: int = 1000, on_conflict: str = '') -> 'Transaction':
+        """Insert rows with one multi-row VALUES statement per page (Postgres) or executemany (SQLite)
+
+        on_conflict is appended as-is, e.g. "ON CONFLICT (key) DO UPDATE SET ..."
+        (both backends accept the same upsert syntax).
+        """
+        column_list = ', '.join(columns)
+        suffix = f" {on_conflict}" if on_conflict else ''
+        if self.pool.dialect == 'postgres':
+            psycopg2.extras.execute_values(
+                self.cursor, f"INSERT INTO {table} ({column_list}) VALUES %s{suffix}",
+                [tuple(row) for row in rows], page_size=page_size
+            )
+            return self
+        placeholders = ', '.join(['%s'] * len(columns))
+        return self.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({placeholders}){suffix}", rows)
+
+    def update_many(self, table: str, key: str, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+                    page_size: int = 1000) -> 'Transaction':
+        """Update rows matched on key from (key, *columns) tuples
+
+        Postgres gets one UPDATE ... FROM (VALUES ...) statement per page;
+        SQLite falls back to executemany.
+        """
+        if self.pool.dialect == 'postgres':
+            assignments = ', '.join(f"{column} = v.{column}" for column in columns)
+            names = ', '.join([key, *columns])
+            psycopg2.extras.execute_values(
+                self.cursor,
+                f"UPDATE {table} AS t SET {assignments} FROM (VALUES %s) AS v({names}) WHERE t.{key} = v.{key}",
+                [tuple(row) for row in rows], page_size=page_size
+            )
+            return self
+        assignments = ', '.join(f"{column} = %s" for column in columns)
+        return self.executemany(
+            f"UPDATE {table} SET {assignments} WHERE {key} = %s",
+            [tuple(row[1:]) + (row[0],) for row in rows]
+        )
+
+    def execute_prepared(self, name: str, params: Sequence[Any] = ()) -> 'Transaction':
+        """Run a statement registered with the pool, preparing it once per connection"""
+        statement = self.pool.statements[name]
+        if self.pool.dialect == 'sqlite':
+            # sqlite3 keeps its own per-connection statement cache
+            self.cursor.execute(NUMBERED_PARAM.sub(r'?\1', statement), tuple(params))
+            return self
+        if name not in self.conn.prepared:
+            self.cursor.execute(f"PREPARE {name} AS {statement}")
+            self.conn.prepared.add(name)
+        placeholders = ', '.join(['%s'] * len(params))
+        self.cursor.execute(f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}", tuple(params))
+        return self
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    def fetchone(self) -> Optional[tuple]:
+        return self.cursor.fetchone()
+
+    def fetchall(self) -> List[tuple]:
+        return self.cursor.fetchall()
+
+class DatabasePool:
+    """Thread-safe connection pool for Postgres (psycopg2) or a SQLite stand-in
+
+    Connections are created on demand up to max_size, with min_size opened up
+    front. Checkout blocks for at most checkout_timeout seconds before raising
+    PoolTimeout. A connection whose transaction fails is rolled back before it is
+    returned, and one that cannot be rolled back is discarded rather than
+    handed to the next caller.
+    """
+
+    def __init__(self, connect: Callable[[], Any], dialect: str = 'postgres',
+                 min_size: int = 1, max_size: int = 10, checkout_timeout: float = 5.0,
+                 statements: Optional[Dict[str, str]] = None):
+        self._connect = connect
+        self.dialect = dialect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.statements: Dict[str, str] = dict(statements or {})
+        self._idle: deque = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._metrics = PoolMetrics()
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._size += 1
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'DatabasePool':
+        """Build a pool from a postgresql:// or sqlite:/// URL"""
+        parsed = urlparse(url)
+        if parsed.scheme == 'sqlite':
+            path = parsed.path[1:] if parsed.path.startswith('/') else parsed.path
+            path = path or ':memory:'
+            if path == ':memory:':
+                # Every connection to :memory: is a separate database, so share one
+                kwargs['max_size'] = kwargs['min_size'] = 1
+            return cls(lambda: sqlite3.connect(path, check_same_thread=False), dialect='sqlite', **kwargs)
+        if psycopg2 is None:
+            raise ImportError("psycopg2 is required for Postgres pools. Install with 'pip install psycopg2-binary'.")
+        return cls(lambda: psycopg2.connect(url), dialect='postgres', **kwargs)
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional['DatabasePool']:
+        """Build a pool from DATABASE_URL or the NEON_* variables, or None if neither is set"""
+        kwargs.setdefault('min_size', int(os.getenv('DB_POOL_MIN', '1')))
+        kwargs.setdefault('max_size', int(os.getenv('DB_POOL_MAX', '10')))
+        kwargs.setdefault('checkout_timeout', float(os.getenv('DB_POOL_TIMEOUT', '5')))
+        if os.getenv('DATABASE_URL'):
+            return cls.from_url(os.getenv('DATABASE_URL'), **kwargs)
+        if all(os.getenv(env) for env in ['NEON_HOST', 'NEON_DB', 'NEON_USER', 'NEON_PW']):
+            if psycopg2 is None:
+                raise ImportError("psycopg2 is required for Postgres pools. Install with 'pip install psycopg2-binary'.")
+            return cls(lambda: psycopg2.connect(
+                host=os.getenv('NEON_HOST'),
+                database=os.getenv('NEON_DB'),
+                user=os.getenv('NEON_USER'),
+                password=os.getenv('NEON_PW')
+            ), dialect='postgres', **kwargs)
+        return None
+
+    def prepare(self, name: str, statement: str):
+        """Register a statement (with $1-style parameters) for Transaction.execute_prepared"""
+        self.statements[name] = statement
+
+    def _open(self) -> _PooledConnection:
+        conn = _PooledConnection(self._connect())
+        self._metrics.created += 1
+        return conn
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        return not conn.broken and not getattr(conn.raw, 'closed', False)
+
+    def _checkout(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Pool is closed")
+                while self._idle:
+                    conn = self._idle.pop()
+                    if self._is_usable(conn):
+                        self._metrics.checkouts += 1
+                        return conn
+                    self._discard_locked(conn)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics.timeouts += 1
+                    raise PoolTimeout(f"No connection available within {self.checkout_timeout}s")
+                if not waited:
+                    self._metrics.waits += 1
+                    waited = True
+                started = time.monotonic()
+                self._cond.wait(remaining)
+                self._metrics.wait_seconds += time.monotonic() - started
+
+        # Open the new connection outside the lock so slow connects do not block returns
+        try:
+            conn = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics.checkouts += 1
+        return conn
+
+    def _discard_locked(self, conn: _PooledConnection):
+        self._size -= 1
+        self._metrics.discarded += 1
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def _release(self, conn: _PooledConnection):
+        with self._cond:
+            if self._closed or not self._is_usable(conn):
+                self._discard_locked(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[_PooledConnection]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Check out a connection and run one transaction on it, committing on success"""
+        with self.connection() as conn:
+            tx = Transaction(self, conn)
+            try:
+                yield tx
+                conn.raw.commit()
+            except BaseException:
+                try:
+                    conn.raw.rollback()
+                except Exception:
+                    conn.broken = True
+                raise
+            finally:
+                try:
+                    tx.cursor.close()
+                except Exception:
+                    conn.broken = True
+
+    def ping(self) -> bool:
+        with self.transaction() as tx:
+            tx.execute("SELECT 1")
+            return tx.fetchone() is not None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            self._metrics.idle = len(self._idle)
+            self._metrics.in_use = self._size - len(self._idle)
+            report = asdict(self._metrics)
+        report.update(min_size=self.min_size, max_size=self.max_size)
+        return report
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._discard_locked(self._idle.pop())
+            self._cond.notify_all()
@@ -0,0 +1,132 @@
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple, Union
+from decimal import Decimal
+import itertools
+import threading
+
+import requests
+
+WEI_PER_ETHER = Decimal(10) ** 18
+
+Payload = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+class RpcError(Exception):
+    """A JSON-RPC error response (or a malformed reply)"""
+
+    def __init__(self, message: str, code: Optional[int] = None, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+def to_hex(value: int) -> str:
+    return hex(value)
+
+def from_hex(value: Optional[str]) -> int:
+    return int(value, 16) if value not in (None, '0x') else 0
+
+def from_wei(value: int, decimals: int = 18) -> Decimal:
+    return Decimal(value) / (WEI_PER_ETHER if decimals == 18 else Decimal(10) ** decimals)
+
+class HttpTransport:
+    """POSTs JSON-RPC payloads over a keep-alive session"""
+
+    def __init__(self, url: str, timeout: float = 10.0, session: Optional[requests.Session] = None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def __call__(self, payload: Payload) -> Payload:
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+class JsonRpcClient:
+    """Ethereum JSON-RPC over any transport: a node URL, a local dev chain or an in-process stub
+
+    batch() sends many calls as JSON-RPC batch requests of up to max_batch
+    calls each, so querying a thousand wallets costs a handful of round trips
+    instead of a thousand. Results come back in call order; a call that
+    failed is returned as its RpcError instead of failing the whole batch.
+    """
+
+    def __init__(self, transport: Callable[[Payload], Payload], max_batch: int = 100):
+        self.transport = transport
+        self.max_batch = max_batch
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 10.0, max_batch: int = 100) -> 'JsonRpcClient':
+        """http(s):// for a node or dev chain (e.g. http://127.0.0.1:8545)"""
+        return cls(HttpTransport(url, timeout), max_batch)
+
+    def _request(self, method: str, params: Sequence[Any]) -> Dict[str, Any]:
+        return {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': list(params)}
+
+    @staticmethod
+    def _result(reply: Dict[str, Any]) -> Any:
+        error = reply.get('error')
+        if error is not None:
+            return RpcError(error.get('message', 'RPC error'), error.get('code'), error.get('data'))
+        return reply.get('result')
+
+    def call(self, method: str, params: Sequence[Any] = ()) -> Any:
+        reply = self.transport(self._request(method, params))
+        if not isinstance(reply, dict):
+            raise RpcError(f"Malformed reply to {method}")
+        result = self._result(reply)
+        if isinstance(result, RpcError):
+            raise result
+        return result
+
+    def batch(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        results: List[Any] = []
+        for start in range(0, len(calls), self.max_batch):
+            chunk = [self._request(method, params) for method, params in calls[start:start + self.max_batch]]
+            replies = self.transport(chunk)
+            if isinstance(replies, dict):
+                # Nodes answer a rejected batch (e.g. too large) with a single error object
+                error = self._result(replies)
+                raise error if isinstance(error, RpcError) else RpcError("Malformed batch reply")
+            by_id = {reply.get('id'): reply for reply in replies}
+            for request in chunk:
+                reply = by_id.get(request['id'])
+                results.append(self._result(reply) if reply else RpcError(f"No reply to {request['method']}"))
+        return results
+
+    def get_balances(self, addresses: Sequence[str], block: str = 'latest') -> List[Any]:
+        """Wei balance of each address (or its RpcError), in one batch per max_batch addresses"""
+        replies = self.batch([('eth_getBalance', [address, block]) for address in addresses])
+        return [reply if isinstance(reply, RpcError) else from_hex(reply) for reply in replies]
+
+class NonceManager:
+    """Hands out consecutive nonces per account without a round trip per transaction
+
+    The first nonce of an account comes from eth_getTransactionCount
+    (including pending transactions); later ones are counted locally, so
+    transactions sent back to back or from several threads never reuse a
+    nonce. Call resync() when a node rejects a nonce (e.g. after a transaction
+    was sent from elsewhere or dropped) to start again from the node's count.
+    """
+
+    def __init__(self, client: JsonRpcClient):
+        self.client = client
+        self._next: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _account_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def reserve(self, address: str) -> int:
+        key = address.lower()
+        with self._account_lock(key):
+            nonce = self._next.get(key)
+            if nonce is None:
+                nonce = from_hex(self.client.call('eth_getTransactionCount', [address, 'pending']))
+            self._next[key] = nonce + 1
+            return nonce
+
+    def resync(self, address: str):
+        key = address.lower()
+        with self._account_lock(key):
+            self._next.pop(key, None)
@@ -0,0 +1,230 @@
+from typing import Dict, Any, List, Optional, Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+DEFAULT_DIMENSIONS = 1024
+INITIAL_CAPACITY = 1024
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+def hashing_embedder(dimensions: int = DEFAULT_DIMENSIONS) -> Callable[[Sequence[str]], np.ndarray]:
+    """Feature-hashing embeddings over words and word pairs
+
+    Deterministic and dependency-free, which is enough for matching job titles
+    and skills. Any callable with the same signature (e.g. a sentence-embedding
+    model) can replace it, as long as the index is rebuilt.
+    """
+    def embed(texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            hashes = np.array(
+                [int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                 for feature in features],
+                dtype=np.uint64
+            )
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], (hashes % np.uint64(dimensions)).astype(np.int64), signs)
+        # Dampen repeated terms, then normalise so a dot product is the cosine
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    return embed
+
+def posting_text(job: Dict[str, Any]) -> str:
+    return "\n".join(str(job.get(key) or '') for key in ('title', 'company', 'description'))
+
+class RerankChoice(BaseModel):
+    n: int
+    reason: str = ''
+
+RERANK_SCHEMA = TypeAdapter(List[RerankChoice])
+
+@dataclass
+class SearchHit:
+    job: Dict[str, Any]
+    score: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.job, 'score': round(self.score, 4)}
+
+class JobIndex:
+    """On-disk job posting index searched by cosine similarity
+
+    Embeddings live in a float32 matrix memory-mapped from `embeddings.f32`, so
+    the index is shared through the page cache and opens instantly.
+    Postings are appended to `jobs.jsonl`; the last line for a row wins, so
+    re-ingesting a posting with the same id updates it in place. `meta.json`
+    records how many rows are committed, and rows past that count are ignored
+    after a crash. Searches are a single matrix-vector product plus
+    argpartition for the top k.
+
+    One process should ingest at a time; other processes pick up its writes
+    through refresh().
+    """
+
+    def __init__(self, path: Path, dimensions: int = DEFAULT_DIMENSIONS,
+                 embedder: Optional[Callable[[Sequence[str]], np.ndarray]] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embed = embedder or hashing_embedder(dimensions)
+        self._lock = threading.Lock()
+        self._meta_path = self.path / "meta.json"
+        self._matrix_path = self.path / "embeddings.f32"
+        self._jobs_path = self.path / "jobs.jsonl"
+
+        self.dimensions = dimensions
+        self._meta_mtime = None
+        self._load()
+
+    def _load(self):
+        meta = json.loads(self._meta_path.read_text()) if self._meta_path.exists() else {}
+        if meta and meta['dimensions'] != self.dimensions:
+            raise ValueError(f"Index at {self.path} has {meta['dimensions']} dimensions, not {self.dimensions}")
+        self._meta_mtime = self._meta_path.stat().st_mtime_ns if meta else None
+        self.count = meta.get('count', 0)
+        self.capacity = meta.get('capacity', INITIAL_CAPACITY)
+        self._matrix = self._map(self.capacity)
+
+        jobs: List[Optional[Dict[str, Any]]] = [None] * self.count
+        rows: Dict[str, int] = {}
+        if self._jobs_path.exists():
+            with open(self._jobs_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from an interrupted write
+                    if entry['row'] < self.count:
+                        jobs[entry['row']] = entry['job']
+                        rows[str(entry['job']['id'])] = entry['row']
+        self._jobs, self._rows = jobs, rows
+
+    def refresh(self):
+        """Pick up postings added by another process (one stat() when nothing changed)"""
+        try:
+            mtime = self._meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._meta_mtime:
+            with self._lock:
+                self._load()
+
+    @classmethod
+    def from_env(cls) -> 'JobIndex':
+        return cls(Path(os.getenv('JOB_INDEX_PATH', 'data/job_index')))
+
+    def _map(self, capacity: int) -> np.memmap:
+        size = capacity * self.dimensions * 4
+        with open(self._matrix_path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dimensions))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, jobs: Sequence[Dict[str, Any]], batch_size: int = 1024) -> int:
+        """Insert or update postings (objects with an id and title); returns how many were written"""
+        written = 0
+        for start in range(0, len(jobs), batch_size):
+            batch = [job for job in jobs[start:start + batch_size]
+                     if isinstance(job, dict) and job.get('id') is not None and job.get('title')]
+            if not batch:
+                continue
+            vectors = self.embed([posting_text(job) for job in batch])
+            with self._lock:
+                rows, assigned, new_count = [], {}, self.count
+                for job in batch:
+                    key = str(job['id'])
+                    row = self._rows.get(key, assigned.get(key))
+                    if row is None:
+                        row = assigned[key] = new_count
+                        new_count += 1
+                    rows.append(row)
+                if new_count > self.capacity:
+                    self._matrix.flush()
+                    while self.capacity < new_count:
+                        self.capacity *= 2
+                    self._matrix = self._map(self.capacity)
+
+                self._matrix[rows] = vectors
+                self._matrix.flush()
+                with open(self._jobs_path, 'a') as f:
+                    for row, job in zip(rows, batch):
+                        f.write(json.dumps({'row': row, 'job': job}) + "\n")
+                for row, job in zip(rows, batch):
+                    if row >= len(self._jobs):
+                        self._jobs.extend([None] * (row + 1 - len(self._jobs)))
+                    self._jobs[row] = job
+                    self._rows[str(job['id'])] = row
+                self.count = new_count
+                self._write_meta()
+                self._meta_mtime = self._meta_path.stat().st_mtime_ns
+            written += len(batch)
+        return written
+
+    def _write_meta(self):
+        tmp_path = self._meta_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'dimensions': self.dimensions, 'count': self.count, 'capacity': self.capacity}))
+        os.replace(tmp_path, self._meta_path)
+
+    def search(self, text: str, k: int = 10) -> List[SearchHit]:
+        return self.search_many([text], k)[0]
+
+    def search_many(self, texts: Sequence[str], k: int = 10) -> List[List[SearchHit]]:
+        """Top-k postings for each query text, best first"""
+        self.refresh()
+        count, matrix, jobs = self.count, self._matrix, self._jobs
+        if not count or not texts:
+            return [[] for _ in texts]
+        k = min(k, count)
+        scores = self.embed(texts) @ matrix[:count].T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-query_scores[candidates])]
+            results.append([SearchHit(jobs[row], float(query_scores[row])) for row in ordered if jobs[row] is not None])
+        return results
+
+    def close(self):
+        with self._lock:
+            self._matrix.flush()
+
+def rerank_prompt(resume: str, hits: List[SearchHit], limit: int) -> str:
+    """Short prompt asking the model to order candidate postings, not invent new ones"""
+    candidates = "\n".join(
+        f"[{n}] {hit.job.get('title')} - {hit.job.get('company') or 'Unknown'}: {(hit.job.get('description') or '')[:300]}"
+        for n, hit in enumerate(hits)
+    )
+    return (
+        f"Pick the {limit} jobs below that best match the resume, best first. "
+        "Reply with only a JSON array of {\"n\": <job number>, \"reason\": <one short sentence>}.\n\n"
+        f"Resume:\n{resume[:4000]}\n\nJobs:\n{candidates}"
+    )
+
+def apply_rerank(reply: str, hits: List[SearchHit], limit: int) -> List[Dict[str, Any]]:
+    """Order hits by the model's choices, falling back to similarity order if the reply is unusable"""
+    try:
+        start, end = reply.find('['), reply.rfind(']')
+        choices = RERANK_SCHEMA.validate_json(reply[start:end + 1]) if start != -1 and end > start else []
+    except ValidationError:
+        choices = []
+    ranked, seen = [], set()
+    for choice in choices:
+        if 0 <= choice.n < len(hits) and choice.n not in seen:
+            seen.add(choice.n)
+            ranked.append({**hits[choice.n].to_dict(), 'reason': choice.reason})
+    if not ranked:
+        ranked = [hit.to_dict() for hit in hits]
+    return ranked[:limit]
@@ -0,0 +1,186 @@
+from typing import Dict, Any, List, Optional, Union, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+from .llm_cache import normalize_prompt
+from .llm_rate_limit import PRIORITY_PAID
+
+# Bump when the prompt or schema changes so every resume is matched again
+MATCH_PROMPT_VERSION = "v1"
+RESULT_COLUMNS = ['subscription_id', 'title', 'company', 'description', 'url']
+
+class JobListing(BaseModel):
+    title: str = Field(min_length=1, max_length=255)
+    company: Optional[str] = Field(default=None, max_length=255)
+    description: Optional[str] = None
+    url: Optional[str] = Field(default=None, max_length=512)
+
+class ResumeMatches(BaseModel):
+    resume_id: Union[int, str]
+    jobs: List[JobListing] = []
+
+# Validated straight from the JSON text by pydantic-core, without an intermediate json.loads
+BATCH_SCHEMA = TypeAdapter(List[ResumeMatches])
+
+@dataclass
+class ResumeInput:
+    subscription_id: int
+    resume: str
+    fingerprint: Optional[str] = None
+
+@dataclass
+class BatchMatchReport:
+    matched: Dict[int, List[Dict[str, Any]]] = field(default_factory=dict)
+    skipped: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)
+    batches: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'matched': {str(key): jobs for key, jobs in self.matched.items()},
+            'skipped': self.skipped,
+            'failed': {str(key): error for key, error in self.failed.items()},
+            'batches': self.batches
+        }
+
+def resume_fingerprint(resume: str) -> str:
+    """Stable hash of a resume, insensitive to case and whitespace edits"""
+    payload = f"{MATCH_PROMPT_VERSION}\n{normalize_prompt(resume)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def parse_batch(text: str) -> List[ResumeMatches]:
+    """Validate a batch reply, tolerating prose or code fences around the JSON array"""
+    start, end = text.find('['), text.rfind(']')
+    if start == -1 or end < start:
+        raise ValueError("Reply does not contain a JSON array")
+    return BATCH_SCHEMA.validate_json(text[start:end + 1])
+
+class JobMatcher:
+    """Matches many resumes to jobs with a few batched LLM calls
+
+    Resumes are packed into batches of at most batch_size resumes and
+    max_batch_chars characters. Each reply is validated against BATCH_SCHEMA.
+    A batch whose reply fails validation is split in half and retried, so one
+    bad answer only costs a single resume. Resumes whose fingerprint matches
+    the one stored on job_subscriptions are skipped. Results are written to
+    job_results in one bulk insert.
+    """
+
+    def __init__(self, ai, pool=None, provider: str = "gemini", batch_size: int = 8,
+                 max_batch_chars: int = 24000, jobs_per_resume: int = 5, priority: int = PRIORITY_PAID):
+        self.ai = ai
+        self.pool = pool
+        self.provider = provider
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.jobs_per_resume = jobs_per_resume
+        self.priority = priority
+
+    def pack(self, resumes: List[ResumeInput]) -> List[List[ResumeInput]]:
+        batches, current, size = [], [], 0
+        for item in resumes:
+            if current and (len(current) >= self.batch_size or size + len(item.resume) > self.max_batch_chars):
+                batches.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += len(item.resume)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _prompt(self, batch: List[ResumeInput]) -> str:
+        resumes = "\n\n".join(f"<resume id=\"{item.subscription_id}\">\n{item.resume}\n</resume>" for item in batch)
+        return (
+            f"Find up to {self.jobs_per_resume} jobs matching each resume below. "
+            "Reply with only a JSON array with one object per resume: "
+            "{\"resume_id\": <id>, \"jobs\": [{\"title\": str, \"company\": str, \"description\": str, \"url\": str}]}.\n\n"
+            f"{resumes}"
+        )
+
+    async def _match_batch(self, batch: List[ResumeInput]) -> Tuple[Dict[int, list], Dict[int, str]]:
+        results: Dict[int, list] = {}
+        failed: Dict[int, str] = {}
+        prompt = self._prompt(batch)
+        try:
+            reply = await self.ai.aquery(prompt, provider=self.provider, priority=self.priority)
+            parsed = parse_batch(reply)
+        except (ValidationError, ValueError) as e:
+            # Don't let the invalid reply be served from the cache to the next attempt
+            await asyncio.to_thread(self.ai.forget, prompt, self.provider)
+            if len(batch) == 1:
+                return results, {batch[0].subscription_id: f"Invalid reply: {str(e)[:200]}"}
+            middle = len(batch) // 2
+            halves = await asyncio.gather(self._match_batch(batch[:middle]), self._match_batch(batch[middle:]))
+            for half_results, half_failed in halves:
+                results.update(half_results)
+                failed.update(half_failed)
+            return results, failed
+        except Exception as e:
+            return results, {item.subscription_id: str(e) for item in batch}
+
+        by_id = {str(item.resume_id): item for item in parsed}
+        missing = []
+        for item in batch:
+            match = by_id.get(str(item.subscription_id))
+            if match is None:
+                missing.append(item)
+            else:
+                results[item.subscription_id] = [job.model_dump() for job in match.jobs[:self.jobs_per_resume]]
+        if missing and len(missing) < len(batch):
+            retry_results, retry_failed = await self._match_batch(missing)
+            results.update(retry_results)
+            failed.update(retry_failed)
+        else:
+            failed.update({item.subscription_id: "Missing from reply" for item in missing})
+        return results, failed
+
+    async def amatch(self, resumes: List[ResumeInput], force: bool = False, save: bool = True) -> BatchMatchReport:
+        report = BatchMatchReport()
+        fingerprints: Dict[int, str] = {}
+        pending = []
+        for item in resumes:
+            fingerprint = resume_fingerprint(item.resume)
+            if not force and item.fingerprint == fingerprint:
+                report.skipped.append(item.subscription_id)
+                continue
+            fingerprints[item.subscription_id] = fingerprint
+            pending.append(item)
+
+        batches = self.pack(pending)
+        report.batches = len(batches)
+        for results, failed in await asyncio.gather(*[self._match_batch(batch) for batch in batches]):
+            report.matched.update(results)
+            report.failed.update(failed)
+
+        if save and self.pool is not None and report.matched:
+            await asyncio.to_thread(self.save, report.matched, fingerprints)
+        return report
+
+    def match(self, resumes: List[ResumeInput], force: bool = False, save: bool = True) -> BatchMatchReport:
+        return self.ai.runtime.run_sync(self.amatch(resumes, force, save))
+
+    def load_active_subscriptions(self) -> List[ResumeInput]:
+        with self.pool.transaction() as tx:
+            tx.execute(
+                "SELECT id, resume, resume_fingerprint FROM job_subscriptions "
+                "WHERE status = 'active' AND resume IS NOT NULL ORDER BY id"
+            )
+            return [ResumeInput(row[0], row[1], row[2]) for row in tx.fetchall()]
+
+    def save(self, matched: Dict[int, List[Dict[str, Any]]], fingerprints: Dict[int, str]):
+        """Bulk insert results and record fingerprints so unchanged resumes are skipped next run"""
+        rows = [
+            (subscription_id, job['title'], job.get('company'), job.get('description'), job.get('url'))
+            for subscription_id, jobs in matched.items()
+            for job in jobs
+        ]
+        with self.pool.transaction() as tx:
+            if rows:
+                tx.insert_many('job_results', RESULT_COLUMNS, rows)
+            tx.executemany(
+                "UPDATE job_subscriptions SET resume_fingerprint = %s, matched_at = CURRENT_TIMESTAMP WHERE id = %s",
+                [(fingerprints[subscription_id], subscription_id) for subscription_id in matched]
+            )
@@ -0,0 +1,230 @@
+from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass, asdict
+from collections import OrderedDict
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+
+CACHE_KEY_PREFIX = "ai:v1:"
+PARTIAL_SUFFIX = ":partial"
+WHITESPACE = re.compile(r'\s+')
+TRAILING_PUNCTUATION = re.compile(r'[\s.!?;:,]+$')
+
+@dataclass
+class CacheMetrics:
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    oversized: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return (self.l1_hits + self.l2_hits) / lookups if lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = asdict(self)
+        report['hit_rate'] = self.hit_rate
+        return report
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, Unicode forms, whitespace and trailing punctuation so near-identical prompts share a key"""
+    text = unicodedata.normalize('NFKC', prompt).casefold()
+    text = WHITESPACE.sub(' ', text).strip()
+    return TRAILING_PUNCTUATION.sub('', text)
+
+def response_cache_key(provider: str, model: Optional[str], prompt: str,
+                       params: Optional[Dict[str, Any]] = None, normalize: bool = False) -> str:
+    """Stable content hash of everything that determines a completion
+
+    Unlike hash(), this is identical across processes and restarts, so every
+    worker shares the same Redis entries.
+    """
+    payload = json.dumps({
+        'provider': provider,
+        'model': model,
+        'prompt': normalize_prompt(prompt) if normalize else prompt,
+        'params': params or {}
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return CACHE_KEY_PREFIX + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """Two-tier LLM response cache: an in-process LRU in front of Redis
+
+    The LRU is bounded by entry count and total bytes, and values larger than
+    max_value_bytes are never cached. Every entry carries its own TTL; entries
+    promoted from Redis keep their remaining Redis TTL. Redis errors count as
+    misses so a cache outage never fails a query.
+
+    Streamed responses are also appended to a short-lived partial entry so a
+    retried request can resume an interrupted stream instead of starting over.
+    """
+
+    def __init__(self, redis_client: Optional[Callable[[], Any]] = None, max_entries: int = 1024,
+                 max_bytes: int = 16 * 1024 * 1024, max_value_bytes: int = 256 * 1024,
+                 default_ttl: int = 3600, near_duplicate: bool = False, partial_ttl: int = 600):
+        self._redis_client = redis_client or (lambda: None)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_value_bytes
+        self.default_ttl = default_ttl
+        self.near_duplicate = near_duplicate
+        self.partial_ttl = partial_ttl
+        self._partials: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = CacheMetrics()
+
+    def key_for(self, provider: str, model: Optional[str], prompt: str,
+                params: Optional[Dict[str, Any]] = None) -> str:
+        return response_cache_key(provider, model, prompt, params, normalize=self.near_duplicate)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            self._metrics.l1_hits += 1
+            return value
+
+    def _set_local(self, key: str, value: str, ttl: float, size: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._metrics.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.get(key)
+                pipe.pttl(key)
+                raw, pttl = pipe.execute()
+            except Exception:
+                raw, pttl = None, None
+                with self._lock:
+                    self._metrics.errors += 1
+            if raw is not None:
+                value = raw.decode('utf-8') if isinstance(raw, bytes) else raw
+                ttl = pttl / 1000 if pttl and pttl > 0 else self.default_ttl
+                self._set_local(key, value, ttl, len(raw))
+                with self._lock:
+                    self._metrics.l2_hits += 1
+                return value
+
+        with self._lock:
+            self._metrics.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        ttl = ttl or self.default_ttl
+        size = len(value.encode('utf-8'))
+        if size > self.max_value_bytes:
+            with self._lock:
+                self._metrics.oversized += 1
+            return
+
+        self._set_local(key, value, ttl, size)
+        with self._lock:
+            self._metrics.sets += 1
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.setex(key, int(ttl), value)
+            except Exception:
+                with self._lock:
+                    self._metrics.errors += 1
+
+    def delete(self, key: str):
+        """Drop a cached response (e.g. one the caller found unusable) from both tiers"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.delete(key)
+            except Exception:
+                with self._lock:
+                    self._metrics.errors += 1
+
+    def get_partial(self, key: str) -> str:
+        """Text already streamed for key by an unfinished request ('' if none)
+
+        Redis is authoritative so a retry can land on any worker; the local copy
+        is only used when Redis is not configured or unreachable.
+        """
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = client.get(key + PARTIAL_SUFFIX)
+                if raw is None:
+                    return ''
+                return raw.decode('utf-8') if isinstance(raw, bytes) else raw
+            except Exception:
+                with self._lock:
+                    self._metrics.errors += 1
+
+        with self._lock:
+            entry = self._partials.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+        return ''
+
+    def set_partial(self, key: str, text: str):
+        """Record everything streamed so far for key"""
+        with self._lock:
+            self._partials.pop(key, None)
+            self._partials[key] = (text, time.monotonic() + self.partial_ttl)
+            while len(self._partials) > self.max_entries:
+                self._partials.popitem(last=False)
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.setex(key + PARTIAL_SUFFIX, self.partial_ttl, text)
+            except Exception:
+                with self._lock:
+                    self._metrics.errors += 1
+
+    def clear_partial(self, key: str):
+        with self._lock:
+            self._partials.pop(key, None)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.delete(key + PARTIAL_SUFFIX)
+            except Exception:
+                with self._lock:
+                    self._metrics.errors += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            report = self._metrics.to_dict()
+            report.update(entries=len(self._entries), bytes=self._bytes, partials=len(self._partials))
+        return report
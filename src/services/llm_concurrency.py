@@ -0,0 +1,240 @@
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+import asyncio
+import concurrent.futures
+import queue
+import threading
+
+_END = object()
+
+class SingleFlight:
+    """Coalesce identical in-flight calls into one shared task
+
+    Every caller with the same key awaits the same task. A caller that is
+    cancelled (or times out) only stops waiting; the shared call itself is
+    cancelled once its last waiter has gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, list] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(factory())
+            call = [task, 0]
+            self._calls[key] = call
+            task.add_done_callback(lambda _: self._calls.get(key) is call and self._calls.pop(key))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            call[1] -= 1
+            if call[1] == 0 and not task.done():
+                task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+class _SharedStream:
+    def __init__(self):
+        self.items: list = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.waiters = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+class StreamFlight:
+    """Share one in-flight async generator among identical callers
+
+    The first caller starts the stream; later callers replay what it has
+    produced so far and then follow it live. The stream is cancelled once its
+    last reader has gone.
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, _SharedStream] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def _pump(self, key: str, shared: _SharedStream, stream: AsyncIterator[Any]):
+        try:
+            async for item in stream:
+                shared.items.append(item)
+                shared.notify()
+        except Exception as e:
+            # Handed to every reader instead of failing the task
+            shared.error = e
+        except BaseException as e:
+            shared.error = e
+            raise
+        finally:
+            shared.done = True
+            if self._streams.get(key) is shared:
+                self._streams.pop(key)
+            shared.notify()
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.ensure_future(self._pump(key, shared, factory()))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        shared.waiters += 1
+        try:
+            position = 0
+            while True:
+                while position < len(shared.items):
+                    yield shared.items[position]
+                    position += 1
+                if shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                await shared.changed.wait()
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                shared.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+class LLMRuntime:
+    """Event loop thread that multiplexes provider calls for a whole worker process
+
+    Sync callers block on run_sync() while the loop overlaps their requests;
+    async callers on other loops are bridged with dispatch(). Provider calls are
+    bounded by a semaphore per provider and identical prompts share one call.
+    """
+
+    def __init__(self, provider_limits: Optional[Dict[str, int]] = None, default_limit: int = 16):
+        self.provider_limits = dict(provider_limits or {})
+        self.default_limit = default_limit
+        self.flights = SingleFlight()
+        self.streams = StreamFlight()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._active: Dict[str, int] = {}
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="llm-runtime", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    @asynccontextmanager
+    async def limit(self, provider: str):
+        """Hold one of the provider's concurrency slots (must run on the runtime loop)"""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.provider_limits.get(provider, self.default_limit))
+            self._semaphores[provider] = semaphore
+        async with semaphore:
+            self._active[provider] = self._active.get(provider, 0) + 1
+            try:
+                yield
+            finally:
+                self._active[provider] -= 1
+
+    async def _with_timeout(self, coro: Awaitable[Any], timeout: Optional[float]) -> Any:
+        return await asyncio.wait_for(coro, timeout) if timeout else await coro
+
+    async def dispatch(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Await coro on the runtime loop from any event loop; cancelling the caller cancels it"""
+        if self.in_loop():
+            return await self._with_timeout(coro, timeout)
+        future = asyncio.run_coroutine_threadsafe(self._with_timeout(coro, timeout), self.loop)
+        return await asyncio.wrap_future(future)
+
+    def run_sync(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Block the calling thread until coro finishes on the runtime loop"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("run_sync() called from the runtime loop; await the async API instead")
+        future = asyncio.run_coroutine_threadsafe(self._with_timeout(coro, timeout), self.loop)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise asyncio.CancelledError()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream_sync(self, stream: AsyncIterator[Any], idle_timeout: Optional[float] = None,
+                    keepalive: Optional[float] = None) -> Iterator[Any]:
+        """Iterate an async generator on the runtime loop from a blocking thread
+
+        Items are handed over as soon as they are produced. With keepalive set,
+        None is yielded after that many idle seconds so HTTP responses can send a
+        heartbeat. Closing the returned generator (e.g. a client disconnecting
+        mid-response) cancels the stream.
+        """
+        items: queue.Queue = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in stream:
+                    items.put((item, None))
+                items.put((_END, None))
+            except BaseException as e:
+                items.put((_END, e))
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            idle = 0.0
+            while True:
+                wait = min(filter(None, [keepalive, idle_timeout and idle_timeout - idle]), default=None)
+                try:
+                    item, error = items.get(timeout=wait)
+                except queue.Empty:
+                    idle += wait
+                    if idle_timeout and idle >= idle_timeout:
+                        raise TimeoutError(f"No output from stream within {idle_timeout}s")
+                    yield None
+                    continue
+                idle = 0.0
+                if item is _END:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': dict(self._active),
+            'in_flight': self.flights.in_flight(),
+            'started': self.flights.started,
+            'coalesced': self.flights.coalesced,
+            'streaming': self.streams.in_flight(),
+            'streams_coalesced': self.streams.coalesced
+        }
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,298 @@
+from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass
+from collections import deque
+import asyncio
+import random
+import threading
+import time
+
+PRIORITY_PAID = 0
+PRIORITY_FREE = 1
+# Out of every five grants while both classes wait, four go to paid requests
+DEFAULT_PRIORITY_WEIGHTS = {PRIORITY_PAID: 4, PRIORITY_FREE: 1}
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Refills the request and token buckets, then takes one request and `tokens`
+# tokens if both have room. Returns 0 when granted, otherwise the milliseconds
+# to wait. Time comes from the Redis server so every worker shares one clock.
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local paused_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if paused_until > now then return paused_until - now end
+
+local rpm, tpm, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local function level(key, capacity)
+  local v = redis.call('HMGET', key, 'level', 'ts')
+  local current = tonumber(v[1]) or capacity
+  local ts = tonumber(v[2]) or now
+  return math.min(capacity, current + (now - ts) * capacity / 60000)
+end
+
+local requests = level(KEYS[1], rpm)
+local budget = level(KEYS[2], tpm)
+local wait = 0
+if requests < 1 then wait = (1 - requests) * 60000 / rpm end
+local need = math.min(tokens, tpm)
+if budget < need then wait = math.max(wait, (need - budget) * 60000 / tpm) end
+if wait == 0 then
+  requests = requests - 1
+  budget = budget - tokens
+end
+redis.call('HSET', KEYS[1], 'level', requests, 'ts', now)
+redis.call('HSET', KEYS[2], 'level', budget, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+redis.call('PEXPIRE', KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+REFUND_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local capacity, tokens = tonumber(ARGV[1]), tonumber(ARGV[2])
+local v = redis.call('HMGET', KEYS[1], 'level', 'ts')
+if not v[1] then return 0 end
+local current = math.min(capacity, tonumber(v[1]) + (now - tonumber(v[2])) * capacity / 60000)
+redis.call('HSET', KEYS[1], 'level', math.min(capacity, current + tokens), 'ts', now)
+return 1
+"""
+
+@dataclass
+class ProviderLimits:
+    requests_per_minute: int
+    tokens_per_minute: int
+
+class TokenBucket:
+    """In-process bucket refilled continuously up to capacity per minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+        return self.level
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now)"""
+        missing = min(amount, self.capacity) - self.refill(now)
+        return max(0.0, missing * 60 / self.capacity)
+
+class PriorityWaitQueue:
+    """Weighted round robin over FIFO queues, one per priority class
+
+    Higher-priority classes get more turns, but every waiting class keeps getting
+    some, so free requests are delayed under load rather than starved.
+    """
+
+    def __init__(self, weights: Dict[int, int]):
+        self.weights = dict(weights)
+        self._queues: Dict[int, deque] = {priority: deque() for priority in self.weights}
+        self._credits = dict(self.weights)
+
+    def push(self, priority: int, item: Any):
+        self._queues.setdefault(priority, deque()).append(item)
+        self.weights.setdefault(priority, 1)
+        self._credits.setdefault(priority, self.weights[priority])
+
+    def _prune(self):
+        for queue in self._queues.values():
+            while queue and queue[0].done():
+                queue.popleft()
+
+    def peek(self) -> Optional[Any]:
+        self._prune()
+        waiting = [priority for priority in sorted(self._queues) if self._queues[priority]]
+        if not waiting:
+            return None
+        if all(self._credits[priority] <= 0 for priority in waiting):
+            for priority in self._credits:
+                self._credits[priority] = self.weights[priority]
+        for priority in waiting:
+            if self._credits[priority] > 0:
+                return priority
+        return waiting[0]
+
+    def pop(self, priority: int) -> Any:
+        self._credits[priority] -= 1
+        return self._queues[priority].popleft()
+
+    def __len__(self) -> int:
+        self._prune()
+        return sum(len(queue) for queue in self._queues.values())
+
+class ProviderRateLimiter:
+    """Requests/min and tokens/min limits per provider, shared through Redis
+
+    Callers wait in a per-provider PriorityWaitQueue and only the head of the
+    queue draws from the buckets, so paid requests overtake free ones without
+    starving them. Buckets live in Redis (one Lua call per grant) so every
+    worker shares the provider's quota. If Redis is not configured or errors,
+    each process falls back to its own in-memory buckets. A provider's
+    Retry-After is recorded as a pause that every worker honours.
+
+    acquire() must be awaited on a single event loop (the LLM runtime loop).
+    """
+
+    def __init__(self, limits: Dict[str, ProviderLimits], redis_client: Optional[Callable[[], Any]] = None,
+                 key_prefix: str = "ai:ratelimit:", weights: Optional[Dict[int, int]] = None):
+        self.limits = dict(limits)
+        self._redis_client = redis_client or (lambda: None)
+        self.key_prefix = key_prefix
+        self.weights = dict(weights or DEFAULT_PRIORITY_WEIGHTS)
+        self._local: Dict[str, tuple] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._queues: Dict[str, PriorityWaitQueue] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._scripts: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled_seconds = 0.0
+        self.redis_errors = 0
+
+    def _keys(self, provider: str):
+        base = self.key_prefix + provider
+        return [base + ":requests", base + ":tokens", base + ":paused"]
+
+    def _redis_scripts(self, client):
+        scripts = self._scripts.get(id(client))
+        if scripts is None:
+            scripts = (client.register_script(ACQUIRE_SCRIPT), client.register_script(REFUND_SCRIPT))
+            self._scripts = {id(client): scripts}
+        return scripts
+
+    def _local_wait(self, provider: str, tokens: int) -> float:
+        limits = self.limits[provider]
+        now = time.monotonic()
+        with self._lock:
+            paused = self._paused_until.get(provider, 0.0) - now
+            if paused > 0:
+                return paused
+            requests, budget = self._local.setdefault(provider, (
+                TokenBucket(limits.requests_per_minute),
+                TokenBucket(limits.tokens_per_minute)
+            ))
+            wait = max(requests.wait_for(1, now), budget.wait_for(tokens, now))
+            if wait == 0:
+                requests.level -= 1
+                budget.level -= tokens
+            return wait
+
+    def try_acquire(self, provider: str, tokens: int) -> float:
+        """Take one request and tokens from provider's buckets; return seconds to wait if refused"""
+        if provider not in self.limits:
+            return 0.0
+        client = self._redis_client()
+        if client is not None:
+            limits = self.limits[provider]
+            try:
+                acquire, _ = self._redis_scripts(client)
+                wait_ms = acquire(keys=self._keys(provider),
+                                  args=[limits.requests_per_minute, limits.tokens_per_minute, tokens])
+                return int(wait_ms) / 1000
+            except Exception:
+                self.redis_errors += 1
+        return self._local_wait(provider, tokens)
+
+    def refund(self, provider: str, tokens: int):
+        """Return tokens reserved for output that the provider did not produce"""
+        if provider not in self.limits or tokens <= 0:
+            return
+        client = self._redis_client()
+        if client is not None:
+            try:
+                _, refund = self._redis_scripts(client)
+                refund(keys=self._keys(provider)[1:2], args=[self.limits[provider].tokens_per_minute, tokens])
+                return
+            except Exception:
+                self.redis_errors += 1
+        with self._lock:
+            buckets = self._local.get(provider)
+            if buckets:
+                budget = buckets[1]
+                budget.level = min(budget.capacity, budget.refill(time.monotonic()) + tokens)
+
+    def pause(self, provider: str, seconds: float):
+        """Hold every request to provider for seconds (e.g. from a Retry-After header)"""
+        with self._lock:
+            self._paused_until[provider] = max(self._paused_until.get(provider, 0.0), time.monotonic() + seconds)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                client.set(self._keys(provider)[2], int((time.time() + seconds) * 1000), px=int(seconds * 1000))
+            except Exception:
+                self.redis_errors += 1
+
+    async def acquire(self, provider: str, tokens: int, priority: int = PRIORITY_FREE):
+        """Wait for provider's turn and quota; cancelling the caller leaves the queue"""
+        if provider not in self.limits:
+            return
+        queue = self._queues.setdefault(provider, PriorityWaitQueue(self.weights))
+        waiter = asyncio.get_running_loop().create_future()
+        queue.push(priority, _Waiter(waiter, tokens))
+        dispatcher = self._dispatchers.get(provider)
+        if dispatcher is None or dispatcher.done():
+            self._dispatchers[provider] = asyncio.ensure_future(self._dispatch(provider, queue))
+        await waiter
+
+    async def _dispatch(self, provider: str, queue: PriorityWaitQueue):
+        while True:
+            priority = queue.peek()
+            if priority is None:
+                return
+            head = queue._queues[priority][0]
+            wait = await asyncio.to_thread(self.try_acquire, provider, head.tokens)
+            if wait > 0:
+                self.throttled_seconds += wait
+                # Jitter so workers sharing the bucket do not retry in lockstep
+                await asyncio.sleep(wait + random.uniform(0, min(0.25, wait)))
+                continue
+            queue.pop(priority)
+            if head.future.done():
+                # The caller gave up while we were acquiring; hand the quota back
+                await asyncio.to_thread(self.refund, provider, head.tokens)
+                continue
+            head.future.set_result(None)
+            self.granted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'waiting': {provider: len(queue) for provider, queue in self._queues.items()},
+            'granted': self.granted,
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'redis_errors': self.redis_errors
+        }
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    tokens: int
+
+    def done(self) -> bool:
+        return self.future.done()
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by a provider error's Retry-After header, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, overload and transient server or network errors"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is None:
+        code = getattr(error, 'code', None)
+        status = code if isinstance(code, int) else None
+    return status in RETRYABLE_STATUSES or type(error).__name__ in ('ResourceExhausted', 'ServiceUnavailable', 'APIConnectionError')
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,306 @@
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass, field, asdict
+from contextlib import contextmanager
+from collections import deque
+import bisect
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets: 50ms growing 1.5x up to ~10 minutes
+LATENCY_BUCKETS = tuple(0.05 * 1.5 ** i for i in range(24))
+
+@dataclass
+class ProviderProfile:
+    """Static facts about a provider used when routing"""
+    name: str
+    input_cost_per_1k: float
+    output_cost_per_1k: float
+    max_concurrency: int = 16
+    prior_latency: float = 2.0
+
+    def estimate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_cost_per_1k + output_tokens * self.output_cost_per_1k) / 1000
+
+@dataclass
+class RouteBudget:
+    """Per-request limits; None means unconstrained"""
+    latency: Optional[float] = None
+    cost: Optional[float] = None
+
+@dataclass
+class ProviderSnapshot:
+    samples: int = 0
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+    error_rate: float = 0.0
+    avg_cost: float = 0.0
+    avg_output_tokens: float = 0.0
+    queue_depth: int = 0
+    circuit: str = "closed"
+
+@dataclass
+class _Slice:
+    started: float
+    histogram: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    errors: int = 0
+    cost: float = 0.0
+    output_tokens: int = 0
+
+class RollingWindow:
+    """Latency histogram, error and cost counters over the last window_seconds
+
+    Samples land in fixed time slices, so recording is O(1) and memory is
+    bounded no matter the request rate. Percentiles are read from the merged
+    histogram, accurate to one bucket (about 50%).
+    """
+
+    def __init__(self, window_seconds: float = 300.0, slice_seconds: float = 10.0):
+        self.window_seconds = window_seconds
+        self.slice_seconds = slice_seconds
+        self._slices: deque = deque()
+
+    def _current(self, now: float) -> _Slice:
+        if not self._slices or now - self._slices[-1].started >= self.slice_seconds:
+            self._slices.append(_Slice(now))
+        while now - self._slices[0].started > self.window_seconds:
+            self._slices.popleft()
+        return self._slices[-1]
+
+    def record(self, latency: float, ok: bool, cost: float = 0.0, output_tokens: int = 0, now: float = None):
+        current = self._current(now or time.monotonic())
+        current.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        current.count += 1
+        current.errors += 0 if ok else 1
+        current.cost += cost
+        current.output_tokens += output_tokens
+
+    def summarize(self, now: float = None) -> ProviderSnapshot:
+        now = now or time.monotonic()
+        while self._slices and now - self._slices[0].started > self.window_seconds:
+            self._slices.popleft()
+        histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        snapshot = ProviderSnapshot()
+        for window_slice in self._slices:
+            for i, count in enumerate(window_slice.histogram):
+                histogram[i] += count
+            snapshot.samples += window_slice.count
+            snapshot.error_rate += window_slice.errors
+            snapshot.avg_cost += window_slice.cost
+            snapshot.avg_output_tokens += window_slice.output_tokens
+        if not snapshot.samples:
+            return snapshot
+
+        snapshot.error_rate /= snapshot.samples
+        snapshot.avg_cost /= snapshot.samples
+        snapshot.avg_output_tokens /= snapshot.samples
+        snapshot.p50, snapshot.p95, snapshot.p99 = (
+            self._percentile(histogram, snapshot.samples, q) for q in (0.50, 0.95, 0.99)
+        )
+        return snapshot
+
+    @staticmethod
+    def _percentile(histogram: List[int], total: int, q: float) -> float:
+        target = q * total
+        seen = 0
+        for i, count in enumerate(histogram):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS[min(i, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+class CircuitBreaker:
+    """Stops routing to a provider that keeps failing
+
+    Opens after failure_threshold consecutive failures, or when the windowed
+    error rate reaches error_rate_threshold. After cooldown seconds a single
+    probe request is let through (half-open); its outcome closes or re-opens
+    the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, error_rate_threshold: float = 0.5,
+                 min_samples: int = 10, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allows(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            self._probing = False
+        return self.state == "half_open" and not self._probing
+
+    def on_dispatch(self):
+        if self.state == "half_open":
+            self._probing = True
+
+    def on_result(self, ok: bool, snapshot: Optional[ProviderSnapshot], now: float):
+        """snapshot is the provider's current window, only needed on failure"""
+        if ok:
+            self.consecutive_failures = 0
+            if self.state == "half_open":
+                self.state = "closed"
+            return
+        self.consecutive_failures += 1
+        too_many = self.consecutive_failures >= self.failure_threshold
+        error_rate = bool(snapshot) and snapshot.samples >= self.min_samples and snapshot.error_rate >= self.error_rate_threshold
+        if self.state == "half_open" or too_many or error_rate:
+            self.state = "open"
+            self.opened_at = now
+            self._probing = False
+
+class LLMRouter:
+    """Chooses an AI provider from live latency, error, cost and queue depth
+
+    Each provider keeps a RollingWindow and CircuitBreaker. Snapshots are
+    refreshed at most every refresh_interval seconds, so a routing decision
+    only reads a few cached numbers per provider and stays O(1).
+
+    A provider is eligible when its circuit allows traffic and its expected
+    latency (p95 stretched by queue depth) and cost fit the request budget. The
+    cheapest eligible provider wins. If none fit, the fastest available
+    provider is used. Every explore_every-th decision tries the runner-up so
+    idle providers keep fresh statistics.
+    """
+
+    def __init__(self, profiles: Sequence[ProviderProfile], window_seconds: float = 300.0,
+                 refresh_interval: float = 1.0, default_budget: Optional[RouteBudget] = None,
+                 min_samples: int = 10, hedge_ratio: float = 0.1, explore_every: int = 50,
+                 breaker_cooldown: float = 30.0):
+        self.profiles: Dict[str, ProviderProfile] = {profile.name: profile for profile in profiles}
+        self.refresh_interval = refresh_interval
+        self.default_budget = default_budget or RouteBudget()
+        self.min_samples = min_samples
+        self.hedge_ratio = hedge_ratio
+        self.explore_every = explore_every
+        self._windows = {name: RollingWindow(window_seconds) for name in self.profiles}
+        self._breakers = {name: CircuitBreaker(min_samples=min_samples, cooldown=breaker_cooldown) for name in self.profiles}
+        self._snapshots = {name: ProviderSnapshot() for name in self.profiles}
+        self._refreshed_at = {name: 0.0 for name in self.profiles}
+        self._in_flight = {name: 0 for name in self.profiles}
+        self._decisions = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def _snapshot(self, name: str, now: float) -> ProviderSnapshot:
+        if now - self._refreshed_at[name] >= self.refresh_interval:
+            snapshot = self._windows[name].summarize(now)
+            snapshot.circuit = self._breakers[name].state
+            self._snapshots[name] = snapshot
+            self._refreshed_at[name] = now
+        return self._snapshots[name]
+
+    def expected_latency(self, name: str, now: float = None) -> float:
+        profile = self.profiles[name]
+        snapshot = self._snapshot(name, now or time.monotonic())
+        latency = snapshot.p95 if snapshot.samples >= self.min_samples else profile.prior_latency
+        # Requests beyond the concurrency limit wait for a slot
+        backlog = max(0, self._in_flight[name] - profile.max_concurrency + 1)
+        return latency * (1 + backlog / profile.max_concurrency)
+
+    def expected_cost(self, name: str, input_tokens: int, now: float = None) -> float:
+        profile = self.profiles[name]
+        snapshot = self._snapshot(name, now or time.monotonic())
+        output_tokens = snapshot.avg_output_tokens if snapshot.samples else 500
+        # Failed calls are retried, so unreliable providers cost more per answer
+        return profile.estimate_cost(input_tokens, output_tokens) / max(0.1, 1 - snapshot.error_rate)
+
+    def candidates(self, input_tokens: int = 0, budget: Optional[RouteBudget] = None,
+                   allowed: Optional[Sequence[str]] = None, exclude: Sequence[str] = ()) -> List[str]:
+        """Available providers, best first"""
+        budget = budget or self.default_budget
+        now = time.monotonic()
+        with self._lock:
+            scored = []
+            for name in (allowed or self.profiles):
+                if name not in self.profiles or name in exclude or not self._breakers[name].allows(now):
+                    continue
+                latency = self.expected_latency(name, now)
+                cost = self.expected_cost(name, input_tokens, now)
+                fits = (budget.latency is None or latency <= budget.latency) and (budget.cost is None or cost <= budget.cost)
+                scored.append((not fits, cost if fits else latency, name))
+        return [name for _, _, name in sorted(scored)]
+
+    def choose(self, input_tokens: int = 0, budget: Optional[RouteBudget] = None,
+               allowed: Optional[Sequence[str]] = None, exclude: Sequence[str] = ()) -> Optional[str]:
+        ranked = self.candidates(input_tokens, budget, allowed, exclude)
+        if not ranked:
+            return None
+        with self._lock:
+            self._decisions += 1
+            explore = len(ranked) > 1 and self.explore_every and self._decisions % self.explore_every == 0
+        return ranked[1] if explore else ranked[0]
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds to wait on name before hedging, or None if a hedge is not warranted now"""
+        with self._lock:
+            snapshot = self._snapshot(name, time.monotonic())
+            if snapshot.samples < self.min_samples:
+                return None
+            if self._hedges + 1 > max(1.0, self._decisions * self.hedge_ratio):
+                return None
+            return snapshot.p95
+
+    def note_hedge(self):
+        with self._lock:
+            self._hedges += 1
+
+    @contextmanager
+    def track(self, name: str, input_tokens: int = 0):
+        """Count a call against name's queue depth and record its outcome
+
+        The body may set `call.output_tokens`; the call counts as failed if the
+        body raises anything other than cancellation.
+        """
+        call = _TrackedCall()
+        started = time.monotonic()
+        with self._lock:
+            self._in_flight[name] += 1
+            self._breakers[name].on_dispatch()
+        try:
+            yield call
+        except BaseException as e:
+            call.ok = isinstance(e, GeneratorExit) or type(e).__name__ == 'CancelledError'
+            call.cancelled = call.ok
+            raise
+        finally:
+            now = time.monotonic()
+            with self._lock:
+                self._in_flight[name] -= 1
+                if not call.cancelled:
+                    cost = self.profiles[name].estimate_cost(input_tokens, call.output_tokens)
+                    self._windows[name].record(now - started, call.ok, cost, call.output_tokens, now)
+                    window = self._windows[name].summarize(now) if not call.ok else None
+                    self._breakers[name].on_result(call.ok, window, now)
+                elif self._breakers[name].state == "half_open":
+                    # An abandoned probe says nothing about health; let another one through
+                    self._breakers[name]._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            report = {}
+            for name in self.profiles:
+                self._refreshed_at[name] = 0.0
+                snapshot = self._snapshot(name, now)
+                snapshot.queue_depth = self._in_flight[name]
+                report[name] = asdict(snapshot)
+            return {'providers': report, 'decisions': self._decisions, 'hedges': self._hedges}
+
+@dataclass
+class _TrackedCall:
+    ok: bool = True
+    cancelled: bool = False
+    output_tokens: int = 0
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
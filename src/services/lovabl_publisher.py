@@ -3,8 +3,10 @@ from datetime import datetime
 from .supabase_client import SupabaseClient
 from .antilibrary import UnknownEntry
 from .analytics_service import AnalyticsService
+from .publish_pipeline import PublishPipeline, DEFAULT_CHECKPOINT_PATH
 from integrations.lovabl_hook import LovablMarketplace, ProductSpec
 from pathlib import Path
+import asyncio
 import os
 
 class LovablPublisher:
@@ -12,18 +14,23 @@ class LovablPublisher:
         self.supabase = SupabaseClient.get_instance().get_client()
         self.lovabl = LovablMarketplace(os.getenv('LOVABL_API_KEY'))
         self.analytics = AnalyticsService()
+        self.pipeline: PublishPipeline = None
         
     async def _create_product_spec(self, unknown: UnknownEntry) -> ProductSpec:
         """Convert an unknown entry to a Lovabl product specification with optimized pricing"""
         # Get analytics data if this is an existing product
-        result = self.supabase.table('unknowns')\
-            .select('lovabl_listing_id')\
-            .eq('id', unknown.id)\
-            .execute()
+        result = await asyncio.to_thread(
+            self.supabase.table('unknowns')
+            .select('lovabl_listing_id')
+            .eq('id', unknown.id)
+            .execute
+        )
         
         if result.data and result.data[0].get('lovabl_listing_id'):
-            # Get optimized pricing from analytics
-            metrics = await self.analytics.get_product_metrics(result.data[0]['lovabl_listing_id'])
+            # Get optimized pricing from analytics (blocking Supabase reads, so off the event loop)
+            metrics = await asyncio.to_thread(
+                asyncio.run, self.analytics.get_product_metrics(result.data[0]['lovabl_listing_id'])
+            )
             price_tiers = metrics.optimal_price
         else:
             # Use default pricing for new products
@@ -69,8 +76,16 @@ Potential Market Impact: {unknown.potential_impact * 100}%
 Current Exploration Phase: {unknown.exploration_status.title()}
 """
 
-    async def publish_high_impact_unknowns(self, impact_threshold: float = 0.8) -> List[Dict[str, Any]]:
-        """Publish high-impact unknown entries as Lovabl products"""
+    async def publish_high_impact_unknowns(
+        self,
+        impact_threshold: float = 0.8,
+        checkpoint_path: Path = DEFAULT_CHECKPOINT_PATH
+    ) -> List[Dict[str, Any]]:
+        """Publish high-impact unknown entries as Lovabl products
+
+        Unknowns are published concurrently through a PublishPipeline; an interrupted
+        sweep resumes from checkpoint_path on the next call.
+        """
         # Get high-impact unknowns from Supabase
         result = self.supabase.table('unknowns')\
             .select('*')\
@@ -78,53 +93,10 @@ Current Exploration Phase: {unknown.exploration_status.title()}
             .eq('exploration_status', 'investigating')\
             .execute()
         
-        published_products = []
-        
-        for item in result.data:
-            unknown = UnknownEntry.from_dict(item)
-            product_spec = await self._create_product_spec(unknown)
-            
-            try:
-                # Create listing on Lovabl
-                listing = self.lovabl.create_listing(product_spec)
-                
-                # Upload any associated assets
-                if product_spec.assets_dir.exists():
-                    self.lovabl.upload_assets(listing["id"], product_spec.assets_dir)
-                
-                # Enable payment processing if Genix key is available
-                genix_key = os.getenv('GENIX_KEY')
-                if genix_key:
-                    self.lovabl.enable_payment_processing(listing["id"], genix_key)
-                
-                # Update Supabase with publishing info
-                self.supabase.table('unknowns')\
-                    .update({
-                        'lovabl_listing_id': listing["id"],
-                        'last_updated': datetime.now().isoformat()
-                    })\
-                    .eq('id', unknown.id)\
-                    .execute()
-                
-                # Track publishing event
-                await self.analytics.track_event(
-                    'publish',
-                    listing["id"],
-                    {
-                        'unknown_id': unknown.id,
-                        'price_tiers': product_spec.price_tiers
-                    }
-                )
-                
-                published_products.append({
-                    'unknown_id': unknown.id,
-                    'listing_id': listing["id"],
-                    'listing_url': f"https://lovabl.dev/listings/{listing['id']}",
-                    'price_tiers': product_spec.price_tiers
-                })
-                
-            except Exception as e:
-                print(f"Failed to publish unknown {unknown.id}: {str(e)}")
-                continue
-        
-        return published_products 
\ No newline at end of file
+        unknowns = [UnknownEntry.from_dict(item) for item in result.data]
+        self.pipeline = PublishPipeline(self, checkpoint_path=checkpoint_path)
+        return await self.pipeline.run(unknowns)
+
+    def get_pipeline_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage latency metrics from the most recent publishing sweep"""
+        return self.pipeline.get_metrics() if self.pipeline else {}
@@ -0,0 +1,241 @@
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from collections import Counter
+from pathlib import Path
+import json
+import time
+
+PAID_PLAN = 'premium'
+FREE_PLAN = 'free'
+# Payments of $29 or more upgrade a user to the paid plan
+PREMIUM_MIN_AMOUNT = 2900
+# Plans the reconciler manages; any other plan (e.g. a hand-assigned enterprise plan) is left alone
+MANAGED_PLANS = (None, FREE_PLAN, PAID_PLAN)
+PLAN_EVENT_TYPES = [
+    'payment_intent.succeeded',
+    'invoice.paid',
+    'customer.subscription.deleted'
+]
+
+@dataclass
+class PlanEvent:
+    """The plan a Stripe event puts a user on"""
+    email: str
+    plan: str
+    created: int
+    event_id: str
+
+@dataclass
+class PlanChange:
+    email: str
+    old_plan: Optional[str]
+    new_plan: str
+    event_id: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'email': self.email, 'from': self.old_plan, 'to': self.new_plan, 'event_id': self.event_id}
+
+@dataclass
+class ReconcileProgress:
+    chunks_done: int
+    chunks_total: int
+    users_done: int
+    users_total: int
+    changed: int
+    elapsed: float
+
+@dataclass
+class ReconciliationReport:
+    events: int = 0
+    users: int = 0
+    unchanged: int = 0
+    missing: List[str] = field(default_factory=list)
+    unresolved: int = 0
+    custom: List[str] = field(default_factory=list)
+    changes: List[PlanChange] = field(default_factory=list)
+    chunks: int = 0
+    dry_run: bool = False
+    duration: float = 0.0
+
+    def to_dict(self, max_changes: Optional[int] = 100) -> Dict[str, Any]:
+        transitions = Counter(f"{change.old_plan} -> {change.new_plan}" for change in self.changes)
+        return {
+            'events': self.events,
+            'users': self.users,
+            'changed': len(self.changes),
+            'unchanged': self.unchanged,
+            'missing': len(self.missing),
+            'unresolved': self.unresolved,
+            'custom': len(self.custom),
+            'transitions': dict(transitions),
+            'changes': [change.to_dict() for change in self.changes[:max_changes]],
+            'chunks': self.chunks,
+            'dry_run': self.dry_run,
+            'duration': round(self.duration, 3)
+        }
+
+def event_email(obj: Dict[str, Any]) -> Optional[str]:
+    email = (
+        obj.get('receipt_email') or obj.get('customer_email')
+        or (obj.get('customer_details') or {}).get('email')
+        or (obj.get('metadata') or {}).get('email')
+    )
+    return email.strip() if email else None
+
+def plan_for_event(event: Dict[str, Any], email: Optional[str] = None) -> Optional[PlanEvent]:
+    """The plan transition an event implies, or None if it does not affect plans
+
+    email overrides the address found on the event, for events that only carry
+    a customer id (subscription events never include an email).
+    """
+    obj = (event.get('data') or {}).get('object') or {}
+    email = email or event_email(obj)
+    if not email:
+        return None
+    if event['type'] == 'payment_intent.succeeded':
+        plan = PAID_PLAN if (obj.get('amount') or 0) >= PREMIUM_MIN_AMOUNT else None
+    elif event['type'] == 'invoice.paid':
+        plan = PAID_PLAN if (obj.get('amount_paid') or 0) >= PREMIUM_MIN_AMOUNT else None
+    elif event['type'] == 'customer.subscription.deleted':
+        plan = FREE_PLAN
+    else:
+        plan = None
+    return PlanEvent(email, plan, int(event.get('created') or 0), event['id']) if plan else None
+
+def stripe_customer_email(stripe_module) -> Callable[[str], Optional[str]]:
+    """Look up a customer's email through the Stripe API, once per customer id"""
+    cache: Dict[str, Optional[str]] = {}
+
+    def lookup(customer_id: str) -> Optional[str]:
+        if customer_id not in cache:
+            try:
+                customer = stripe_module.Customer.retrieve(customer_id)
+                cache[customer_id] = customer.get('email') if not customer.get('deleted') else None
+            except Exception as e:
+                print(f"Failed to look up Stripe customer {customer_id}: {str(e)}")
+                cache[customer_id] = None
+        return cache[customer_id]
+    return lookup
+
+def stripe_events(stripe_module, since: Optional[int] = None, types: List[str] = PLAN_EVENT_TYPES,
+                  page_size: int = 100) -> Iterator[Dict[str, Any]]:
+    """Page through Stripe's event log (Stripe keeps the last 30 days)"""
+    starting_after = None
+    while True:
+        params = {'limit': page_size, 'types': types}
+        if since:
+            params['created'] = {'gte': since}
+        if starting_after:
+            params['starting_after'] = starting_after
+        page = stripe_module.Event.list(**params)
+        for event in page['data']:
+            yield event.to_dict() if hasattr(event, 'to_dict') else dict(event)
+        if not page['data'] or not page.get('has_more'):
+            return
+        starting_after = page['data'][-1]['id']
+
+def export_events(path: Path) -> Iterator[Dict[str, Any]]:
+    """Events from a local export: JSON lines, a JSON array, or a Stripe list object ({"data": [...]})"""
+    path = Path(path)
+    with open(path) as f:
+        if path.suffix == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        loaded = json.load(f)
+    yield from (loaded.get('data', []) if isinstance(loaded, dict) else loaded)
+
+class PlanReconciler:
+    """Brings users.plan in line with the Stripe event history
+
+    Events are reduced in memory to the latest plan per email, so a full
+    replay costs one pass over the events. Events that carry only a Stripe
+    customer id (subscription deletions) are matched to an email seen on
+    another event of the same customer, or else through customer_email
+    (e.g. stripe_customer_email); those that stay unresolved are counted.
+    Users are then reconciled in chunks. Each chunk runs in one transaction:
+    it reads the chunk's current plans, then writes only the rows that differ
+    with a single UPDATE ... FROM (VALUES ...). Emails with no users row are
+    reported as missing, not created, and users on a plan outside
+    MANAGED_PLANS are reported as custom and left unchanged.
+    """
+
+    def __init__(self, pool, chunk_size: int = 1000, table: str = 'users',
+                 progress: Optional[Callable[[ReconcileProgress], None]] = None,
+                 customer_email: Optional[Callable[[str], Optional[str]]] = None):
+        self.pool = pool
+        self.chunk_size = chunk_size
+        self.table = table
+        self.progress = progress
+        self.customer_email = customer_email
+
+    def collect(self, events: Iterable[Dict[str, Any]], report: ReconciliationReport) -> Dict[str, PlanEvent]:
+        targets: Dict[str, PlanEvent] = {}
+        emails: Dict[str, str] = {}
+        # Stripe lists events newest first, so an email may only turn up after the events that need it
+        pending: List[Dict[str, Any]] = []
+
+        def keep(target: Optional[PlanEvent]):
+            if target is None:
+                return
+            current = targets.get(target.email)
+            if current is None or (target.created, target.event_id) > (current.created, current.event_id):
+                targets[target.email] = target
+
+        for event in events:
+            report.events += 1
+            obj = (event.get('data') or {}).get('object') or {}
+            email, customer = event_email(obj), obj.get('customer')
+            if email and customer:
+                emails.setdefault(customer, email)
+            if email:
+                keep(plan_for_event(event, email))
+            elif customer:
+                pending.append(event)
+
+        for event in pending:
+            customer = event['data']['object']['customer']
+            email = emails.get(customer) or (self.customer_email(customer) if self.customer_email else None)
+            if email:
+                keep(plan_for_event(event, email))
+            else:
+                report.unresolved += 1
+        return targets
+
+    def reconcile(self, events: Iterable[Dict[str, Any]], dry_run: bool = False) -> ReconciliationReport:
+        started = time.monotonic()
+        report = ReconciliationReport(dry_run=dry_run)
+        targets = self.collect(events, report)
+        emails = sorted(targets)
+        report.users = len(emails)
+        chunks = [emails[i:i + self.chunk_size] for i in range(0, len(emails), self.chunk_size)]
+        lock = " FOR UPDATE" if self.pool.dialect == 'postgres' else ""
+
+        for n, chunk in enumerate(chunks, 1):
+            with self.pool.transaction() as tx:
+                placeholders = ', '.join(['%s'] * len(chunk))
+                tx.execute(f"SELECT email, plan FROM {self.table} WHERE email IN ({placeholders}){lock}", chunk)
+                current = dict(tx.fetchall())
+                changes = []
+                for email in chunk:
+                    if email not in current:
+                        report.missing.append(email)
+                    elif current[email] not in MANAGED_PLANS:
+                        report.custom.append(email)
+                    elif current[email] == targets[email].plan:
+                        report.unchanged += 1
+                    else:
+                        changes.append(PlanChange(email, current[email], targets[email].plan, targets[email].event_id))
+                if changes and not dry_run:
+                    tx.update_many(self.table, 'email', ['plan'], [(change.email, change.new_plan) for change in changes])
+            report.changes.extend(changes)
+            report.chunks = n
+            if self.progress:
+                self.progress(ReconcileProgress(
+                    n, len(chunks), min(n * self.chunk_size, len(emails)), len(emails),
+                    len(report.changes), time.monotonic() - started
+                ))
+
+        report.duration = time.monotonic() - started
+        return report
@@ -0,0 +1,138 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import threading
+
+import numpy as np
+
+from .eth_rpc import JsonRpcClient, RpcError, from_hex, to_hex
+
+ETH = 'ETH'
+
+# Just the two ERC20 functions the scanner calls; selectors are keccak256 of the signatures
+ERC20_ABI = [
+    {"constant": True, "inputs": [{"name": "owner", "type": "address"}], "name": "balanceOf",
+     "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
+    {"constant": True, "inputs": [], "name": "decimals",
+     "outputs": [{"name": "", "type": "uint8"}], "stateMutability": "view", "type": "function"}
+]
+BALANCE_OF = '0x70a08231'
+DECIMALS = '0x313ce567'
+
+def balance_of_data(owner: str) -> str:
+    return BALANCE_OF + owner[2:].lower().rjust(64, '0')
+
+@dataclass
+class BalanceMatrix:
+    """Balances of wallets (rows) in assets (columns, ETH first) at one block
+
+    values are in whole units (wei / 10**18, token amounts / 10**decimals)
+    as float64, NaN where the node returned an error, so totals and
+    filters are plain NumPy operations. raw keeps the exact integers; to_dict()
+    sends them as decimal strings, since JSON numbers lose precision past 2**53.
+    """
+    block: int
+    wallets: List[str]
+    assets: List[str]
+    values: np.ndarray
+    raw: List[List[Optional[int]]]
+
+    def totals(self) -> Dict[str, float]:
+        return dict(zip(self.assets, np.nansum(self.values, axis=0).tolist()))
+
+    def holders(self, asset: str) -> List[str]:
+        """Wallets with a non-zero balance of asset"""
+        column = self.values[:, self.assets.index(asset)]
+        return [self.wallets[row] for row in np.flatnonzero(np.nan_to_num(column) > 0)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'block': self.block,
+            'wallets': self.wallets,
+            'assets': self.assets,
+            'balances': [[None if np.isnan(value) else value for value in row] for row in self.values.tolist()],
+            'raw': [[None if amount is None else str(amount) for amount in row] for row in self.raw],
+            'totals': self.totals()
+        }
+
+class PortfolioScanner:
+    """ETH and ERC20 balances for many wallets, fetched in concurrent JSON-RPC batches
+
+    A scan pins the current block number, then turns every (wallet, asset)
+    pair it has not seen at that block into an eth_getBalance or a
+    balanceOf eth_call. The calls go out in batches of client.max_batch, with
+    at most `concurrency` batches in flight. Results are cached per block for
+    the last cache_blocks blocks, so repeated scans within a block (or scans
+    of overlapping wallets) only fetch what is new. Token decimals are read
+    once per token.
+    """
+
+    def __init__(self, client: JsonRpcClient, concurrency: int = 4, cache_blocks: int = 4):
+        self.client = client
+        self.concurrency = concurrency
+        self.cache_blocks = cache_blocks
+        self._cache: 'OrderedDict[int, Dict[Tuple[str, str], Optional[int]]]' = OrderedDict()
+        self._decimals: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def block_number(self) -> int:
+        return from_hex(self.client.call('eth_blockNumber'))
+
+    def _block_cache(self, block: int) -> Dict[Tuple[str, str], Optional[int]]:
+        with self._lock:
+            cache = self._cache.get(block)
+            if cache is None:
+                cache = self._cache[block] = {}
+                while len(self._cache) > self.cache_blocks:
+                    self._cache.popitem(last=False)
+            return cache
+
+    def _fetch(self, calls: List[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        """Run calls as batches of client.max_batch, at most concurrency batches at a time"""
+        size = self.client.max_batch
+        chunks = [calls[start:start + size] for start in range(0, len(calls), size)]
+        if len(chunks) <= 1:
+            return self.client.batch(calls) if calls else []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as pool:
+            return [result for results in pool.map(self.client.batch, chunks) for result in results]
+
+    def decimals(self, tokens: Sequence[str]) -> Dict[str, int]:
+        missing = [token for token in dict.fromkeys(token.lower() for token in tokens) if token not in self._decimals]
+        if missing:
+            replies = self._fetch([('eth_call', [{'to': token, 'data': DECIMALS}, 'latest']) for token in missing])
+            for token, reply in zip(missing, replies):
+                # Tokens without decimals() are treated as 18-decimal
+                self._decimals[token] = 18 if isinstance(reply, RpcError) or reply in (None, '0x') else from_hex(reply)
+        return {token: self._decimals[token.lower()] for token in tokens}
+
+    def balances(self, wallets: Sequence[str], tokens: Sequence[str] = (),
+                 block: Optional[int] = None) -> Tuple[int, Dict[Tuple[str, str], Optional[int]]]:
+        """(block, {(wallet, asset): raw balance or None}) with asset ETH or a lowercased token address"""
+        block = self.block_number() if block is None else block
+        cache = self._block_cache(block)
+        assets = [ETH] + [token.lower() for token in tokens]
+        pairs = [(wallet.lower(), asset) for wallet in wallets for asset in assets]
+        missing = [pair for pair in dict.fromkeys(pairs) if pair not in cache]
+        if missing:
+            tag = to_hex(block)
+            calls = [
+                ('eth_getBalance', [wallet, tag]) if asset == ETH
+                else ('eth_call', [{'to': asset, 'data': balance_of_data(wallet)}, tag])
+                for wallet, asset in missing
+            ]
+            for pair, reply in zip(missing, self._fetch(calls)):
+                cache[pair] = None if isinstance(reply, RpcError) else from_hex(reply)
+        return block, {pair: cache.get(pair) for pair in pairs}
+
+    def scan(self, wallets: Sequence[str], tokens: Sequence[str] = (), block: Optional[int] = None) -> BalanceMatrix:
+        block, found = self.balances(wallets, tokens, block)
+        decimals = self.decimals(tokens)
+        assets = [ETH] + [token.lower() for token in tokens]
+        scales = np.array([18] + [decimals[token] for token in tokens], dtype=np.float64)
+        raw = [[found[(wallet.lower(), asset)] for asset in assets] for wallet in wallets]
+        values = np.array(
+            [[np.nan if amount is None else float(amount) for amount in row] for row in raw],
+            dtype=np.float64
+        ).reshape(len(wallets), len(assets))
+        return BalanceMatrix(block, list(wallets), [ETH] + list(tokens), values / np.power(10.0, scales), raw)
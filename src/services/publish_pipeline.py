@@ -0,0 +1,297 @@
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from datetime import datetime
+from dataclasses import dataclass, field
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .antilibrary import UnknownEntry
+
+# Stages run in this order for every unknown; each has its own bounded worker pool
+STAGES = ('spec', 'listing', 'assets', 'payments', 'record', 'track')
+
+DEFAULT_STAGE_WORKERS = {
+    'spec': 8,
+    'listing': 4,
+    'assets': 2,
+    'payments': 4,
+    'record': 8,
+    'track': 8
+}
+
+DEFAULT_CHECKPOINT_PATH = Path('.lovabl_publish_checkpoint.json')
+
+# Requests per second allowed against each host; hosts not listed are unlimited
+DEFAULT_HOST_RATES = {
+    'api.lovabl.dev': 10.0
+}
+
+@dataclass
+class StageMetrics:
+    """Rolling latency and outcome counters for one pipeline stage"""
+    completed: int = 0
+    failed: int = 0
+    retries: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'retries': self.retries,
+            'mean_ms': (sum(samples) / len(samples) * 1000) if samples else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95)
+        }
+
+class HostRateLimiter:
+    """Async token bucket per host"""
+
+    def __init__(self, rates: Dict[str, float], burst: Optional[Dict[str, float]] = None):
+        self.rates = rates
+        self.burst = burst or {}
+        self._tokens: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def acquire(self, host: Optional[str]):
+        rate = self.rates.get(host)
+        if not rate:
+            return
+        capacity = self.burst.get(host, rate)
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            while True:
+                now = time.monotonic()
+                tokens = self._tokens.get(host, capacity)
+                tokens = min(capacity, tokens + (now - self._updated.get(host, now)) * rate)
+                self._updated[host] = now
+                if tokens >= 1:
+                    self._tokens[host] = tokens - 1
+                    return
+                self._tokens[host] = tokens
+                await asyncio.sleep((1 - tokens) / rate)
+
+class PublishCheckpoint:
+    """JSON checkpoint of completed stages per unknown, so an interrupted sweep can resume"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                self.state = json.loads(self.path.read_text())
+            except ValueError:
+                print(f"Ignoring unreadable publish checkpoint at {self.path}")
+
+    def get(self, unknown_id: str) -> Dict[str, Any]:
+        return self.state.setdefault(unknown_id, {'stages': {}})
+
+    def mark(self, unknown_id: str, stage: str, output: Any = None):
+        self.get(unknown_id)['stages'][stage] = output
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.state, default=str))
+        os.replace(tmp_path, self.path)
+
+    def discard(self, unknown_ids: List[str]):
+        """Forget finished unknowns so later sweeps publish them afresh"""
+        for unknown_id in unknown_ids:
+            self.state.pop(unknown_id, None)
+        if self.state:
+            self.save()
+        else:
+            self.clear()
+
+    def clear(self):
+        self.state = {}
+        if self.path.exists():
+            self.path.unlink()
+
+def idempotency_key(unknown_id: str, stage: str) -> str:
+    """Stable key so a retried or resumed stage is applied only once by the marketplace"""
+    return hashlib.sha256(f"antilibrary:{unknown_id}:{stage}".encode()).hexdigest()
+
+# Failures to reach the marketplace at all; worth another attempt
+TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, asyncio.TimeoutError) + (
+    (aiohttp.ClientError,) if aiohttp is not None else ()
+)
+
+def is_retryable(error: Exception) -> bool:
+    """Retry throttling, server errors and transport failures
+
+    Client errors, rejected calls and anything else (including programming
+    errors such as KeyError) fail the stage at once.
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, TRANSPORT_ERRORS)
+
+class PublishPipeline:
+    """Staged, concurrent publisher for antilibrary unknowns
+
+    Every unknown flows through STAGES in order. Each stage is bounded by its own
+    worker pool, outbound calls share per-host rate limits, failed calls are retried
+    with jittered exponential backoff, and completed stages are checkpointed so a
+    rerun picks up where an interrupted sweep stopped.
+    """
+
+    def __init__(
+        self,
+        publisher,
+        checkpoint_path: Path = DEFAULT_CHECKPOINT_PATH,
+        stage_workers: Optional[Dict[str, int]] = None,
+        host_rates: Optional[Dict[str, float]] = None,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        self.publisher = publisher
+        self.checkpoint = PublishCheckpoint(checkpoint_path)
+        workers = {**DEFAULT_STAGE_WORKERS, **(stage_workers or {})}
+        self.stage_workers = workers
+        self.rate_limiter = HostRateLimiter({**DEFAULT_HOST_RATES, **(host_rates or {})})
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = {stage: StageMetrics() for stage in STAGES}
+        self.lovabl_host = urlparse(publisher.lovabl.base_url).hostname
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._lovabl = None
+
+    async def _call(self, stage: str, host: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one stage call inside the stage's worker pool, rate limited and retried"""
+        async with self._semaphores[stage]:
+            started = time.perf_counter()
+            for attempt in range(1, self.max_attempts + 1):
+                await self.rate_limiter.acquire(host)
+                try:
+                    result = await fn()
+                    self.metrics[stage].record(time.perf_counter() - started, ok=True)
+                    return result
+                except Exception as e:
+                    if attempt == self.max_attempts or not is_retryable(e):
+                        self.metrics[stage].record(time.perf_counter() - started, ok=False)
+                        raise
+                    self.metrics[stage].retries += 1
+                    delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                    await asyncio.sleep(random.uniform(0, delay))
+
+    async def _publish_one(self, unknown: UnknownEntry) -> Optional[Dict[str, Any]]:
+        publisher = self.publisher
+        lovabl = self._lovabl
+        done = self.checkpoint.get(unknown.id)['stages']
+        if 'track' in done:
+            return done['track']
+
+        product_spec = await self._call('spec', None, lambda: publisher._create_product_spec(unknown))
+
+        listing_id = done.get('listing')
+        if listing_id is None:
+            listing = await self._call('listing', self.lovabl_host, lambda: lovabl.create_listing(
+                product_spec, idempotency_key(unknown.id, 'listing')
+            ))
+            listing_id = listing["id"]
+            self.checkpoint.mark(unknown.id, 'listing', listing_id)
+
+        if 'assets' not in done:
+            if product_spec.assets_dir.exists():
+                # Failures raise HTTP errors carrying their status, so 429/5xx are retried
+                await self._call('assets', self.lovabl_host, lambda: lovabl.upload_assets(
+                    listing_id, product_spec.assets_dir, idempotency_key(unknown.id, 'assets')
+                ))
+            self.checkpoint.mark(unknown.id, 'assets')
+
+        if 'payments' not in done:
+            genix_key = os.getenv('GENIX_KEY')
+            if genix_key:
+                await self._call('payments', self.lovabl_host, lambda: lovabl.enable_payment_processing(
+                    listing_id, genix_key, idempotency_key(unknown.id, 'payments')
+                ))
+            self.checkpoint.mark(unknown.id, 'payments')
+
+        if 'record' not in done:
+            await self._call('record', None, lambda: asyncio.to_thread(
+                publisher.supabase.table('unknowns')
+                .update({
+                    'lovabl_listing_id': listing_id,
+                    'last_updated': datetime.now().isoformat()
+                })
+                .eq('id', unknown.id)
+                .execute
+            ))
+            self.checkpoint.mark(unknown.id, 'record')
+
+        # AnalyticsService methods are async but make blocking Supabase calls, so give them a thread
+        await self._call('track', None, lambda: asyncio.to_thread(asyncio.run, publisher.analytics.track_event(
+            'publish',
+            listing_id,
+            {
+                'unknown_id': unknown.id,
+                'price_tiers': product_spec.price_tiers
+            }
+        )))
+
+        published = {
+            'unknown_id': unknown.id,
+            'listing_id': listing_id,
+            'listing_url': f"https://lovabl.dev/listings/{listing_id}",
+            'price_tiers': product_spec.price_tiers
+        }
+        self.checkpoint.mark(unknown.id, 'track', published)
+        return published
+
+    async def _publish_or_report(self, unknown: UnknownEntry) -> Optional[Dict[str, Any]]:
+        try:
+            return await self._publish_one(unknown)
+        except Exception as e:
+            print(f"Failed to publish unknown {unknown.id}: {str(e)}")
+            return None
+
+    async def run(self, unknowns: List[UnknownEntry]) -> List[Dict[str, Any]]:
+        """Publish all unknowns concurrently, returning the successfully published products"""
+        self._semaphores = {stage: asyncio.Semaphore(self.stage_workers[stage]) for stage in STAGES}
+        # The pipeline owns retries, so the pooled async client is opened without its own
+        async with self.publisher.lovabl.async_client(max_retries=0) as lovabl:
+            self._lovabl = lovabl
+            results = await asyncio.gather(*(self._publish_or_report(unknown) for unknown in unknowns))
+        published = [result for result in results if result]
+
+        # Only unfinished unknowns keep their checkpoint; the rest would replay a cached result next sweep
+        self.checkpoint.discard([result['unknown_id'] for result in published])
+        return published
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage latency percentiles, completions, failures and retries"""
+        return {stage: metrics.to_dict() for stage, metrics in self.metrics.items()}
@@ -0,0 +1,160 @@
+from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+
+@dataclass
+class ServiceSpec:
+    """How to build, check and dispose of one shared client"""
+    factory: Callable[[], Any]
+    health_check: Optional[Callable[[Any], bool]] = None
+    close: Optional[Callable[[Any], None]] = None
+
+@dataclass
+class _ServiceState:
+    instance: Any = None
+    created_at: float = 0.0
+    checked_at: float = 0.0
+    failed_at: float = 0.0
+    last_error: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+class ServiceRegistry:
+    """Process-wide registry of lazily created, shared service clients
+
+    Each client is built on first use and handed out to every caller afterwards.
+    A client with a health check is re-checked at most every health_check_interval
+    seconds and rebuilt if the check fails. A factory that returns None marks the
+    service as not configured. A factory that raises is retried after
+    retry_interval seconds. Instances are discarded after a fork so worker
+    processes never share sockets with their parent.
+
+    The registry behaves like the read-only dict returned by init_apis(), so
+    existing `'redis' in apis` / `apis.get('stripe')` checks keep working.
+    """
+
+    def __init__(self, health_check_interval: float = 30.0, retry_interval: float = 5.0):
+        self.health_check_interval = health_check_interval
+        self.retry_interval = retry_interval
+        self._specs: Dict[str, ServiceSpec] = {}
+        self._states: Dict[str, _ServiceState] = {}
+        self._pid = os.getpid()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 close: Optional[Callable[[Any], None]] = None):
+        self._specs[name] = ServiceSpec(factory, health_check, close)
+        self._states[name] = _ServiceState()
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._states = {name: _ServiceState() for name in self._specs}
+
+    def _dispose(self, name: str, state: _ServiceState):
+        spec = self._specs[name]
+        if state.instance is not None and spec.close:
+            try:
+                spec.close(state.instance)
+            except Exception:
+                pass
+        state.instance = None
+
+    def _is_healthy(self, name: str, state: _ServiceState) -> bool:
+        spec = self._specs[name]
+        if not spec.health_check:
+            return True
+        try:
+            healthy = bool(spec.health_check(state.instance))
+            state.last_error = None if healthy else "health check failed"
+        except Exception as e:
+            healthy = False
+            state.last_error = str(e)
+        state.checked_at = time.monotonic()
+        return healthy
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Return the shared client for name, creating or reconnecting it if needed"""
+        if name not in self._specs:
+            return default
+        self._check_fork()
+        state = self._states[name]
+        now = time.monotonic()
+
+        # Fast path: a live instance that is not due for a health check
+        instance = state.instance
+        if instance is not None and now - state.checked_at < self.health_check_interval:
+            return instance
+
+        with state.lock:
+            if state.instance is not None:
+                if now - state.checked_at < self.health_check_interval or self._is_healthy(name, state):
+                    return state.instance
+                print(f"Service '{name}' failed its health check, reconnecting: {state.last_error}")
+                self._dispose(name, state)
+
+            if state.failed_at and now - state.failed_at < self.retry_interval:
+                return default
+            try:
+                state.instance = self._specs[name].factory()
+                state.created_at = state.checked_at = time.monotonic()
+                state.failed_at = 0.0
+                state.last_error = None
+            except Exception as e:
+                state.instance = None
+                state.failed_at = time.monotonic()
+                state.last_error = str(e)
+                print(f"Failed to initialize service '{name}': {str(e)}")
+            return state.instance if state.instance is not None else default
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __getitem__(self, name: str) -> Any:
+        instance = self.get(name)
+        if instance is None:
+            raise KeyError(name)
+        return instance
+
+    def built(self, name: str) -> Any:
+        """The live client for name if one was already created, without creating it"""
+        if name not in self._specs:
+            return None
+        self._check_fork()
+        return self._states[name].instance
+
+    def health(self, built_only: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Run every service's health check now and report the result
+
+        With built_only, services nobody has used yet are reported as not
+        started instead of being created (and their threads or loops started)
+        just to be checked.
+        """
+        report = {}
+        for name in self._specs:
+            state = self._states[name]
+            if built_only and self.built(name) is None:
+                report[name] = {'available': False, 'started': False, 'error': state.last_error}
+                continue
+            instance = self.get(name)
+            if instance is not None:
+                with state.lock:
+                    healthy = self._is_healthy(name, state)
+            else:
+                healthy = False
+            report[name] = {
+                'available': healthy,
+                'started': instance is not None,
+                'error': state.last_error
+            }
+        return report
+
+    def reset(self, name: Optional[str] = None):
+        """Dispose of one (or every) client so it is rebuilt on next use"""
+        names = [name] if name else list(self._specs)
+        for service_name in names:
+            state = self._states[service_name]
+            with state.lock:
+                self._dispose(service_name, state)
+                state.failed_at = 0.0
@@ -0,0 +1,94 @@
+from typing import Dict, Any, List, Callable, Sequence
+from dataclasses import dataclass, field, asdict
+import asyncio
+import inspect
+import time
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[..., Any]
+    needs: List[str] = field(default_factory=list)
+
+@dataclass
+class StepTiming:
+    started: float
+    duration: float
+    status: str = "ok"
+
+@dataclass
+class GraphRun:
+    results: Dict[str, Any]
+    timings: Dict[str, StepTiming]
+    duration: float
+
+    def timings_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: asdict(timing) for name, timing in self.timings.items()}
+
+class StepGraph:
+    """Runs a product's steps as soon as the steps they need have finished
+
+    Each step receives the results it needs as keyword arguments, taken either
+    from an earlier step or from the inputs passed to run(). Steps may only need
+    names declared before them, so a graph can never contain a cycle. Async
+    steps run on the caller's loop; plain functions run in a worker thread. If
+    any step fails, the steps still running are cancelled and the error is
+    re-raised.
+    """
+
+    def __init__(self):
+        self._steps: Dict[str, Step] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], needs: Sequence[str] = (),
+            inputs: Sequence[str] = ()) -> 'StepGraph':
+        """Declare a step; needs are earlier step names, inputs are run() keyword names"""
+        if name in self._steps:
+            raise ValueError(f"Duplicate step: {name}")
+        unknown = [dep for dep in needs if dep not in self._steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' needs undeclared steps: {', '.join(unknown)}")
+        self._steps[name] = Step(name, fn, list(needs) + list(inputs))
+        return self
+
+    async def _run_step(self, step: Step, tasks: Dict[str, asyncio.Task], inputs: Dict[str, Any],
+                        timings: Dict[str, StepTiming], origin: float) -> Any:
+        kwargs = {}
+        for dep in step.needs:
+            kwargs[dep] = await tasks[dep] if dep in tasks else inputs[dep]
+
+        started = time.perf_counter()
+        timing = StepTiming(started - origin, 0.0)
+        timings[step.name] = timing
+        try:
+            if inspect.iscoroutinefunction(step.fn):
+                return await step.fn(**kwargs)
+            return await asyncio.to_thread(step.fn, **kwargs)
+        except asyncio.CancelledError:
+            timing.status = "cancelled"
+            raise
+        except Exception:
+            timing.status = "failed"
+            raise
+        finally:
+            timing.duration = time.perf_counter() - started
+
+    async def run(self, **inputs) -> GraphRun:
+        for step in self._steps.values():
+            missing = [dep for dep in step.needs if dep not in self._steps and dep not in inputs]
+            if missing:
+                raise ValueError(f"Step '{step.name}' is missing inputs: {', '.join(missing)}")
+
+        origin = time.perf_counter()
+        timings: Dict[str, StepTiming] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        for step in self._steps.values():
+            tasks[step.name] = asyncio.ensure_future(self._run_step(step, tasks, inputs, timings, origin))
+
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return GraphRun(dict(zip(tasks, results)), timings, time.perf_counter() - origin)
@@ -0,0 +1,229 @@
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+from dataclasses import dataclass, asdict
+from types import MappingProxyType
+from pathlib import Path
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+WORD = re.compile(r"[a-z0-9]+")
+
+def fold(text: str) -> str:
+    return " ".join(WORD.findall(text.casefold()))
+
+def trigrams(text: str) -> frozenset:
+    padded = f"  {fold(text)} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+@dataclass(frozen=True)
+class Tool:
+    name: str
+    category: str
+    id: Optional[int] = None
+    description: Optional[str] = None
+    api_endpoint: Optional[str] = None
+    icon_url: Optional[str] = None
+    capabilities: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'capabilities': list(self.capabilities)}
+
+class ToolCatalog:
+    """Immutable snapshot of the tool catalog with precomputed indexes
+
+    Built once per load. Category, capability and name lookups are dict
+    reads. Prefix search bisects a sorted list of name words. Fuzzy search
+    ranks tools by trigram overlap, using an inverted trigram index so only
+    tools sharing a trigram with the query are scored. The etag is a hash of
+    the contents, so reloading unchanged data keeps client caches valid.
+    """
+
+    def __init__(self, tools: Sequence[Tool], source: str = "builtin"):
+        self.tools: Tuple[Tool, ...] = tuple(sorted(tools, key=lambda tool: (tool.category.casefold(), tool.name.casefold())))
+        self.source = source
+        self.loaded_at = time.time()
+
+        categories: Dict[str, List[Tool]] = {}
+        capabilities: Dict[str, List[Tool]] = {}
+        words: List[Tuple[str, int]] = []
+        grams: Dict[str, List[int]] = {}
+        for n, tool in enumerate(self.tools):
+            categories.setdefault(tool.category, []).append(tool)
+            for capability in tool.capabilities:
+                capabilities.setdefault(capability.casefold(), []).append(tool)
+            words.extend((word, n) for word in set(fold(tool.name).split()) | {fold(tool.name)})
+            for gram in trigrams(tool.name):
+                grams.setdefault(gram, []).append(n)
+
+        self.categories = MappingProxyType({name: tuple(items) for name, items in categories.items()})
+        self._category_keys = {name.casefold(): name for name in categories}
+        self._capabilities = MappingProxyType({name: tuple(items) for name, items in capabilities.items()})
+        self._by_name = MappingProxyType({fold(tool.name): tool for tool in self.tools})
+        self._words = tuple(sorted(words))
+        self._word_keys = tuple(word for word, _ in self._words)
+        self._grams = MappingProxyType({gram: tuple(rows) for gram, rows in grams.items()})
+        self._tool_grams = tuple(trigrams(tool.name) for tool in self.tools)
+
+        payload = json.dumps([tool.to_dict() for tool in self.tools], sort_keys=True)
+        self.etag = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+        self._names_by_category = MappingProxyType({
+            name: [tool.name for tool in items] for name, items in self.categories.items()
+        })
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def category(self, name: str) -> Tuple[Tool, ...]:
+        """Tools in a category, matched case-insensitively"""
+        key = self._category_keys.get(name.casefold())
+        return self.categories[key] if key else ()
+
+    def names_by_category(self) -> Dict[str, List[str]]:
+        return dict(self._names_by_category)
+
+    def with_capability(self, capability: str) -> Tuple[Tool, ...]:
+        return self._capabilities.get(capability.casefold(), ())
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._by_name.get(fold(name))
+
+    def prefix(self, query: str, limit: int = 10) -> List[Tool]:
+        """Tools whose name, or any word of it, starts with query"""
+        query = fold(query)
+        if not query:
+            return []
+        start = bisect.bisect_left(self._word_keys, query)
+        found: Dict[int, None] = {}
+        for word, row in self._words[start:]:
+            if not word.startswith(query) or len(found) >= limit:
+                break
+            found[row] = None
+        return [self.tools[row] for row in sorted(found, key=lambda row: self.tools[row].name.casefold())]
+
+    def fuzzy(self, query: str, limit: int = 10, threshold: float = 0.2) -> List[Tool]:
+        """Tools ranked by trigram similarity to query (tolerates typos)"""
+        query_grams = trigrams(query)
+        overlap: Dict[int, int] = {}
+        for gram in query_grams:
+            for row in self._grams.get(gram, ()):
+                overlap[row] = overlap.get(row, 0) + 1
+        scored = []
+        for row, shared in overlap.items():
+            score = shared / len(query_grams | self._tool_grams[row])
+            if score >= threshold:
+                scored.append((-score, self.tools[row].name.casefold(), row))
+        return [self.tools[row] for _, _, row in sorted(scored)[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> List[Tool]:
+        """Prefix matches first, then fuzzy matches to fill up to limit"""
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            seen = {tool.name for tool in results}
+            results.extend(tool for tool in self.fuzzy(query, limit) if tool.name not in seen)
+        return results[:limit]
+
+def tools_from_mapping(categories: Dict[str, Sequence[str]],
+                       capabilities: Optional[Dict[str, Sequence[str]]] = None) -> List[Tool]:
+    """Tools from {"Category": ["Tool", ...]}, the shape of ToolLibrary's defaults"""
+    capabilities = capabilities or {}
+    return [
+        Tool(name, category, capabilities=tuple(capabilities.get(name, ())))
+        for category, names in categories.items()
+        for name in names
+    ]
+
+def load_file(path: Path, capabilities: Optional[Dict[str, Sequence[str]]] = None) -> List[Tool]:
+    """Tools from a JSON file: a category mapping or a list of tool objects"""
+    data = json.loads(Path(path).read_text())
+    if isinstance(data, dict):
+        return tools_from_mapping(data, capabilities)
+    capabilities = capabilities or {}
+    return [
+        Tool(
+            item['name'], item['category'], item.get('id'), item.get('description'),
+            item.get('api_endpoint'), item.get('icon_url'),
+            tuple(item.get('capabilities') or capabilities.get(item['name'], ()))
+        )
+        for item in data
+    ]
+
+def load_db(pool, capabilities: Optional[Dict[str, Sequence[str]]] = None) -> List[Tool]:
+    capabilities = capabilities or {}
+    with pool.transaction() as tx:
+        tx.execute(
+            "SELECT id, name, category, description, api_endpoint, icon_url FROM tools WHERE is_active ORDER BY id"
+        )
+        return [
+            Tool(name, category, tool_id, description, api_endpoint, icon_url, tuple(capabilities.get(name, ())))
+            for tool_id, name, category, description, api_endpoint, icon_url in tx.fetchall()
+        ]
+
+def db_version(pool) -> Any:
+    """Changes whenever a tool is added, removed or updated"""
+    with pool.transaction() as tx:
+        tx.execute("SELECT COUNT(*), MAX(updated_at), MAX(id) FROM tools")
+        return tuple(tx.fetchone())
+
+class ToolCatalogStore:
+    """Holds the current ToolCatalog and swaps in a new one when its source changes
+
+    The source is the file at path if given, otherwise the tools table if a
+    pool is available, otherwise the builtin defaults. The source's version
+    (the file's mtime, or row count and last update for the table) is checked
+    at most every check_interval seconds. A new catalog is built only when the
+    version changes. If a reload fails, the previous catalog keeps being served.
+    """
+
+    def __init__(self, defaults: Dict[str, Sequence[str]], pool=None, path: Optional[Path] = None,
+                 capabilities: Optional[Dict[str, Sequence[str]]] = None, check_interval: float = 30.0):
+        self.defaults = defaults
+        self.pool = pool
+        self.path = Path(path) if path else None
+        self.capabilities = capabilities or {}
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._catalog: Optional[ToolCatalog] = None
+        self._version: Any = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def from_env(cls, defaults: Dict[str, Sequence[str]], pool=None,
+                 capabilities: Optional[Dict[str, Sequence[str]]] = None) -> 'ToolCatalogStore':
+        return cls(defaults, pool, os.getenv('TOOL_CATALOG_PATH') or None, capabilities,
+                   float(os.getenv('TOOL_CATALOG_CHECK_INTERVAL', '30')))
+
+    def _source(self) -> Tuple[str, Callable[[], Any], Callable[[], List[Tool]]]:
+        if self.path is not None:
+            return "file", lambda: self.path.stat().st_mtime_ns, lambda: load_file(self.path, self.capabilities)
+        if self.pool is not None:
+            return "database", lambda: db_version(self.pool), lambda: load_db(self.pool, self.capabilities)
+        return "builtin", lambda: None, lambda: tools_from_mapping(self.defaults, self.capabilities)
+
+    def get(self) -> ToolCatalog:
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.check_interval:
+            return self._catalog
+        with self._lock:
+            if self._catalog is not None and now - self._checked_at < self.check_interval:
+                return self._catalog
+            self._checked_at = now
+            source, version, load = self._source()
+            try:
+                current = version()
+                if self._catalog is None or current != self._version:
+                    self._catalog = ToolCatalog(load(), source)
+                    self._version = current
+            except Exception as e:
+                print(f"Failed to load tool catalog from {source}: {str(e)}")
+                if self._catalog is None:
+                    self._catalog = ToolCatalog(tools_from_mapping(self.defaults, self.capabilities), "builtin")
+            return self._catalog
+
+    def reload(self) -> ToolCatalog:
+        """Check the source now instead of waiting for check_interval"""
+        self._checked_at = 0.0
+        return self.get()
@@ -0,0 +1,297 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+from itertools import islice
+import os
+import threading
+import time
+
+# Aggregate slots: calls, errors, total seconds, max seconds, bytes in, bytes out
+CALLS, ERRORS, TOTAL, MAX, BYTES_IN, BYTES_OUT = range(6)
+
+GRANULARITIES = {
+    # Postgres date_trunc unit -> SQLite strftime format of the same bucket
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00'
+}
+
+COLUMNS = ('owner', 'tool_name', 'capability', 'bucket', 'usage_count', 'error_count',
+           'total_ms', 'max_ms', 'bytes_in', 'bytes_out', 'last_used')
+
+UsageKey = Tuple[str, str, str, int]
+
+# Containers larger than this are sized from their first SAMPLE_ITEMS items
+SAMPLE_ITEMS = 8
+# Seconds between "buffer full" messages while usage is being dropped
+DROP_REPORT_INTERVAL = 60.0
+
+def payload_size(value: Any, depth: int = 3) -> int:
+    """Rough JSON size of value without serializing it
+
+    Strings and bytes count their length. Containers are followed depth
+    levels down and anything deeper counts as 8 bytes. Only the first
+    SAMPLE_ITEMS items of a container are measured and the rest are assumed
+    to be alike, so sizing a result costs at most SAMPLE_ITEMS ** depth
+    items, however many wallets or rows it holds.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    if isinstance(value, dict):
+        if depth <= 0:
+            return 8
+        sampled = sum(len(str(key)) + 4 + payload_size(item, depth - 1)
+                      for key, item in islice(value.items(), SAMPLE_ITEMS))
+        return 2 + sampled * len(value) // max(1, min(len(value), SAMPLE_ITEMS))
+    if isinstance(value, (list, tuple)):
+        if depth <= 0:
+            return 8
+        sampled = sum(payload_size(item, depth - 1) + 1 for item in value[:SAMPLE_ITEMS])
+        return 2 + sampled * len(value) // max(1, min(len(value), SAMPLE_ITEMS))
+    return 4 if value is None else len(str(value)) if isinstance(value, (int, float)) else 8
+
+def _merge(target: Dict[UsageKey, list], key: UsageKey, agg: list):
+    current = target.get(key)
+    if current is None:
+        target[key] = list(agg)
+        return
+    current[CALLS] += agg[CALLS]
+    current[ERRORS] += agg[ERRORS]
+    current[TOTAL] += agg[TOTAL]
+    current[MAX] = max(current[MAX], agg[MAX])
+    current[BYTES_IN] += agg[BYTES_IN]
+    current[BYTES_OUT] += agg[BYTES_OUT]
+
+class UsageMeter:
+    """Per (user, tool, capability, minute) usage counters flushed to tool_usage in batches
+
+    record() only updates an in-memory aggregate under a lock, so metering
+    costs a few microseconds per call. A background thread swaps the pending
+    aggregates out every flush_interval seconds, or sooner once max_pending
+    keys are waiting. It then upserts them into tool_usage, adding to the row
+    of the same key if another worker already wrote that minute. If a flush
+    fails, the batch is merged back and the background thread waits
+    exponentially longer (up to max_backoff seconds) before trying again.
+    Pending keys are capped at max_keys: beyond that the oldest minutes are
+    dropped and counted in dropped_keys / dropped_calls. Without a pool,
+    flushed totals are kept in memory so rollups still work.
+    """
+
+    def __init__(self, pool=None, flush_interval: float = 10.0, max_pending: int = 10000,
+                 max_keys: Optional[int] = None, max_backoff: float = 300.0):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_keys = max_keys or max_pending * 10
+        self.max_backoff = max_backoff
+        self.dropped_keys = 0
+        self.dropped_calls = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._drops_reported_at: Optional[float] = None
+        self._pending: Dict[UsageKey, list] = {}
+        self._totals: Dict[UsageKey, list] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, pool=None) -> 'UsageMeter':
+        max_keys = os.getenv('USAGE_MAX_KEYS')
+        return cls(pool, float(os.getenv('USAGE_FLUSH_INTERVAL', '10')),
+                   int(os.getenv('USAGE_MAX_PENDING', '10000')), int(max_keys) if max_keys else None)
+
+    def start(self) -> 'UsageMeter':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="usage-meter", daemon=True)
+            self._thread.start()
+        return self
+
+    def record(self, user_id: Optional[str], tool: str, capability: str, seconds: float,
+               ok: bool = True, bytes_in: int = 0, bytes_out: int = 0):
+        key = ('' if user_id is None else str(user_id), tool, capability, int(time.time()) // 60)
+        with self._lock:
+            agg = self._pending.get(key)
+            dropped = False
+            if agg is None:
+                if len(self._pending) >= self.max_keys:
+                    self._drop_oldest()
+                    dropped = True
+                agg = self._pending[key] = [0, 0, 0.0, 0.0, 0, 0]
+            agg[CALLS] += 1
+            if not ok:
+                agg[ERRORS] += 1
+            agg[TOTAL] += seconds
+            if seconds > agg[MAX]:
+                agg[MAX] = seconds
+            agg[BYTES_IN] += bytes_in
+            agg[BYTES_OUT] += bytes_out
+            full = len(self._pending) >= self.max_pending
+        if dropped:
+            self._report_drops()
+        # While backing off, a full buffer waits for the retry like everything else
+        if full and not self._wakeup.is_set() and time.monotonic() >= self._retry_at:
+            self._wakeup.set()
+
+    def _drop_oldest(self):
+        """Drop whole minutes, oldest first, until there is room for a new key; call with _lock held"""
+        minutes = sorted({key[3] for key in self._pending})
+        for minute in minutes:
+            if len(self._pending) < self.max_keys:
+                break
+            for key in [key for key in self._pending if key[3] == minute]:
+                self.dropped_calls += self._pending.pop(key)[CALLS]
+                self.dropped_keys += 1
+
+    def _report_drops(self):
+        """Log dropped usage at most once per DROP_REPORT_INTERVAL; call without _lock held"""
+        now = time.monotonic()
+        if self._drops_reported_at is not None and now - self._drops_reported_at < DROP_REPORT_INTERVAL:
+            return
+        self._drops_reported_at = now
+        print(f"Tool usage buffer full; dropped {self.dropped_keys} keys ({self.dropped_calls} calls) so far")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(max(self.flush_interval, self._retry_at - time.monotonic()))
+            self._wakeup.clear()
+            if self._stopping.is_set() or time.monotonic() < self._retry_at:
+                continue
+            self.flush()
+
+    def _bucket(self, minute: int) -> Any:
+        moment = datetime.fromtimestamp(minute * 60, timezone.utc)
+        if self.pool is not None and self.pool.dialect == 'sqlite':
+            return moment.strftime(GRANULARITIES['minute'])
+        return moment
+
+    def flush(self) -> int:
+        """Write pending aggregates; returns the number of keys written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            if self.pool is None:
+                for key, agg in batch.items():
+                    _merge(self._totals, key, agg)
+                return len(batch)
+            greatest = 'GREATEST' if self.pool.dialect == 'postgres' else 'MAX'
+            now = datetime.now(timezone.utc)
+            if self.pool.dialect == 'sqlite':
+                now = now.strftime('%Y-%m-%d %H:%M:%S')
+            rows = [
+                (owner, tool, capability, self._bucket(minute), agg[CALLS], agg[ERRORS],
+                 agg[TOTAL] * 1000, agg[MAX] * 1000, agg[BYTES_IN], agg[BYTES_OUT], now)
+                for (owner, tool, capability, minute), agg in batch.items()
+            ]
+            try:
+                with self.pool.transaction() as tx:
+                    tx.insert_many('tool_usage', COLUMNS, rows, on_conflict=(
+                        "ON CONFLICT (owner, tool_name, capability, bucket) DO UPDATE SET "
+                        "usage_count = tool_usage.usage_count + EXCLUDED.usage_count, "
+                        "error_count = tool_usage.error_count + EXCLUDED.error_count, "
+                        "total_ms = tool_usage.total_ms + EXCLUDED.total_ms, "
+                        f"max_ms = {greatest}(tool_usage.max_ms, EXCLUDED.max_ms), "
+                        "bytes_in = tool_usage.bytes_in + EXCLUDED.bytes_in, "
+                        "bytes_out = tool_usage.bytes_out + EXCLUDED.bytes_out, "
+                        "last_used = EXCLUDED.last_used"
+                    ))
+            except Exception as e:
+                self._failures += 1
+                delay = min(self.flush_interval * 2 ** self._failures, self.max_backoff)
+                self._retry_at = time.monotonic() + delay
+                print(f"Failed to flush tool usage ({len(batch)} keys), retrying in {delay:.0f}s: {str(e)}")
+                with self._lock:
+                    for key, agg in batch.items():
+                        _merge(self._pending, key, agg)
+                    dropped = len(self._pending) > self.max_keys
+                    if dropped:
+                        self._drop_oldest()
+                if dropped:
+                    self._report_drops()
+                return 0
+            self._failures = 0
+            self._retry_at = 0.0
+            return len(batch)
+
+    def rollup(self, user_id: Optional[str] = None, tool: Optional[str] = None, granularity: str = 'hour',
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Usage per (bucket, user, tool, capability), oldest first
+
+        Pending records are flushed first, unless flushes are backing off after
+        a failure; the rollup then leaves them out instead of retrying the write early.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        if time.monotonic() >= self._retry_at:
+            self.flush()
+        if self.pool is None:
+            return self._rollup_memory(user_id, tool, granularity, since, until)
+
+        sqlite = self.pool.dialect == 'sqlite'
+        bucket = "strftime(%s, bucket)" if sqlite else "date_trunc(%s, bucket)"
+        params: List[Any] = [GRANULARITIES[granularity] if sqlite else granularity]
+        where = ["bucket IS NOT NULL"]
+        for clause, value in (("owner = %s", user_id), ("tool_name = %s", tool),
+                              ("bucket >= %s", since), ("bucket < %s", until)):
+            if value is not None:
+                where.append(clause)
+                if sqlite and isinstance(value, datetime):
+                    value = value.astimezone(timezone.utc).strftime(GRANULARITIES['minute'])
+                params.append(value)
+        with self.pool.transaction() as tx:
+            tx.execute(
+                f"SELECT {bucket} AS period, owner, tool_name, capability, SUM(usage_count), SUM(error_count), "
+                f"SUM(total_ms), MAX(max_ms), SUM(bytes_in), SUM(bytes_out) FROM tool_usage "
+                f"WHERE {' AND '.join(where)} GROUP BY period, owner, tool_name, capability "
+                f"ORDER BY period, owner, tool_name, capability", params
+            )
+            return [
+                self._row(period, owner, tool_name, capability, calls, errors, total_ms, max_ms, bytes_in, bytes_out)
+                for period, owner, tool_name, capability, calls, errors, total_ms, max_ms, bytes_in, bytes_out
+                in tx.fetchall()
+            ]
+
+    def _rollup_memory(self, user_id, tool, granularity, since, until) -> List[Dict[str, Any]]:
+        with self._flush_lock:
+            totals = list(self._totals.items())
+        low = since.timestamp() // 60 if since else None
+        high = until.timestamp() // 60 if until else None
+        grouped: Dict[Tuple[str, str, str, str], list] = {}
+        for (owner, tool_name, capability, minute), agg in totals:
+            if (user_id is not None and owner != user_id) or (tool is not None and tool_name != tool):
+                continue
+            if (low is not None and minute < low) or (high is not None and minute >= high):
+                continue
+            period = datetime.fromtimestamp(minute * 60, timezone.utc).strftime(GRANULARITIES[granularity])
+            _merge(grouped, (period, owner, tool_name, capability), agg)
+        return [
+            self._row(*key, agg[CALLS], agg[ERRORS], agg[TOTAL] * 1000, agg[MAX] * 1000,
+                      agg[BYTES_IN], agg[BYTES_OUT])
+            for key, agg in sorted(grouped.items())
+        ]
+
+    @staticmethod
+    def _row(period, owner, tool_name, capability, calls, errors, total_ms, max_ms, bytes_in, bytes_out):
+        return {
+            'bucket': period.isoformat() if isinstance(period, datetime) else period,
+            'user_id': owner or None,
+            'tool': tool_name,
+            'capability': capability,
+            'calls': int(calls),
+            'errors': int(errors),
+            'avg_ms': round(float(total_ms) / calls, 3) if calls else 0.0,
+            'max_ms': round(float(max_ms), 3),
+            'bytes_in': int(bytes_in),
+            'bytes_out': int(bytes_out)
+        }
+
+    def close(self, timeout: float = 5.0):
+        """Stop the flush thread and write what is still pending"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
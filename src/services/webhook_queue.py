@@ -0,0 +1,230 @@
+from typing import Dict, Any, List, Optional, Callable
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+SIGNATURE_TOLERANCE = 300
+
+class SignatureError(Exception):
+    """The webhook payload is not a validly signed, recent and well-formed event"""
+
+def construct_stripe_event(stripe_module, payload: bytes, header: str, secret: str,
+                           tolerance: int = SIGNATURE_TOLERANCE) -> Dict[str, Any]:
+    """Verify a Stripe-Signature header with stripe.Webhook.construct_event and return the event"""
+    if not header or not secret:
+        raise SignatureError("Missing signature or webhook secret")
+    try:
+        event = stripe_module.Webhook.construct_event(payload, header, secret, tolerance=tolerance)
+    except stripe_module.error.SignatureVerificationError as e:
+        raise SignatureError(str(e))
+    except (ValueError, AttributeError):
+        # Invalid JSON, or JSON that is not an object
+        raise SignatureError("Payload is not a JSON object")
+    if not event.get('id') or not event.get('type'):
+        raise SignatureError("Event is missing its id or type")
+    return event
+
+def stripe_customer_key(event: Dict[str, Any]) -> str:
+    """Events for the same customer are processed in the order they arrived"""
+    obj = (event.get('data') or {}).get('object') or {}
+    return str(obj.get('customer') or obj.get('receipt_email') or obj.get('email') or event.get('id'))
+
+@dataclass
+class QueuedEvent:
+    id: int
+    event_id: str
+    type: str
+    customer_key: str
+    payload: Dict[str, Any]
+    attempts: int
+
+class WebhookQueue:
+    """Durable SQLite queue of webhook events, deduplicated by event id
+
+    enqueue() is a single INSERT OR IGNORE in WAL mode, so acknowledging a
+    delivery costs about a millisecond and a redelivery is a no-op. Events are
+    claimed with a lease. An event whose worker died is re-queued once its
+    lease expires. Only the oldest unfinished event of each customer can be
+    claimed, which keeps per-customer ordering with any number of workers or
+    processes.
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = 60.0, synchronous: str = 'FULL'):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.synchronous = synchronous
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS webhook_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id TEXT NOT NULL UNIQUE,
+                    type TEXT NOT NULL,
+                    customer_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    lease_until REAL,
+                    last_error TEXT,
+                    received_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_webhook_events_ready ON webhook_events (status, available_at);
+                CREATE INDEX IF NOT EXISTS idx_webhook_events_customer ON webhook_events (customer_key, id);
+            """)
+
+    @classmethod
+    def from_env(cls) -> 'WebhookQueue':
+        return cls(Path(os.getenv('WEBHOOK_QUEUE_PATH', 'data/webhooks.db')))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, event_id: str, event_type: str, customer_key: str, payload: Dict[str, Any]) -> bool:
+        """Store an event; returns False if it was already received"""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO webhook_events (event_id, type, customer_key, payload, available_at, received_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (event_id, event_type, customer_key, json.dumps(payload), now, now)
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, limit: int = 1) -> List[QueuedEvent]:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE webhook_events SET status = 'pending' WHERE status = 'processing' AND lease_until < ?", (now,)
+            )
+            rows = conn.execute("""
+                SELECT id, event_id, type, customer_key, payload, attempts FROM webhook_events e
+                WHERE status = 'pending' AND available_at <= ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM webhook_events earlier
+                      WHERE earlier.customer_key = e.customer_key AND earlier.id < e.id
+                        AND earlier.status IN ('pending', 'processing')
+                  )
+                ORDER BY id LIMIT ?
+            """, (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE webhook_events SET status = 'processing', lease_until = ? WHERE id = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [QueuedEvent(row[0], row[1], row[2], row[3], json.loads(row[4]), row[5]) for row in rows]
+
+    def complete(self, queued: QueuedEvent):
+        self._connection().execute(
+            "UPDATE webhook_events SET status = 'done', attempts = attempts + 1, finished_at = ?, last_error = NULL "
+            "WHERE id = ?", (time.time(), queued.id)
+        )
+
+    def fail(self, queued: QueuedEvent, error: str, retry_in: Optional[float]):
+        """Schedule a retry after retry_in seconds, or dead-letter the event if retry_in is None"""
+        now = time.time()
+        if retry_in is None:
+            self._connection().execute(
+                "UPDATE webhook_events SET status = 'dead', attempts = attempts + 1, last_error = ?, finished_at = ? "
+                "WHERE id = ?", (error, now, queued.id)
+            )
+        else:
+            self._connection().execute(
+                "UPDATE webhook_events SET status = 'pending', attempts = attempts + 1, last_error = ?, available_at = ? "
+                "WHERE id = ?", (error, now + retry_in, queued.id)
+            )
+
+    def purge(self, older_than_days: float = 30):
+        """Drop finished events; keep them long enough to deduplicate Stripe's redeliveries"""
+        cutoff = time.time() - older_than_days * 86400
+        self._connection().execute(
+            "DELETE FROM webhook_events WHERE status IN ('done', 'dead') AND finished_at < ?", (cutoff,)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM webhook_events GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+class WebhookWorkerPool:
+    """Threads that drain a WebhookQueue, retrying failures with jittered backoff
+
+    Events that still fail after max_attempts are dead-lettered (status
+    'dead') so they stop blocking later events of the same customer.
+    """
+
+    def __init__(self, queue: WebhookQueue, handler: Callable[[Dict[str, Any]], None], workers: int = 4,
+                 max_attempts: int = 5, poll_interval: float = 0.5, backoff_base: float = 2.0,
+                 backoff_cap: float = 300.0):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> 'WebhookWorkerPool':
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"webhook-worker-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def notify(self):
+        """Wake idle workers after an enqueue instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = self.queue.claim()
+            except sqlite3.OperationalError as e:
+                print(f"Failed to claim webhook events: {str(e)}")
+                claimed = []
+            if not claimed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            for queued in claimed:
+                self.process(queued)
+
+    def process(self, queued: QueuedEvent):
+        try:
+            self.handler(queued.payload)
+        except Exception as e:
+            attempts = queued.attempts + 1
+            retry_in = None
+            if attempts < self.max_attempts:
+                retry_in = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempts))
+            print(f"Failed to process webhook {queued.event_id} (attempt {attempts}): {str(e)}")
+            self.queue.fail(queued, str(e), retry_in)
+        else:
+            self.queue.complete(queued)
+        # Later events of this customer may be claimable now
+        self._wakeup.set()
+
+    def close(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,272 @@
+from typing import Dict, Any, List, Optional, Callable, Sequence, Tuple
+from dataclasses import dataclass, field, asdict
+from collections import deque
+import asyncio
+import json
+import re
+import secrets
+import threading
+import time
+
+from .step_graph import StepGraph
+from .workflow_store import Workflow, WorkflowStep
+
+# A parameter value like "$step_2" or "$step_2.transcript" is replaced by that step's output
+STEP_REFERENCE = re.compile(r"^\$(step_\d+)((?:\.[\w-]+)*)$")
+
+def step_key(position: int) -> str:
+    return f"step_{position}"
+
+def plan_dag(steps: Sequence[WorkflowStep]) -> List[Tuple[str, WorkflowStep, List[str]]]:
+    """Order steps so every step follows the steps it depends on
+
+    A step depends on every step of the previous step_order, so steps sharing
+    a step_order run side by side. config["depends_on"] overrides this with a
+    list of step_order numbers, tool names or step keys ("step_2"); an empty
+    list makes the step a root. Raises ValueError on unknown references or cycles.
+    """
+    keyed = [(step_key(n), step) for n, step in enumerate(steps, 1)]
+    orders = sorted({step.step_order for _, step in keyed})
+    deps: Dict[str, List[str]] = {}
+    for key, step in keyed:
+        refs = step.config.get('depends_on')
+        if refs is None:
+            earlier = [order for order in orders if order < step.step_order]
+            deps[key] = [other for other, candidate in keyed if earlier and candidate.step_order == earlier[-1]]
+            continue
+        matched = []
+        for ref in refs if isinstance(refs, list) else [refs]:
+            found = [
+                other for other, candidate in keyed
+                if other == ref or candidate.name == ref or (isinstance(ref, int) and candidate.step_order == ref)
+            ]
+            if not found:
+                raise ValueError(f"Step '{key}' ({step.name}) depends on unknown step: {ref}")
+            matched.extend(other for other in found if other != key and other not in matched)
+        deps[key] = matched
+
+    by_key = dict(keyed)
+    waiting = {key: len(needs) for key, needs in deps.items()}
+    dependents: Dict[str, List[str]] = {key: [] for key in deps}
+    for key, needs in deps.items():
+        for need in needs:
+            dependents[need].append(key)
+    ready = deque(key for key, _ in keyed if waiting[key] == 0)
+    ordered = []
+    while ready:
+        key = ready.popleft()
+        ordered.append((key, by_key[key], deps[key]))
+        for dependent in dependents[key]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if len(ordered) < len(keyed):
+        stuck = sorted(key for key, count in waiting.items() if count)
+        raise ValueError(f"Workflow steps form a cycle: {', '.join(stuck)}")
+    return ordered
+
+def resolve_params(params: Dict[str, Any], upstream: Dict[str, Any]) -> Dict[str, Any]:
+    """Substitute "$step_N[.field...]" references with upstream outputs"""
+    resolved = {}
+    for name, value in params.items():
+        match = STEP_REFERENCE.match(value) if isinstance(value, str) else None
+        if match:
+            if match.group(1) not in upstream:
+                raise ValueError(f"Parameter '{name}' references {match.group(1)}, which is not an upstream step")
+            value = upstream[match.group(1)]
+            for part in filter(None, match.group(2).split('.')):
+                value = value[int(part)] if isinstance(value, list) else value[part]
+        resolved[name] = value
+    return resolved
+
+@dataclass
+class StepRecord:
+    name: str
+    status: str
+    started: Optional[float] = None
+    duration: Optional[float] = None
+    output: Any = None
+    error: Optional[str] = None
+
+@dataclass
+class WorkflowRunReport:
+    run_id: str
+    workflow_id: str
+    status: str
+    steps: Dict[str, StepRecord] = field(default_factory=dict)
+    resumed: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'run_id': self.run_id,
+            'workflow_id': self.workflow_id,
+            'status': self.status,
+            'steps': {key: asdict(record) for key, record in self.steps.items()},
+            'resumed': self.resumed,
+            'duration': round(self.duration, 4)
+        }
+
+class WorkflowCheckpoints:
+    """Run and step outputs in workflow_runs/workflow_step_runs, or in memory without a pool
+
+    Each step is saved as soon as it finishes, so a failed or interrupted run
+    can be resumed without repeating the steps that already succeeded.
+    Outputs are stored as JSON.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._steps: Dict[str, Dict[str, StepRecord]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, workflow_id: str) -> str:
+        run_id = "run_" + secrets.token_hex(8)
+        if self.pool is not None:
+            with self.pool.transaction() as tx:
+                tx.execute("INSERT INTO workflow_runs (run_id, workflow_id, status) VALUES (%s, %s, 'running')",
+                           (run_id, workflow_id))
+        else:
+            with self._lock:
+                self._runs[run_id] = {'workflow_id': workflow_id, 'status': 'running'}
+                self._steps[run_id] = {}
+        return run_id
+
+    def load(self, run_id: str) -> Optional[Tuple[str, str, Dict[str, StepRecord]]]:
+        """(workflow_id, status, step records) of a run, or None if it does not exist"""
+        if self.pool is None:
+            with self._lock:
+                run = self._runs.get(run_id)
+                return (run['workflow_id'], run['status'], dict(self._steps[run_id])) if run else None
+        with self.pool.transaction() as tx:
+            tx.execute("SELECT workflow_id, status FROM workflow_runs WHERE run_id = %s", (run_id,))
+            run = tx.fetchone()
+            if run is None:
+                return None
+            tx.execute(
+                "SELECT step_key, tool_name, status, duration, output, error FROM workflow_step_runs "
+                "WHERE run_id = %s ORDER BY id", (run_id,)
+            )
+            records = {}
+            for key, name, status, duration, output, error in tx.fetchall():
+                if isinstance(output, str):
+                    output = json.loads(output)
+                records[key] = StepRecord(name, status, duration=duration, output=output, error=error)
+        return run[0], run[1], records
+
+    def save_step(self, run_id: str, key: str, record: StepRecord):
+        if self.pool is None:
+            with self._lock:
+                self._steps[run_id][key] = record
+            return
+        with self.pool.transaction() as tx:
+            tx.execute(
+                "INSERT INTO workflow_step_runs (run_id, step_key, tool_name, status, duration, output, error) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                "ON CONFLICT (run_id, step_key) DO UPDATE SET status = EXCLUDED.status, "
+                "duration = EXCLUDED.duration, output = EXCLUDED.output, error = EXCLUDED.error, "
+                "updated_at = CURRENT_TIMESTAMP",
+                (run_id, key, record.name, record.status, record.duration,
+                 json.dumps(record.output, default=str), record.error)
+            )
+
+    def finish(self, run_id: str, status: str, duration: float):
+        if self.pool is None:
+            with self._lock:
+                self._runs[run_id].update(status=status, duration=duration)
+            return
+        with self.pool.transaction() as tx:
+            tx.execute(
+                "UPDATE workflow_runs SET status = %s, duration = %s, updated_at = CURRENT_TIMESTAMP WHERE run_id = %s",
+                (status, duration, run_id)
+            )
+
+class WorkflowEngine:
+    """Runs a workflow's steps as a DAG, overlapping independent steps
+
+    resolve(step, user_id) returns a plain function taking the step's
+    resolved params and its upstream outputs (keyed by step key); user_id is
+    the workflow's owner, for usage metering. It raises ValueError when the
+    step cannot run, and every step is resolved before anything starts. Steps
+    run through StepGraph on the runtime's event loop: each blocking call goes
+    to a worker thread while holding one of its tool's concurrency slots
+    (runtime.limit). The first failure cancels the steps that have not
+    finished. Resuming a run reuses the outputs of steps that already
+    succeeded.
+    """
+
+    def __init__(self, runtime, resolve: Callable[[WorkflowStep, Optional[str]], Callable[..., Any]],
+                 checkpoints: Optional[WorkflowCheckpoints] = None):
+        self.runtime = runtime
+        self.resolve = resolve
+        self.checkpoints = checkpoints or WorkflowCheckpoints()
+
+    async def aexecute(self, workflow: Workflow, run_id: Optional[str] = None) -> WorkflowRunReport:
+        plan = plan_dag(workflow.steps)
+        # Resolving may import and construct modules, and checkpoints hit the database: keep both off the loop
+        actions = await asyncio.to_thread(
+            lambda: {key: self.resolve(step, workflow.user_id) for key, step, _ in plan}
+        )
+
+        done: Dict[str, StepRecord] = {}
+        if run_id is not None:
+            loaded = await asyncio.to_thread(self.checkpoints.load, run_id)
+            if loaded is None or loaded[0] != workflow.workflow_id:
+                raise ValueError(f"Run {run_id} does not belong to workflow {workflow.workflow_id}")
+            done = {key: record for key, record in loaded[2].items() if record.status == 'ok'}
+        else:
+            run_id = await asyncio.to_thread(self.checkpoints.start, workflow.workflow_id)
+
+        report = WorkflowRunReport(run_id, workflow.workflow_id, 'running', resumed=sorted(done))
+        graph = StepGraph()
+        for key, step, needs in plan:
+            report.steps[key] = done.get(key) or StepRecord(step.name, 'pending')
+            if key in done:
+                continue
+            graph.add(
+                key, self._step_fn(run_id, key, step, actions[key], needs, report),
+                needs=[need for need in needs if need not in done],
+                inputs=[need for need in needs if need in done]
+            )
+
+        started = time.perf_counter()
+        try:
+            await graph.run(**{key: record.output for key, record in done.items()})
+            report.status = 'completed'
+        except Exception:
+            report.status = 'failed'
+        finally:
+            report.duration = time.perf_counter() - started
+            for record in report.steps.values():
+                if record.status == 'pending':
+                    # Never started because an upstream step failed
+                    record.status = 'cancelled'
+            await asyncio.to_thread(self.checkpoints.finish, run_id, report.status, report.duration)
+        return report
+
+    def _step_fn(self, run_id: str, key: str, step: WorkflowStep, action: Callable[..., Any],
+                 needs: List[str], report: WorkflowRunReport):
+        def call(**upstream):
+            record = StepRecord(step.name, 'running', started=time.time())
+            report.steps[key] = record
+            began = time.perf_counter()
+            try:
+                params = resolve_params(dict(step.config.get('params') or {}), upstream)
+                record.output = action(params, upstream)
+                record.status = 'ok'
+            except Exception as e:
+                record.status, record.error = 'failed', str(e)
+                raise
+            finally:
+                record.duration = time.perf_counter() - began
+                self.checkpoints.save_step(run_id, key, record)
+            return record.output
+
+        async def run(**upstream):
+            async with self.runtime.limit(step.name):
+                return await asyncio.to_thread(call, **upstream)
+        return run
+
+    def execute(self, workflow: Workflow, run_id: Optional[str] = None) -> WorkflowRunReport:
+        return self.runtime.run_sync(self.aexecute(workflow, run_id))
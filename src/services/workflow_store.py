@@ -0,0 +1,237 @@
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+import json
+import secrets
+import threading
+import time
+
+STEP_COLUMNS = ['workflow_id', 'tool_id', 'tool_name', 'step_order', 'config']
+WORKFLOW_SELECT = (
+    "SELECT id, public_id, owner, name, description, status, updated_at FROM workflows "
+    "WHERE public_id IS NOT NULL AND {where} ORDER BY id"
+)
+
+def _before(value: Any, seconds: float) -> Any:
+    """A database timestamp moved back by seconds, in the form it was read (datetime or SQLite text)"""
+    if isinstance(value, str):
+        moved = datetime.fromisoformat(value) - timedelta(seconds=seconds)
+        return moved.isoformat(sep=' ', timespec='seconds' if len(value) <= 19 else 'microseconds')
+    return value - timedelta(seconds=seconds)
+
+def _older(value: Any, than: Any) -> bool:
+    return value is not None and than is not None and value < than
+
+def new_workflow_id() -> str:
+    """Random public id, stable across processes and restarts (unlike hash())"""
+    return "wf_" + secrets.token_hex(8)
+
+@dataclass
+class WorkflowStep:
+    name: str
+    step_order: int
+    config: Dict[str, Any] = field(default_factory=dict)
+    tool_id: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.tool_id, 'name': self.name, 'step_order': self.step_order, 'config': self.config}
+
+@dataclass
+class Workflow:
+    workflow_id: str
+    user_id: Optional[str]
+    name: str
+    description: str = ""
+    status: str = "draft"
+    steps: List[WorkflowStep] = field(default_factory=list)
+    db_id: Optional[int] = None
+    updated_at: Any = None
+
+    @property
+    def tool_names(self) -> List[str]:
+        return [step.name for step in self.steps]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'workflow_id': self.workflow_id,
+            'user_id': self.user_id,
+            'name': self.name,
+            'description': self.description,
+            'status': self.status,
+            'tools': [step.to_dict() for step in self.steps]
+        }
+
+def build_steps(tools: Sequence[Any]) -> List[WorkflowStep]:
+    """Steps from tool names or {"id", "name", "config", "step_order"} dicts, in list order by default"""
+    steps = []
+    for n, tool in enumerate(tools, 1):
+        if isinstance(tool, dict):
+            steps.append(WorkflowStep(
+                str(tool.get('name') or tool.get('tool')), int(tool.get('step_order', n)),
+                dict(tool.get('config') or {}), tool.get('id')
+            ))
+        else:
+            steps.append(WorkflowStep(str(tool), n))
+    return steps
+
+class WorkflowRepository:
+    """Workflows kept in memory and written through to workflows/workflow_steps
+
+    Every create or status change is committed to the database before the
+    cache is updated, so a cached workflow is always one that was persisted.
+    Reads are served from memory, indexed by workflow id, user and tool. A
+    get() that misses (a workflow created by another worker) is loaded once
+    from the database. Listings first pull in rows created or updated (e.g.
+    a status set by another worker) since the last sync, at most every
+    sync_interval seconds. updated_at is stamped when a transaction starts,
+    not when it commits, so each sync re-reads the last sync_overlap seconds
+    before the newest updated_at seen; a write whose transaction ran longer
+    than that can be missed until the process restarts. Without a pool the
+    repository is memory-only.
+    """
+
+    def __init__(self, pool=None, sync_interval: float = 5.0, sync_overlap: float = 60.0):
+        self.pool = pool
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self._lock = threading.RLock()
+        self._workflows: Dict[str, Workflow] = {}
+        self._by_user: Dict[str, Dict[str, None]] = {}
+        self._by_tool: Dict[str, Dict[str, None]] = {}
+        self._synced_updated_at = None
+        self._synced_at = 0.0
+
+    def _index(self, workflow: Workflow):
+        with self._lock:
+            previous = self._workflows.get(workflow.workflow_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._workflows[workflow.workflow_id] = workflow
+            if workflow.user_id is not None:
+                self._by_user.setdefault(workflow.user_id, {})[workflow.workflow_id] = None
+            for name in workflow.tool_names:
+                self._by_tool.setdefault(name.casefold(), {})[workflow.workflow_id] = None
+
+    def _unindex(self, workflow: Workflow):
+        self._by_user.get(workflow.user_id, {}).pop(workflow.workflow_id, None)
+        for name in workflow.tool_names:
+            self._by_tool.get(name.casefold(), {}).pop(workflow.workflow_id, None)
+
+    def create(self, user_id: Any, tools: Sequence[Any], name: str = "New Workflow",
+               description: str = "") -> Workflow:
+        workflow = Workflow(
+            new_workflow_id(), str(user_id) if user_id is not None else None, name, description or "",
+            steps=build_steps(tools)
+        )
+        if self.pool is not None:
+            self._insert(workflow)
+        self._index(workflow)
+        return workflow
+
+    def _insert(self, workflow: Workflow):
+        with self.pool.transaction() as tx:
+            tx.execute(
+                "INSERT INTO workflows (public_id, owner, name, description, status) "
+                "VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                (workflow.workflow_id, workflow.user_id, workflow.name, workflow.description, workflow.status)
+            )
+            workflow.db_id = tx.fetchone()[0]
+            unresolved = sorted({step.name for step in workflow.steps if step.tool_id is None})
+            if unresolved:
+                placeholders = ', '.join(['%s'] * len(unresolved))
+                tx.execute(f"SELECT name, id FROM tools WHERE name IN ({placeholders})", unresolved)
+                tool_ids = dict(tx.fetchall())
+                for step in workflow.steps:
+                    if step.tool_id is None:
+                        step.tool_id = tool_ids.get(step.name)
+            if workflow.steps:
+                tx.insert_many('workflow_steps', STEP_COLUMNS, [
+                    (workflow.db_id, step.tool_id, step.name, step.step_order, json.dumps(step.config))
+                    for step in workflow.steps
+                ])
+
+    def _load(self, where: str, params: Sequence[Any]) -> List[Workflow]:
+        with self.pool.transaction() as tx:
+            tx.execute(WORKFLOW_SELECT.format(where=where), params)
+            workflows = {
+                row[0]: Workflow(row[1], row[2], row[3], row[4] or "", row[5] or "draft", db_id=row[0],
+                                 updated_at=row[6])
+                for row in tx.fetchall()
+            }
+            if workflows:
+                placeholders = ', '.join(['%s'] * len(workflows))
+                tx.execute(
+                    "SELECT workflow_id, tool_id, tool_name, step_order, config FROM workflow_steps "
+                    f"WHERE workflow_id IN ({placeholders}) ORDER BY workflow_id, step_order, id",
+                    list(workflows)
+                )
+                for workflow_id, tool_id, tool_name, step_order, config in tx.fetchall():
+                    if isinstance(config, str):
+                        config = json.loads(config)
+                    workflows[workflow_id].steps.append(WorkflowStep(tool_name, step_order, config or {}, tool_id))
+        return list(workflows.values())
+
+    def get(self, workflow_id: str) -> Optional[Workflow]:
+        workflow = self._workflows.get(workflow_id)
+        if workflow is None and self.pool is not None:
+            for loaded in self._load("public_id = %s", (workflow_id,)):
+                self._index(loaded)
+                workflow = loaded
+        return workflow
+
+    def sync(self, force: bool = False):
+        """Cache workflows created or changed since the last sync (by this or any other process)"""
+        if self.pool is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = now
+            watermark = self._synced_updated_at
+        # Query without the lock so readers of the cache are not held up by the database
+        if watermark is None:
+            loaded_rows = self._load("id > %s", (0,))
+        else:
+            loaded_rows = self._load("updated_at >= %s", (_before(watermark, self.sync_overlap),))
+        with self._lock:
+            for loaded in loaded_rows:
+                cached = self._workflows.get(loaded.workflow_id)
+                if cached is not None and _older(loaded.updated_at, cached.updated_at):
+                    # An overlapping sync already cached a newer version
+                    continue
+                if cached is None or (cached.status, cached.name, cached.description) != (
+                        loaded.status, loaded.name, loaded.description):
+                    self._index(loaded)
+                if loaded.updated_at is not None and (
+                        self._synced_updated_at is None or loaded.updated_at > self._synced_updated_at):
+                    self._synced_updated_at = loaded.updated_at
+
+    def list_by_user(self, user_id: Any) -> List[Workflow]:
+        self.sync()
+        with self._lock:
+            return [self._workflows[key] for key in self._by_user.get(str(user_id), {})]
+
+    def list_by_tool(self, tool: str) -> List[Workflow]:
+        self.sync()
+        with self._lock:
+            return [self._workflows[key] for key in self._by_tool.get(tool.casefold(), {})]
+
+    def set_status(self, workflow_id: str, status: str) -> Optional[Workflow]:
+        workflow = self.get(workflow_id)
+        if workflow is None:
+            return None
+        if self.pool is not None:
+            with self.pool.transaction() as tx:
+                tx.execute(
+                    "UPDATE workflows SET status = %s, updated_at = CURRENT_TIMESTAMP WHERE public_id = %s",
+                    (status, workflow_id)
+                )
+        # Replace rather than mutate so concurrent readers see either version whole
+        updated = replace(workflow, status=status)
+        self._index(updated)
+        return updated
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'workflows': len(self._workflows), 'users': len(self._by_user), 'tools': len(self._by_tool)}
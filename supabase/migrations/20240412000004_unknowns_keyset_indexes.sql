@@ -0,0 +1,5 @@
+-- Composite indexes backing keyset pagination on (sort column, id)
+CREATE INDEX IF NOT EXISTS unknowns_impact_id_idx ON public.unknowns (potential_impact DESC, id DESC);
+CREATE INDEX IF NOT EXISTS unknowns_company_impact_id_idx ON public.unknowns (company_id, potential_impact DESC, id DESC);
+CREATE INDEX IF NOT EXISTS unknowns_discovery_date_id_idx ON public.unknowns (discovery_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS unknowns_last_updated_id_idx ON public.unknowns (last_updated DESC, id DESC);
@@ -0,0 +1,7 @@
+-- Tags and related companies were written as JSON-encoded strings; store them as JSONB arrays
+UPDATE public.unknowns SET tags = (tags #>> '{}')::jsonb WHERE jsonb_typeof(tags) = 'string';
+UPDATE public.unknowns SET related_companies = (related_companies #>> '{}')::jsonb
+    WHERE jsonb_typeof(related_companies) = 'string';
+
+-- Backs the tag filter of the paginated listing (tags @> '["..."]')
+CREATE INDEX IF NOT EXISTS unknowns_tags_idx ON public.unknowns USING GIN (tags jsonb_path_ops);
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The project root for src.* and routes.*, and src/ for the services.* and modules.* imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
@@ -0,0 +1,66 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+class LovablStub:
+    """Local HTTP server answering Lovabl API paths from a script of canned responses
+
+    script maps "METHOD /path" to a list of (status, headers, body, delay)
+    replies, served in order; the last one repeats. Every request is logged
+    in .requests as (method, path, headers, body).
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                key = f"{self.command} {self.path}"
+                stub.requests.append((self.command, self.path, dict(self.headers), body))
+                replies = stub.script.get(key) or [(404, {}, {'error': 'not found'}, 0)]
+                status, headers, payload, delay = replies.pop(0) if len(replies) > 1 else replies[0]
+                time.sleep(delay)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting (timeout tests)
+                    pass
+
+            do_GET = do_POST = do_PUT = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def on(self, method, path, *replies):
+        """Queue replies: (status, body) or (status, body, headers) or (status, body, headers, delay)"""
+        self.script[f"{method} /v1{path}"] = [
+            (reply[0], reply[2] if len(reply) > 2 else {}, reply[1], reply[3] if len(reply) > 3 else 0)
+            for reply in replies
+        ]
+
+    def count(self, method, path):
+        return sum(1 for request in self.requests if request[:2] == (method, f"/v1{path}"))
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,97 @@
+from typing import Dict, Any, Optional
+import hashlib
+import threading
+
+from services.eth_rpc import Payload, to_hex
+
+# ERC20 balanceOf(address) and decimals() selectors
+BALANCE_OF = '0x70a08231'
+DECIMALS = '0x313ce567'
+
+class RpcStub:
+    """In-process stand-in for an Ethereum node for the tests
+
+    Answers single and batch JSON-RPC payloads the way a node would, for the
+    handful of methods the blockchain client uses. Balances and token
+    balances are set with set_balance/set_token_balance (tokens report 18
+    decimals unless given). Sent raw transactions bump the sender's nonce
+    (set with sender=) and mine a block. Each request is counted in .requests
+    so callers can check batching.
+    """
+
+    def __init__(self, chain_id: int = 1337, block: int = 1, sender: Optional[str] = None):
+        self.chain_id = chain_id
+        self.block = block
+        self.sender = sender
+        self.balances: Dict[str, int] = {}
+        self.token_balances: Dict[tuple, int] = {}
+        self.token_decimals: Dict[str, int] = {}
+        self.nonces: Dict[str, int] = {}
+        self.transactions: Dict[str, str] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def set_balance(self, address: str, wei: int):
+        self.balances[address.lower()] = wei
+
+    def set_token_balance(self, token: str, owner: str, amount: int, decimals: Optional[int] = None):
+        self.token_balances[(token.lower(), owner.lower())] = amount
+        if decimals is not None:
+            self.token_decimals[token.lower()] = decimals
+
+    def mine(self, blocks: int = 1):
+        with self._lock:
+            self.block += blocks
+
+    def __call__(self, payload: Payload) -> Payload:
+        with self._lock:
+            self.requests += 1
+        if isinstance(payload, list):
+            return [self._reply(request) for request in payload]
+        return self._reply(payload)
+
+    def _reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = getattr(self, '_' + request.get('method', ''), None)
+        reply = {'jsonrpc': '2.0', 'id': request.get('id')}
+        if handler is None:
+            reply['error'] = {'code': -32601, 'message': f"Method not found: {request.get('method')}"}
+            return reply
+        try:
+            reply['result'] = handler(*request.get('params', []))
+        except (ValueError, TypeError, IndexError) as e:
+            reply['error'] = {'code': -32602, 'message': str(e)}
+        return reply
+
+    def _eth_chainId(self):
+        return to_hex(self.chain_id)
+
+    def _eth_blockNumber(self):
+        return to_hex(self.block)
+
+    def _eth_getBalance(self, address, block='latest'):
+        return to_hex(self.balances.get(address.lower(), 0))
+
+    def _eth_getTransactionCount(self, address, block='latest'):
+        return to_hex(self.nonces.get(address.lower(), 0))
+
+    def _eth_call(self, call, block='latest'):
+        data = call.get('data') or call.get('input') or ''
+        if data == DECIMALS:
+            return '0x' + format(self.token_decimals.get(call['to'].lower(), 18), '064x')
+        if not data.startswith(BALANCE_OF) or len(data) != 74:
+            raise ValueError("execution reverted")
+        owner = '0x' + data[-40:]
+        amount = self.token_balances.get((call['to'].lower(), owner.lower()), 0)
+        return '0x' + format(amount, '064x')
+
+    def _eth_sendRawTransaction(self, raw):
+        tx_hash = '0x' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        with self._lock:
+            if tx_hash in self.transactions:
+                raise ValueError("already known")
+            self.transactions[tx_hash] = raw
+            if self.sender:
+                key = self.sender.lower()
+                self.nonces[key] = self.nonces.get(key, 0) + 1
+            self.block += 1
+        return tx_hash
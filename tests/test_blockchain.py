@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from services.eth_rpc import JsonRpcClient, NonceManager
+from modules.blockchain import BlockchainIntegrator
+from rpc_stub import RpcStub
+
+SENDER = '0x' + 'cd' * 20
+CONTRACT = '0x' + 'ef' * 20
+
+class SignedTx:
+    """What eth-account returns; older versions only have rawTransaction"""
+
+    def __init__(self, raw, legacy=False):
+        if legacy:
+            self.rawTransaction = raw
+        else:
+            self.raw_transaction = raw
+
+class Account:
+    def __init__(self, legacy=False):
+        self.address = SENDER
+        self.legacy = legacy
+        self.fail_next = False
+
+    def sign_transaction(self, tx):
+        if self.fail_next:
+            self.fail_next = False
+            raise ValueError("signer unavailable")
+        return SignedTx(json.dumps(tx, sort_keys=True).encode('utf-8'), self.legacy)
+
+class Contract:
+    def __init__(self, address):
+        self.address = address
+        self.functions = self
+
+    def mintNFT(self, metadata_uri):
+        self.metadata_uri = metadata_uri
+        return self
+
+    def build_transaction(self, params):
+        return {**params, 'to': self.address, 'data': self.metadata_uri}
+
+class StubWeb3:
+    """Just the parts of Web3 mint_nft uses; counts contract objects built"""
+
+    def __init__(self, account):
+        self.eth = self
+        self.account = self
+        self._account = account
+        self.contracts_built = 0
+
+    def from_key(self, private_key):
+        return self._account
+
+    def contract(self, address, abi):
+        self.contracts_built += 1
+        return Contract(address)
+
+@pytest.fixture
+def abi_path(tmp_path):
+    path = tmp_path / 'erc721_abi.json'
+    path.write_text('[]')
+    return str(path)
+
+def make_integrator(abi_path, account):
+    stub = RpcStub(sender=SENDER)
+    integrator = BlockchainIntegrator('http://127.0.0.1:8545', abi_path=abi_path)
+    integrator.rpc = JsonRpcClient(stub)
+    integrator.nonces = NonceManager(integrator.rpc)
+    integrator.w3 = StubWeb3(account)
+    return stub, integrator
+
+def sent_nonces(stub):
+    return sorted(json.loads(bytes.fromhex(raw[2:]))['nonce'] for raw in stub.transactions.values())
+
+@pytest.mark.parametrize('legacy', [False, True])
+def test_mints_reuse_the_contract_and_count_nonces_locally(abi_path, legacy):
+    stub, integrator = make_integrator(abi_path, Account(legacy))
+
+    hashes = [integrator.mint_nft(CONTRACT, 'key', f"ipfs://token/{n}") for n in range(3)]
+
+    assert len(set(hashes)) == 3
+    assert sent_nonces(stub) == [0, 1, 2]
+    assert integrator.w3.contracts_built == 1
+    # One eth_getTransactionCount, then one eth_sendRawTransaction per mint
+    assert stub.requests == 4
+
+def test_failed_mint_resyncs_the_nonce_from_the_node(abi_path):
+    account = Account()
+    stub, integrator = make_integrator(abi_path, account)
+    integrator.mint_nft(CONTRACT, 'key', 'ipfs://token/1')
+
+    account.fail_next = True
+    with pytest.raises(ValueError):
+        integrator.mint_nft(CONTRACT, 'key', 'ipfs://token/2')
+    integrator.mint_nft(CONTRACT, 'key', 'ipfs://token/3')
+
+    # Nonce 1 was reserved for the failed mint, but the node's count puts the next mint back on it
+    assert sent_nonces(stub) == [0, 1]
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+
+import pytest
+
+from services.db_pool import DatabasePool, PoolTimeout
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = DatabasePool.from_url(f"sqlite:///{tmp_path / 'pool.db'}", min_size=1, max_size=2,
+                                 checkout_timeout=0.2)
+    with pool.transaction() as tx:
+        tx.execute("CREATE TABLE users (email TEXT PRIMARY KEY, plan TEXT)")
+        tx.executemany("INSERT INTO users (email, plan) VALUES (%s, %s)",
+                       [('a@x', 'free'), ('b@x', 'free'), ('c@x', 'free')])
+    yield pool
+    pool.close()
+
+class BrokenRollback:
+    """A sqlite3 connection whose rollback fails, like a Postgres connection that dropped mid-transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        raise sqlite3.OperationalError("connection lost")
+
+    def close(self):
+        self.conn.close()
+
+def test_checkout_times_out_when_the_pool_is_exhausted(pool):
+    with pool.connection(), pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+    metrics = pool.metrics()
+    assert metrics['timeouts'] == 1 and metrics['waits'] == 1
+
+def test_waiting_checkout_gets_a_returned_connection(pool):
+    held = [pool._checkout(), pool._checkout()]
+    threading.Timer(0.05, pool._release, args=(held.pop(),)).start()
+
+    with pool.connection() as conn:
+        assert conn is not None
+    pool._release(held.pop())
+    assert pool.metrics()['created'] == 2
+
+def test_failed_transaction_is_rolled_back_and_the_connection_reused(pool):
+    with pytest.raises(ValueError):
+        with pool.transaction() as tx:
+            tx.execute("UPDATE users SET plan = %s WHERE email = %s", ('premium', 'a@x'))
+            raise ValueError("abort")
+
+    with pool.transaction() as tx:
+        tx.execute("SELECT plan FROM users WHERE email = %s", ('a@x',))
+        assert tx.fetchone() == ('free',)
+    assert pool.metrics()['discarded'] == 0
+
+def test_connection_that_cannot_roll_back_is_discarded(tmp_path):
+    path = tmp_path / 'broken.db'
+    pool = DatabasePool(lambda: BrokenRollback(sqlite3.connect(path, check_same_thread=False)),
+                        dialect='sqlite', min_size=1, max_size=1, checkout_timeout=0.2)
+    with pytest.raises(ValueError):
+        with pool.transaction():
+            raise ValueError("abort")
+
+    metrics = pool.metrics()
+    assert metrics['discarded'] == 1 and metrics['idle'] == 0
+    # The next caller gets a fresh connection instead of the broken one
+    assert pool.ping()
+    assert pool.metrics()['created'] == 2
+    pool.close()
+
+def test_update_many_updates_only_the_given_keys(pool):
+    with pool.transaction() as tx:
+        tx.update_many('users', 'email', ['plan'], [('a@x', 'premium'), ('c@x', 'enterprise')])
+
+    with pool.transaction() as tx:
+        tx.execute("SELECT email, plan FROM users ORDER BY email")
+        assert tx.fetchall() == [('a@x', 'premium'), ('b@x', 'free'), ('c@x', 'enterprise')]
+
+def test_closed_pool_refuses_checkouts(pool):
+    pool.close()
+    with pytest.raises(PoolTimeout):
+        pool.ping()
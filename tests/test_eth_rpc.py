@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from services.eth_rpc import JsonRpcClient, NonceManager, RpcError, from_hex
+from rpc_stub import RpcStub
+
+SENDER = '0x' + 'ab' * 20
+
+class ReversedStub(RpcStub):
+    """Answers batches in reverse order, as nodes are allowed to"""
+
+    def __call__(self, payload):
+        replies = super().__call__(payload)
+        return replies[::-1] if isinstance(replies, list) else replies
+
+def test_batch_returns_results_in_call_order():
+    stub = ReversedStub()
+    wallets = ['0x' + f"{n:040x}" for n in range(1, 8)]
+    for n, wallet in enumerate(wallets, 1):
+        stub.set_balance(wallet, n * 10)
+    client = JsonRpcClient(stub, max_batch=3)
+
+    results = client.batch([('eth_getBalance', [wallet, 'latest']) for wallet in wallets])
+
+    assert [from_hex(result) for result in results] == [n * 10 for n in range(1, 8)]
+    assert stub.requests == 3
+
+def test_batch_returns_rpc_error_for_failed_calls_only():
+    client = JsonRpcClient(RpcStub(block=42))
+
+    results = client.batch([
+        ('eth_blockNumber', []),
+        ('eth_unknownMethod', []),
+        ('eth_call', [{'to': '0x' + '1' * 40, 'data': '0xdeadbeef'}, 'latest']),
+        ('eth_chainId', [])
+    ])
+
+    assert from_hex(results[0]) == 42
+    assert isinstance(results[1], RpcError) and results[1].code == -32601
+    assert isinstance(results[2], RpcError) and results[2].code == -32602
+    assert from_hex(results[3]) == 1337
+
+def test_call_raises_rpc_error():
+    with pytest.raises(RpcError):
+        JsonRpcClient(RpcStub()).call('eth_unknownMethod')
+
+def test_nonce_reserve_is_unique_across_threads():
+    stub = RpcStub()
+    stub.nonces[SENDER] = 5
+    nonces = NonceManager(JsonRpcClient(stub))
+    reserved = []
+    lock = threading.Lock()
+    start = threading.Barrier(8)
+
+    def reserve_many():
+        start.wait()
+        for _ in range(50):
+            nonce = nonces.reserve(SENDER)
+            with lock:
+                reserved.append(nonce)
+
+    threads = [threading.Thread(target=reserve_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(reserved) == list(range(5, 405))
+    # Only the first reservation asks the node
+    assert stub.requests == 1
+
+def test_nonce_resync_starts_again_from_the_node_count():
+    stub = RpcStub(sender=SENDER)
+    client = JsonRpcClient(stub)
+    nonces = NonceManager(client)
+    assert [nonces.reserve(SENDER) for _ in range(3)] == [0, 1, 2]
+
+    # Only the first transaction reached the node; the other two nonces were never used
+    client.call('eth_sendRawTransaction', ['0xf8'])
+    nonces.resync(SENDER.upper())
+
+    assert nonces.reserve(SENDER) == 1
+
+def test_nonce_resync_under_concurrent_reserves():
+    stub = RpcStub()
+    stub.nonces[SENDER] = 10
+    nonces = NonceManager(JsonRpcClient(stub))
+    reserved = []
+    lock = threading.Lock()
+
+    def reserve_and_resync(n):
+        nonce = nonces.reserve(SENDER)
+        with lock:
+            reserved.append(nonce)
+        if n % 5 == 0:
+            nonces.resync(SENDER)
+
+    threads = [threading.Thread(target=reserve_and_resync, args=(n,)) for n in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The node never saw a transaction, so every resync restarts at its count
+    assert len(reserved) == 40 and min(reserved) == 10
+    nonces.resync(SENDER)
+    assert nonces.reserve(SENDER) == 10
@@ -0,0 +1,70 @@
+import asyncio
+
+from services.llm_concurrency import StreamFlight
+
+def collect(stream):
+    async def run():
+        return [item async for item in stream]
+    return run()
+
+def test_identical_streams_share_one_producer():
+    flight = StreamFlight()
+    started = []
+
+    async def produce():
+        started.append(1)
+        for piece in ['a', 'b', 'c']:
+            await asyncio.sleep(0.01)
+            yield piece
+
+    async def main():
+        first = asyncio.ensure_future(collect(flight.stream('k', produce)))
+        await asyncio.sleep(0.015)
+        # Joins after 'a' was produced and still sees the whole stream
+        second = await collect(flight.stream('k', produce))
+        return await first, second
+
+    first, second = asyncio.run(main())
+    assert first == second == ['a', 'b', 'c']
+    assert len(started) == 1
+    assert flight.coalesced == 1
+    assert flight.in_flight() == 0
+
+def test_error_reaches_every_reader():
+    flight = StreamFlight()
+
+    async def produce():
+        yield 'a'
+        await asyncio.sleep(0.01)
+        raise ValueError('provider failed')
+
+    async def main():
+        return await asyncio.gather(collect(flight.stream('k', produce)), collect(flight.stream('k', produce)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_last_reader_leaving_cancels_the_producer():
+    flight = StreamFlight()
+
+    async def main():
+        state = {}
+
+        async def produce():
+            try:
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield 'x'
+            except asyncio.CancelledError:
+                state['cancelled'] = True
+                raise
+
+        stream = flight.stream('k', produce)
+        assert await stream.__anext__() == 'x'
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        return state
+
+    assert asyncio.run(main()) == {'cancelled': True}
+    assert flight.in_flight() == 0
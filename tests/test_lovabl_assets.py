@@ -0,0 +1,27 @@
+from integrations.lovabl_assets import AssetSync
+from integrations.lovabl_hook import LovablClientConfig, LovablMarketplace
+from lovabl_stub import LovablStub
+
+def test_sync_streams_multipart_and_skips_unchanged_assets(tmp_path):
+    stub = LovablStub().start()
+    try:
+        stub.on('POST', '/listings/L1/assets', (200, {'ok': True}))
+        assets = tmp_path / 'assets'
+        (assets / 'img').mkdir(parents=True)
+        (assets / 'logo.png').write_bytes(b'logo' * 1000)
+        (assets / 'img' / 'hero.jpg').write_bytes(b'hero' * 1000)
+        sync = AssetSync(LovablMarketplace('key', LovablClientConfig(base_url=stub.url)), max_open_files=2)
+
+        first = sync.sync('L1', assets, 'idem')
+        assert sorted(first.uploaded) == ['img/hero.jpg', 'logo.png'] and first.ok
+        bodies = [request[3] for request in stub.requests]
+        assert all(b'filename="' in body and body.endswith(b'--\r\n') for body in bodies)
+        assert any(b'logo' * 1000 in body for body in bodies)
+
+        (assets / 'logo.png').write_bytes(b'new logo')
+        second = sync.sync('L1', assets, 'idem')
+        assert second.uploaded == ['logo.png']
+        assert second.skipped == ['img/hero.jpg']
+        assert stub.count('POST', '/listings/L1/assets') == 3
+    finally:
+        stub.stop()
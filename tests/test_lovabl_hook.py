@@ -0,0 +1,114 @@
+import asyncio
+import time
+from pathlib import Path
+
+import aiohttp
+import pytest
+import requests
+
+from integrations.lovabl_hook import (
+    AsyncLovablMarketplace, LovablClientConfig, LovablMarketplace, ProductSpec, retry_after_seconds
+)
+from lovabl_stub import LovablStub
+
+SPEC = ProductSpec("Widget", "A widget", {'basic': 9.0}, {}, Path('.'))
+
+@pytest.fixture
+def stub():
+    stub = LovablStub().start()
+    yield stub
+    stub.stop()
+
+def config(stub, **overrides):
+    settings = dict(base_url=stub.url, backoff_factor=0.01, max_backoff=0.05, read_timeout=2.0)
+    settings.update(overrides)
+    return LovablClientConfig(**settings)
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("2") == 2.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("soon") is None
+
+def test_sync_client_retries_server_errors(stub):
+    stub.on('POST', '/listings', (503, {}), (502, {}), (200, {'id': 'L1'}))
+    client = LovablMarketplace('key', config(stub))
+
+    assert client.create_listing(SPEC, 'idem-1') == {'id': 'L1'}
+    assert stub.count('POST', '/listings') == 3
+    # Retries resend the same idempotency key
+    assert {request[2]['Idempotency-Key'] for request in stub.requests} == {'idem-1'}
+
+def test_sync_client_honours_retry_after(stub):
+    stub.on('POST', '/listings', (429, {}, {'Retry-After': '1'}), (200, {'id': 'L1'}))
+    client = LovablMarketplace('key', config(stub))
+
+    started = time.monotonic()
+    assert client.create_listing(SPEC)['id'] == 'L1'
+    assert time.monotonic() - started >= 0.9
+
+def test_sync_client_does_not_retry_client_errors(stub):
+    stub.on('POST', '/listings/L1/payments', (400, {'error': 'bad key'}))
+    client = LovablMarketplace('key', config(stub))
+
+    with pytest.raises(requests.HTTPError) as raised:
+        client.enable_payment_processing('L1', 'genix-key')
+    assert raised.value.response.status_code == 400
+    assert stub.count('POST', '/listings/L1/payments') == 1
+
+def test_sync_client_read_timeout(stub):
+    stub.on('POST', '/listings', (200, {'id': 'L1'}, {}, 1.0))
+    client = LovablMarketplace('key', config(stub, read_timeout=0.2, max_retries=1))
+
+    started = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        client.create_listing(SPEC)
+    assert time.monotonic() - started < 1.5
+    assert stub.count('POST', '/listings') == 2
+
+def test_async_client_retries_server_errors(stub):
+    stub.on('POST', '/listings', (503, {}), (500, {}), (200, {'id': 'L2'}))
+
+    async def run():
+        async with AsyncLovablMarketplace('key', config(stub)) as client:
+            return await client.create_listing(SPEC, 'idem-2')
+
+    assert asyncio.run(run()) == {'id': 'L2'}
+    assert stub.count('POST', '/listings') == 3
+
+def test_async_client_honours_retry_after(stub):
+    stub.on('POST', '/listings', (429, {}, {'Retry-After': '0.5'}), (200, {'id': 'L2'}))
+
+    async def run():
+        async with AsyncLovablMarketplace('key', config(stub)) as client:
+            started = time.monotonic()
+            listing = await client.create_listing(SPEC)
+            return listing, time.monotonic() - started
+
+    listing, elapsed = asyncio.run(run())
+    assert listing['id'] == 'L2'
+    assert elapsed >= 0.45
+
+def test_async_client_gives_up_after_max_retries(stub):
+    stub.on('POST', '/listings/L2/payments', (503, {}))
+
+    async def run():
+        async with AsyncLovablMarketplace('key', config(stub, max_retries=2)) as client:
+            await client.enable_payment_processing('L2', 'genix-key')
+
+    with pytest.raises(aiohttp.ClientResponseError) as raised:
+        asyncio.run(run())
+    assert raised.value.status == 503
+    assert stub.count('POST', '/listings/L2/payments') == 3
+
+def test_async_client_read_timeout(stub):
+    stub.on('POST', '/listings', (200, {'id': 'L2'}, {}, 1.0))
+
+    async def run():
+        async with AsyncLovablMarketplace('key', config(stub, read_timeout=0.2, max_retries=1)) as client:
+            await client.create_listing(SPEC)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert time.monotonic() - started < 1.5
+    assert stub.count('POST', '/listings') == 2
@@ -0,0 +1,44 @@
+from services.eth_rpc import JsonRpcClient
+from services.portfolio_scanner import PortfolioScanner, ETH
+from rpc_stub import RpcStub
+
+TOKENS = ['0x' + 'a1' * 20, '0x' + 'b2' * 20]
+
+def make_scanner(wallets):
+    stub = RpcStub(block=100)
+    for n, wallet in enumerate(wallets):
+        stub.set_balance(wallet, n * 10 ** 15)
+        stub.set_token_balance(TOKENS[0], wallet, n, decimals=6)
+        if n % 2:
+            stub.set_token_balance(TOKENS[1], wallet, 10 ** 30 + n)
+    return stub, PortfolioScanner(JsonRpcClient(stub, max_batch=100), concurrency=4)
+
+def test_scan_batches_requests_and_reuses_the_block_cache():
+    wallets = ['0x' + f"{n:040x}" for n in range(1, 3001)]
+    stub, scanner = make_scanner(wallets)
+
+    matrix = scanner.scan(wallets, TOKENS)
+
+    # eth_blockNumber, 9000 balance calls in 90 batches, one decimals batch
+    assert stub.requests == 92
+    assert matrix.block == 100
+    assert matrix.values.shape == (3000, 3)
+
+    stub.requests = 0
+    again = scanner.scan(wallets, TOKENS)
+
+    # Same block: only eth_blockNumber, everything else comes from the cache
+    assert stub.requests == 1
+    assert again.raw == matrix.raw
+
+def test_to_dict_keeps_exact_amounts_as_strings():
+    wallets = ['0x' + f"{n:040x}" for n in range(1, 5)]
+    _, scanner = make_scanner(wallets)
+
+    result = scanner.scan(wallets, TOKENS).to_dict()
+
+    assert result['assets'] == [ETH] + TOKENS
+    assert result['raw'][1] == [str(10 ** 15), '1', str(10 ** 30 + 1)]
+    assert result['raw'][0][2] == '0'
+    assert result['balances'][1][1] == 1e-6
+    assert result['balances'][1][2] == float(10 ** 30 + 1) / 10 ** 18
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from services.llm_concurrency import LLMRuntime
+from services.workflow_engine import WorkflowEngine, WorkflowCheckpoints
+from services.workflow_store import Workflow, build_steps
+from infinite_matrix_ecosystem import ModuleIntegrator, CapabilityNotAllowed
+
+class Stub:
+    """Stands in for VoiceAI; records when each call ran and can fail on demand"""
+
+    def __init__(self, delay=0.0, fail_sentiment=0):
+        self.delay = delay
+        self.fail_sentiment = fail_sentiment
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, name):
+        started = time.perf_counter()
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls.append((name, started, time.perf_counter()))
+
+    def transcribe_call(self, audio_url):
+        self._record('transcribe_call')
+        return {'text': f"transcript of {audio_url}"}
+
+    def detect_sentiment(self, text):
+        self._record('detect_sentiment')
+        if self.fail_sentiment:
+            self.fail_sentiment -= 1
+            raise RuntimeError("sentiment service unavailable")
+        return {'label': 'NEUTRAL', 'text': text}
+
+    def create_chatbot(self, name, industry, knowledge_base=None):
+        self._record('create_chatbot')
+        return {'name': name}
+
+def step(order, action, **params):
+    return {'name': 'Deepgram API', 'step_order': order,
+            'config': {'module': 'voice_ai', 'action': action, 'params': params}}
+
+@pytest.fixture
+def runtime():
+    runtime = LLMRuntime(default_limit=4)
+    yield runtime
+    runtime.close()
+
+def make_engine(runtime, stub):
+    mi = ModuleIntegrator({}, modules={'voice_ai': stub})
+    return WorkflowEngine(runtime, mi.step_action, WorkflowCheckpoints())
+
+def test_steps_with_the_same_order_overlap(runtime):
+    stub = Stub(delay=0.2)
+    engine = make_engine(runtime, stub)
+    workflow = Workflow('wf_overlap', 'user1', 'Overlap', steps=build_steps([
+        step(1, 'transcribe_call', audio_url='a.wav'),
+        step(1, 'transcribe_call', audio_url='b.wav')
+    ]))
+
+    report = engine.execute(workflow)
+
+    assert report.status == 'completed'
+    (_, first_start, first_end), (_, second_start, second_end) = stub.calls
+    assert first_start < second_end and second_start < first_end
+
+def test_step_reference_resolves_to_upstream_field(runtime):
+    engine = make_engine(runtime, Stub())
+    workflow = Workflow('wf_refs', 'user1', 'References', steps=build_steps([
+        step(1, 'transcribe_call', audio_url='call.wav'),
+        step(2, 'detect_sentiment', text='$step_1.text')
+    ]))
+
+    report = engine.execute(workflow)
+
+    assert report.status == 'completed'
+    assert report.steps['step_2'].output['text'] == "transcript of call.wav"
+
+def test_resume_reruns_only_the_failed_step(runtime):
+    stub = Stub(fail_sentiment=1)
+    engine = make_engine(runtime, stub)
+    workflow = Workflow('wf_resume', 'user1', 'Resume', steps=build_steps([
+        step(1, 'transcribe_call', audio_url='call.wav'),
+        step(2, 'detect_sentiment', text='$step_1.text')
+    ]))
+
+    failed = engine.execute(workflow)
+    assert failed.status == 'failed'
+    assert failed.steps['step_2'].status == 'failed'
+
+    resumed = engine.execute(workflow, failed.run_id)
+
+    assert resumed.status == 'completed'
+    assert resumed.resumed == ['step_1']
+    assert [name for name, _, _ in stub.calls] == ['transcribe_call', 'detect_sentiment', 'detect_sentiment']
+    assert resumed.steps['step_2'].output['text'] == "transcript of call.wav"
+
+def test_step_cannot_switch_to_another_module():
+    mi = ModuleIntegrator({}, modules={'voice_ai': Stub()})
+    [bad] = build_steps([{'name': 'Deepgram API', 'step_order': 1,
+                          'config': {'module': 'blockchain', 'action': 'get_token_balance'}}])
+
+    with pytest.raises(ValueError):
+        mi.step_action(bad)
+
+def test_write_capability_needs_server_opt_in():
+    [write] = build_steps([{'name': 'Deepgram API', 'step_order': 1, 'config': {'action': 'create_chatbot'}}])
+
+    with pytest.raises(CapabilityNotAllowed):
+        ModuleIntegrator({}, modules={'voice_ai': Stub()}).step_action(write)
+    enabled = ModuleIntegrator({}, modules={'voice_ai': Stub()}, write_capabilities={('voice_ai', 'create_chatbot')})
+    assert callable(enabled.step_action(write))
+
+def test_invoke_refuses_write_capabilities_even_when_steps_may_run_them():
+    stub = Stub()
+    mi = ModuleIntegrator({}, modules={'voice_ai': stub}, write_capabilities={('voice_ai', 'create_chatbot')})
+
+    with pytest.raises(CapabilityNotAllowed):
+        mi.invoke('voice_ai', 'create_chatbot', {'name': 'bot', 'industry': 'retail'})
+    assert mi.invoke('voice_ai', 'transcribe_call', {'audio_url': 'a.wav'}) == {'text': "transcript of a.wav"}
+    assert [name for name, _, _ in stub.calls] == ['transcribe_call']